@@ -1,6 +1,27 @@
 # -*- coding: utf-8 -*-
 
 from .eprun import runsim
+from .eprun import arunsim
+from .eprun import EPCache
+from .eprun import EPJobLedger
+from .eprun import EPJobQueue
+from .eprun import EPRuntimePredictor
 from .eprun import EPEnd
+from .eprun import EPEpw
 from .eprun import EPErr
 from .eprun import EPEso
+from .eprun import iter_eso
+from .eprun import runsim_batch
+from .eprun import iter_runsim_batch
+from .eprun import runsim_pipeline
+from .eprun import iter_runsim_pipeline
+from .eprun import arunsim_batch
+from .eprun import get_resource_usage
+from .eprun import get_schedule_report
+from .eprun import prune_output_variables
+from .eprun import morph_epw_batch
+from .eprun import get_representative_periods
+from .eprun import set_run_periods
+from .eprun import get_annual_totals
+from .eprun import runsim_sampled
+from .eprun import validate_sampling
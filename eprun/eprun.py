@@ -1,12 +1,26 @@
 # -*- coding: utf-8 -*-
 
 import os
+import asyncio
+import hashlib
+import shutil
+import sqlite3
+import tempfile
+import threading
+import collections
+import contextlib
+import functools
+import collections.abc
+import json
+import mmap
+import concurrent.futures
 import subprocess
+import sys
 import time
 import datetime
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import calendar
 
 
         
@@ -24,6 +38,15 @@ def runsim(
         output_suffix='L',
         readvars=False,
         print_call=False,
+        cache=None,
+        progress_callback=None,
+        fail_fast=None,
+        output_variables=None,
+        output_frequency=None,
+        output_profile=None,
+        keep_outputs=None,
+        scratch_dir=None,
+        run_periods=None,
         **kwargs
         ):
     """Runs an EnergyPlus simulation and returns the results.
@@ -37,7 +60,10 @@ def runsim(
         This can be relative or absolute.
     :type epw_filepath: str
     
-    :param ep_dir: The EnergyPlus directory where 'energyplus.exe' is installed.
+    :param ep_dir: The EnergyPlus directory where 'energyplus.exe' (or the 
+        'energyplus' executable on Linux and macOS) is installed.
+        On Windows, an 'energyplus.bat' or 'energyplus.cmd' wrapper is run
+        if there is no 'energyplus.exe'.
     :type ep_dir: str
     
     :param sim_dir: The directory to hold the simulation files.
@@ -95,6 +121,92 @@ def runsim(
         Default is False.
     :type print_call: bool
     
+    :param cache: If given, the cache of simulation results to use. If the 
+        cache holds the results of a simulation with the same input file, 
+        weather file, EnergyPlus executable and arguments, these results are
+        returned and EnergyPlus is not run. Otherwise the results of a 
+        successful simulation are added to the cache.
+        Default is None.
+    :type cache: EPCache
+    
+    :param progress_callback: If given, the stdout of EnergyPlus is read while
+        the simulation runs and this function is called with a progress 
+        dictionary for each line. See `_get_progress` for the keys of the
+        dictionary, which include the 'percent' complete and the 'eta'.
+        Default is None.
+    :type progress_callback: function
+    
+    :param fail_fast: If given, the .err file is read while the simulation runs
+        and the EnergyPlus process is terminated as soon as an error message 
+        matches. If True, any severe (or fatal) error matches. If a function,
+        it is called as `fail_fast(message_type, message)` for each new or 
+        continued message, where `message_type` is 'warning', 'severe' or 
+        'fatal' and `message` is the text of the message so far, and a match
+        is when it returns True. The matching message is stored in 
+        `EPResult.fail_fast_message`.
+        Default is None.
+    :type fail_fast: bool or function
+    
+    :param output_variables: If given, the output variables and meters which
+        are needed. A copy of the input file with only these output requests is
+        written to the simulation directory as '<output_prefix>in.idf' (or 
+        '.epJSON') and simulated instead, which reduces the size of the .eso 
+        file and the runtime. See `prune_output_variables`. The report of the
+        removed outputs is stored in `EPResult.output_pruning`.
+        Default is None.
+    :type output_variables: list (str or tuple)
+    
+    :param output_frequency: If given with `output_variables`, the reporting 
+        frequency of all kept outputs, for example 'Hourly'.
+        Default is None.
+    :type output_frequency: str
+    
+    :param output_profile: If given, the output files to keep: 'minimal' 
+        (only the .err and .end files), 'eso' (and the .eso and .mtr files), 
+        'sql' (and the .sql file) or 'tables' (and the tabular output files). 
+        The output requests for the other files are removed from a copy of the
+        input file, written to the simulation directory as for 
+        `output_variables`, and with EnergyPlus 9.5 or later an 
+        'OutputControl:Files' object is added to switch them off. 
+        Any other output files which are written are deleted after the 
+        simulation. The .err and .end files are always kept.
+        Default is None.
+    :type output_profile: str
+    
+    :param keep_outputs: If given, the file extensions of the output files to 
+        keep, for example ['eso','eio']. This can be used with `output_profile`
+        to keep further files. See `output_profile`.
+        Default is None.
+    :type keep_outputs: list (str)
+    
+    :param scratch_dir: If given, a directory on a fast local file system, for
+        example '/dev/shm' or `tempfile.gettempdir()`. EnergyPlus is run in a 
+        new temporary directory in this directory, and when it finishes the 
+        output files (only those in `keep_outputs` or `output_profile`, if 
+        given) are copied to `sim_dir`. Each file is copied to a temporary 
+        name which is then renamed, so no partial files are seen in `sim_dir`.
+        The temporary directory is always removed, also if the simulation fails.
+        If `runsim` raises an exception, for example a `subprocess.TimeoutExpired`,
+        the .err and .end files written so far are copied to `sim_dir` first.
+        `EPResult.files` holds the filepaths in `sim_dir`.
+        Default is None.
+    :type scratch_dir: str
+    
+    :param run_periods: If given, the run periods to simulate in place of the 
+        'RunPeriod' objects of the input file, for example the representative
+        periods returned by `get_representative_periods`. A copy of the input 
+        file is written to the simulation directory as for `output_variables`.
+        See `set_run_periods`.
+        Default is None.
+    :type run_periods: list (dict)
+    
+    :param kwargs: Keyword arguments which are passed to `subprocess.Popen`.
+        The `subprocess.run` keyword arguments `timeout`, `input` and `check`
+        are also accepted and work as for `subprocess.run`, and 
+        `capture_output` is ignored as the output is always captured.
+        Other `subprocess.run` keyword arguments, such as `text`, are not 
+        supported.
+    
     :returns: A EPResult object which contains the returncode, stdout and a 
         dictionary of the results files.
     :rtype: EPResult
@@ -128,55 +240,1226 @@ def runsim(
     epw_absolute_filepath=os.path.abspath(epw_filepath)
     sim_absolute_dir=os.path.abspath(sim_dir)
     
-    # get EnergyPlus exe filepath
-    ep_exe=r'%s\EnergyPlus' % ep_dir
-    
-    # create the Command Prompt string to run EnergyPlus
-    st='"%s" %s%s%s%s%s%s--output-prefix %s --output-suffix %s --output-directory "%s" --weather "%s" "%s"' % (ep_exe,
-                                            '--annual ' if annual else '',
-                                            '--convert ' if convert else '',
-                                            '--design-day ' if design_day else '',
-                                            '--epmacro ' if epmacro else '',
-                                            '--expandobjects ' if expand_objects else '',
-                                            '--readvars ' if readvars else '',
-                                            output_prefix,
-                                            output_suffix,
-                                            sim_absolute_dir,
-                                            epw_absolute_filepath,
-                                            input_absolute_filepath
-                                            )
+    # write a copy of the input file with the given run periods
+    if not run_periods is None:
+        os.makedirs(sim_absolute_dir,exist_ok=True)
+        fp=os.path.join(sim_absolute_dir,
+                        '%sin%s' % (output_prefix,os.path.splitext(input_absolute_filepath)[1]))
+        set_run_periods(input_absolute_filepath,
+                        fp,
+                        run_periods)
+        input_absolute_filepath=fp
+    
+    # write a copy of the input file with only the needed output variables
+    output_pruning=None
+    if not output_variables is None:
+        os.makedirs(sim_absolute_dir,exist_ok=True)
+        fp=os.path.join(sim_absolute_dir,
+                        '%sin%s' % (output_prefix,os.path.splitext(input_absolute_filepath)[1]))
+        output_pruning=prune_output_variables(input_absolute_filepath,
+                                              fp,
+                                              output_variables,
+                                              output_frequency)
+        input_absolute_filepath=fp
+        
+    # write a copy of the input file which requests only the output files to keep
+    if not output_profile is None or not keep_outputs is None:
+        if not output_profile is None and not output_profile in _output_profiles:
+            raise ValueError('Invalid output_profile: %s' % output_profile)
+        keep_outputs=set(_output_profiles.get(output_profile,())).union(keep_outputs or (),('err','end'))
+        os.makedirs(sim_absolute_dir,exist_ok=True)
+        fp=os.path.join(sim_absolute_dir,
+                        '%sin%s' % (output_prefix,os.path.splitext(input_absolute_filepath)[1]))
+        _set_output_control(input_absolute_filepath,
+                            fp,
+                            keep_outputs,
+                            ep_dir)
+        input_absolute_filepath=fp
+    
+    # create a temporary directory to run EnergyPlus in
+    if scratch_dir is None:
+        run_dir=sim_absolute_dir
+    else:
+        os.makedirs(scratch_dir,exist_ok=True)
+        run_dir=tempfile.mkdtemp(prefix='eprun-',dir=scratch_dir)
+    
+    # get the arguments to run EnergyPlus
+    args=_get_runsim_args(input_absolute_filepath,
+                          epw_absolute_filepath,
+                          ep_dir,
+                          run_dir,
+                          annual,
+                          convert,
+                          design_day,
+                          epmacro,
+                          expand_objects,
+                          output_prefix,
+                          output_suffix,
+                          readvars)
     
     # print_call
-    if print_call: print(st)
+    if print_call: print(subprocess.list2cmdline(args))
     
     # get simulation start time in seconds since the epoch
     simulation_start_time=time.time()
+    start=time.perf_counter()
+    
+    # look up the simulation in the cache
+    if not cache is None:
+        key=cache._get_key(input_absolute_filepath,
+                           epw_absolute_filepath,
+                           ep_dir,
+                           [annual,convert,design_day,epmacro,expand_objects,
+                            output_prefix,output_suffix,readvars]
+                           +([] if keep_outputs is None else [sorted(keep_outputs)]))
+        result=cache._get(key)
+        if not result is None:
+            if not run_dir==sim_absolute_dir:
+                shutil.rmtree(run_dir,ignore_errors=True)
+            result._wall_time=time.perf_counter()-start
+            result._start_time=simulation_start_time
+            result._output_pruning=output_pruning
+            return result
+        
+    # run EnergyPlus simulation using subprocess.Popen
+    if fail_fast is True:
+        fail_fast=lambda message_type,message: message_type in ('severe','fatal')
+    if fail_fast:
+        err_filepath=os.path.join(run_dir,
+                                  '%s%s.err' % (output_prefix,
+                                                _output_suffixes[output_suffix.upper()]['normal']))
+    else:
+        err_filepath=None
+    try:
+        returncode,stdout,fail_fast_message,rusage=_run_and_monitor(args,
+                                                                    progress_callback,
+                                                                    err_filepath,
+                                                                    fail_fast,
+                                                                    simulation_start_time,
+                                                                    **kwargs)
+        
+        # set up the return object
+        result=_get_epresult(returncode,
+                             stdout,
+                             run_dir,
+                             _get_output_filenames(output_prefix,
+                                                   output_suffix,
+                                                   input_absolute_filepath,
+                                                   convert),
+                             simulation_start_time,
+                             time.perf_counter()-start,
+                             rusage)
+        result._fail_fast_message=fail_fast_message
+        result._output_pruning=output_pruning
+        
+        # delete the output files which are not kept
+        if not keep_outputs is None:
+            for k in list(result._files):
+                if not k in keep_outputs and not k in ('idf','epJSON'): # not the converted input file
+                    for extension,x in _get_output_filenames(output_prefix,output_suffix):
+                        if extension==k:
+                            try:
+                                os.remove(os.path.join(run_dir,x))
+                            except OSError:
+                                pass
+                    del result._files[k]
+                    del result._file_sizes[k]
+                    
+        # copy the output files from the temporary directory
+        if not run_dir==sim_absolute_dir:
+            _copy_output_files(result,run_dir,sim_absolute_dir)
+            result._wall_time=time.perf_counter()-start
+    except BaseException:
+        # keep the diagnostic files of a simulation which did not finish
+        if not run_dir==sim_absolute_dir:
+            try:
+                _copy_output_files(None,
+                                   run_dir,
+                                   sim_absolute_dir,
+                                   [x for extension,x in _get_output_filenames(output_prefix,output_suffix)
+                                    if extension in ('err','end')])
+            except OSError: # the original exception is raised
+                pass
+        raise
+    finally:
+        if not run_dir==sim_absolute_dir:
+            shutil.rmtree(run_dir,ignore_errors=True)
+    
+    # add the results to the cache
+    if not cache is None:
+        cache._put(key,result)
         
-    # run EnergyPlus simulation using subprocess.run
-    result=subprocess.run(st,capture_output=True,**kwargs)
+    return result
+    
+    
+def _copy_output_files(epresult,
+                       run_dir,
+                       sim_dir,
+                       filenames=None):
+    """Copies the files written by a simulation to the simulation directory.
+    
+    Each file is copied to a temporary file in `sim_dir` which is then renamed,
+    so that other processes never see a partially copied file. The filepaths 
+    in `epresult.files` are changed to the copied files.
+    
+    :param epresult: The results of the simulation, or None.
+    :type epresult: EPResult
+    :param run_dir: The directory in which EnergyPlus was run.
+    :type run_dir: str
+    :param sim_dir: The simulation directory.
+    :type sim_dir: str
+    :param filenames: If given, only the files with these names are copied.
+    :type filenames: list (str)
+    
+    """
+    os.makedirs(sim_dir,exist_ok=True)
+    for x in os.listdir(run_dir):
+        fp=os.path.join(run_dir,x)
+        if not os.path.isfile(fp) or (not filenames is None and not x in filenames):
+            continue
+        temp_fp=os.path.join(sim_dir,'.%s.%s.tmp' % (x,os.getpid()))
+        shutil.copyfile(fp,temp_fp)
+        os.replace(temp_fp,os.path.join(sim_dir,x))
+    if not epresult is None:
+        epresult._files={k:os.path.join(sim_dir,os.path.basename(v)) 
+                         for k,v in epresult._files.items()}
+    
+    
+def _run_and_monitor(args,
+                     progress_callback=None,
+                     err_filepath=None,
+                     fail_fast=None,
+                     simulation_start_time=None,
+                     timeout=None,
+                     poll_interval=0.1,
+                     input=None,
+                     check=False,
+                     capture_output=True,
+                     _process_callback=None,
+                     **kwargs):
+    """Runs EnergyPlus and monitors its stdout and .err file while it runs.
+    
+    :param args: The EnergyPlus command line arguments.
+    :type args: list (str)
+    :param progress_callback: If given, the function called with the progress 
+        dictionary of each line of stdout.
+    :type progress_callback: function
+    :param err_filepath: If given, the filepath of the .err file to read while 
+        the simulation runs.
+    :type err_filepath: str
+    :param fail_fast: The function called for the messages in the .err file.
+        See `runsim`.
+    :type fail_fast: function
+    :param simulation_start_time: The start time of the simulation in seconds 
+        since the epoch. An .err file last modified before this time is left 
+        over from a previous simulation and is not read.
+    :type simulation_start_time: float
+    :param timeout: If given, the maximum time in seconds for the simulation.
+        If this is exceeded the EnergyPlus process is killed and a 
+        `subprocess.TimeoutExpired` exception is raised, as for `subprocess.run`.
+    :type timeout: float
+    :param poll_interval: The time in seconds between reads of the .err file.
+    :type poll_interval: float
+    :param input: If given, the bytes written to the stdin of the process, as 
+        for `subprocess.run`.
+    :type input: bytes
+    :param check: If True and the process exits with a non-zero returncode, a
+        `subprocess.CalledProcessError` exception is raised, as for `subprocess.run`.
+    :type check: bool
+    :param capture_output: Accepted for compatibility with `subprocess.run`. 
+        The stdout and stderr are always captured.
+    :type capture_output: bool
+    :param _process_callback: If given, the function called with the 
+        `subprocess.Popen` object when the process has started. This is used
+        by `arunsim` to kill the process when its task is cancelled.
+    :type _process_callback: function
+    :param kwargs: Keyword arguments passed to `subprocess.Popen`.
+    
+    :returns: A tuple of (returncode, stdout, fail_fast_message, rusage), where
+        `fail_fast_message` is the .err file message which matched `fail_fast`, 
+        or None, and `rusage` is the resource usage of the process, if available.
+        See `_wait_process`.
+    :rtype: tuple
+    
+    """
+    if not input is None:
+        kwargs['stdin']=subprocess.PIPE
+    process=subprocess.Popen(args,
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             **kwargs)
+    if not _process_callback is None:
+        _process_callback(process)
+    
+    # stderr is read in a thread so that the process is not blocked if the pipe fills
+    stderr=[]
+    threads=[threading.Thread(target=lambda: stderr.append(process.stderr.read()),daemon=True)]
+    
+    # the input is written in a thread so that stdout is read at the same time
+    if not input is None:
+        
+        def write_input():
+            try:
+                process.stdin.write(input)
+                process.stdin.close()
+            except OSError: # for example the process has exited
+                pass
+            
+        threads.append(threading.Thread(target=write_input,daemon=True))
+    
+    # the .err file is read in a thread until the process exits
+    finished=threading.Event()
+    fail_fast_messages=[]
+    if not err_filepath is None:
+        
+        def tail_err():
+            for message_type,message in _tail_err(err_filepath,
+                                                  simulation_start_time,
+                                                  finished,
+                                                  poll_interval):
+                if fail_fast(message_type,message):
+                    fail_fast_messages.append(message)
+                    process.terminate()
+                    break
+        
+        threads.append(threading.Thread(target=tail_err,daemon=True))
+        
+    for thread in threads:
+        thread.start()
+    
+    timed_out=threading.Event()
+    
+    def kill():
+        timed_out.set()
+        process.kill()
+    
+    timer=None
+    if not timeout is None:
+        timer=threading.Timer(timeout,kill)
+        timer.start()
+    
+    try:
+        lines=[]
+        progress={}
+        start=time.perf_counter()
+        for line in process.stdout:
+            line=line.decode()
+            lines.append(line)
+            if not progress_callback is None:
+                progress=_get_progress(line,progress,time.perf_counter()-start)
+                progress_callback({k:v for k,v in progress.items() if not k.startswith('_')})
+        returncode,rusage=_wait_process(process)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        finished.set()
+        if not timer is None:
+            timer.cancel()
+        for thread in threads:
+            thread.join()
+        process.stdout.close()
+        process.stderr.close()
+    
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(args,timeout,output=''.join(lines).encode())
+    if check and returncode:
+        raise subprocess.CalledProcessError(returncode,
+                                            args,
+                                            output=''.join(lines).encode(),
+                                            stderr=b''.join(stderr))
+    
+    return (returncode,
+            ''.join(lines),
+            fail_fast_messages[0] if fail_fast_messages else None,
+            rusage)
+
+
+def _wait_process(process):
+    """Waits for a process to exit and returns its resource usage.
+    
+    On Linux and macOS `os.wait4` is used to get the resource usage of the 
+    process. On other platforms the resource usage is not available.
+    
+    :param process: The process.
+    :type process: subprocess.Popen
+    
+    :returns: A tuple of (returncode, rusage), where `rusage` is a 
+        `resource.struct_rusage` or None.
+    :rtype: tuple
+    
+    """
+    if not hasattr(os,'wait4'):
+        return process.wait(),None
+    while True:
+        try:
+            pid,status,rusage=os.wait4(process.pid,0)
+            break
+        except InterruptedError:
+            continue
+        except ChildProcessError: # the process has already been waited on
+            return process.wait(),None
+    if os.WIFSIGNALED(status):
+        process.returncode=-os.WTERMSIG(status)
+    else:
+        process.returncode=os.WEXITSTATUS(status)
+    return process.returncode,rusage
+
+
+def _tail_err(fp,
+              simulation_start_time,
+              finished,
+              poll_interval=0.1):
+    """Reads the messages in an .err file while it is being written.
+    
+    The file is read until `finished` is set, and then read once more to 
+    the end of the file.
+    
+    :param fp: The filepath of the .err file.
+    :type fp: str
+    :param simulation_start_time: An .err file last modified before this time 
+        (in seconds since the epoch) is not read.
+    :type simulation_start_time: float
+    :param finished: An event which is set when the simulation has finished.
+    :type finished: threading.Event
+    :param poll_interval: The time in seconds between reads of the file.
+    :type poll_interval: float
+    
+    :returns: A generator of (message_type, message) tuples, given for each new
+        message and again after each continuation line of the message. 
+        See `_get_err_line_type` for the message types.
+    :rtype: generator
+    
+    """
+    offset=0
+    rest=b'' # an incomplete last line
+    message_type=None
+    message=None
+    while True:
+        last_read=finished.is_set()
+        try:
+            st=os.stat(fp)
+        except OSError: # the file has not been created yet
+            st=None
+        if not st is None and st.st_mtime>=simulation_start_time:
+            if st.st_size<offset: # the file has been truncated
+                offset=0
+                rest=b''
+            if st.st_size>offset:
+                with open(fp,'rb') as f:
+                    f.seek(offset)
+                    b=f.read()
+                offset+=len(b)
+                lines=(rest+b).split(b'\n')
+                rest=lines.pop()
+                for line in lines:
+                    line=line.decode(errors='replace')
+                    x=_get_err_line_type(line)
+                    if x=='continuation':
+                        if message is None:
+                            continue
+                        message+=' ' + line[17:].strip()
+                    elif x is None:
+                        continue
+                    else:
+                        message_type=x
+                        message=line[17:].strip()
+                    yield message_type,message
+        if last_read:
+            break
+        finished.wait(poll_interval)
+    
+    
+def _get_progress(line,
+                  previous_progress,
+                  elapsed):
+    """Returns the progress of an EnergyPlus simulation after a line of stdout.
+    
+    The percent complete is estimated from the dates in the 'Starting Simulation at' 
+    and 'Continuing Simulation at' lines of a weather file run period, assuming 
+    that the run period ends on 31 December. The ETA is the estimated time 
+    in seconds until the current run period is complete.
+    
+    :param line: The line of stdout.
+    :type line: str
+    :param previous_progress: The progress after the previous line, or an 
+        empty dictionary for the first line.
+    :type previous_progress: dict
+    :param elapsed: The time in seconds since the simulation started.
+    :type elapsed: float
+    
+    :returns: A dictionary with keys:
+        - 'line': the line of stdout.
+        - 'stage': one of 'starting', 'sizing', 'warmup', 'simulation', 
+          'reporting' or 'finished'.
+        - 'environment': the title of the current simulation environment, or None.
+        - 'date': the current simulation date as 'MM/DD', or None.
+        - 'percent': the percent complete of the current run period, or None.
+        - 'elapsed': the time in seconds since the simulation started.
+        - 'eta': the estimated time in seconds until the run period is complete, or None.
+        
+        Keys starting with an underscore hold the state used for the next line.
+    :rtype: dict
+    
+    """
+    progress={'stage':'starting',
+              'environment':None,
+              'date':None,
+              'percent':None,
+              'eta':None,
+              '_start_day':None,
+              '_start_elapsed':None}
+    progress.update(previous_progress)
+    progress['line']=line.strip()
+    progress['elapsed']=elapsed
+    
+    x=progress['line']
+    if x.startswith('Warming up'):
+        progress['stage']='warmup'
+    elif x.startswith('Performing Zone Sizing') or x.startswith('Calculating System sizing'):
+        progress['stage']='sizing'
+    elif x.startswith('Starting Simulation at') or x.startswith('Continuing Simulation at'):
+        date,environment=x.split(' at ',1)[1].split(' for ',1)
+        date=date.split('/')
+        day=datetime.date(2001,int(date[0]),int(date[1])).timetuple().tm_yday
+        progress['stage']='simulation'
+        progress['date']='%s/%s' % (date[0],date[1])
+        if x.startswith('Starting') or not environment==progress['environment']:
+            progress['environment']=environment
+            progress['percent']=None
+            progress['eta']=None
+            progress['_start_day']=day if len(date)==3 else None # a weather file run period
+            progress['_start_elapsed']=elapsed
+        if not progress['_start_day'] is None:
+            fraction=(day-progress['_start_day'])/(366-progress['_start_day'])
+            progress['percent']=100*fraction
+            if fraction>0:
+                progress['eta']=(elapsed-progress['_start_elapsed'])*(1-fraction)/fraction
+    elif x.startswith('Writing tabular output') or x.startswith('Writing final SQL'):
+        progress['stage']='reporting'
+        if not progress['_start_day'] is None:
+            progress['percent']=100.0
+            progress['eta']=0.0
+    elif x.startswith('EnergyPlus Completed') or x.startswith('EnergyPlus Terminated'):
+        progress['stage']='finished'
+        
+    return progress
+    
+    
+def _get_runsim_args(input_absolute_filepath,
+                     epw_absolute_filepath,
+                     ep_dir,
+                     sim_absolute_dir,
+                     annual=False,
+                     convert=False,
+                     design_day=False,
+                     epmacro=False,
+                     expand_objects=False,
+                     output_prefix='eplus',
+                     output_suffix='L',
+                     readvars=False):
+    """Returns the list of arguments to run EnergyPlus from the command line.
+    
+    See `runsim` for the parameters.
+    
+    :rtype: list (str)
     
-    # get outputs
-    returncode=result.returncode
-    stdout=result.stdout.decode()
+    """
+    # get EnergyPlus exe filepath
+    # - on Windows, a batch file wrapper is used if there is no 'energyplus.exe'
+    ep_exe=os.path.join(ep_dir,'energyplus')
+    if os.name=='nt' and not os.path.isfile(ep_exe+'.exe'):
+        for x in ('.bat','.cmd'):
+            if os.path.isfile(ep_exe+x):
+                ep_exe+=x
+                break
+    
+    args=[ep_exe]
+    if annual: args.append('--annual')
+    if convert: args.append('--convert')
+    if design_day: args.append('--design-day')
+    if epmacro: args.append('--epmacro')
+    if expand_objects: args.append('--expandobjects')
+    if readvars: args.append('--readvars')
+    args.extend(['--output-prefix',output_prefix,
+                 '--output-suffix',output_suffix,
+                 '--output-directory',sim_absolute_dir,
+                 '--weather',epw_absolute_filepath,
+                 input_absolute_filepath])
+    
+    return args
+    
+    
+# the output file name suffixes for each EnergyPlus --output-suffix option
+# - the keys of the inner dictionaries are used in `_get_output_filenames`
+_output_suffixes={'L':{'normal':'out','table':'tbl','meter':'mtr','map':'map',
+                       'zsz':'zsz','ssz':'ssz','screen':'screen','sqlite':'sqlite'},
+                  'C':{'normal':'','table':'Table','meter':'Meter','map':'Map',
+                       'zsz':'Zsz','ssz':'Ssz','screen':'Screen','sqlite':'Sqlite'},
+                  'D':{'normal':'','table':'-table','meter':'-meter','map':'-map',
+                       'zsz':'-zsz','ssz':'-ssz','screen':'-screen','sqlite':'-sqlite'}}
+
+# the output files which EnergyPlus may write, as (suffix,extension) tuples
+# - if more than one file has the same extension, the first one written is
+#   used in `EPResult.files`
+_output_files=(tuple(('normal',x) for x in ('audit','bnd','csv','dbg','dfs','dxf','edd','eio',
+                                            'end','epmdet','epmidf','err','eso','expidf',
+                                            'glhe','iperr','json','mdd','mtd','mtr','rdd',
+                                            'rvaudit','sci','shd','sln','sql','svg','wrl'))
+               +tuple(('table',x) for x in ('csv','htm','tab','txt','xml'))
+               +(('meter','csv'),
+                 ('map','csv'),
+                 ('map','tab'),
+                 ('map','txt'),
+                 ('zsz','csv'),
+                 ('ssz','csv'),
+                 ('screen','csv'),
+                 ('sqlite','err')))
+
+
+def _get_output_filenames(output_prefix='eplus',
+                          output_suffix='L',
+                          input_filepath=None,
+                          convert=False):
+    """Returns the names of the output files which an EnergyPlus simulation may write.
+    
+    The names are based on the EnergyPlus naming rules for the `--output-prefix`
+    and `--output-suffix` arguments. See `runsim` for the parameters.
+    
+    :returns: A list of (extension, filename) tuples.
+    :rtype: list (tuple)
+    
+    """
+    suffixes=_output_suffixes[output_suffix.upper()]
+    result=[(extension,'%s%s.%s' % (output_prefix,suffixes[suffix],extension))
+            for suffix,extension in _output_files]
+    if convert and not input_filepath is None: # the converted input file
+        name,extension=os.path.splitext(os.path.basename(input_filepath))
+        extension='idf' if extension.lower()=='.epjson' else 'epJSON'
+        result.append((extension,'%s.%s' % (name,extension)))
+    return result
+
+
+def _get_epresult(returncode,
+                  stdout,
+                  sim_absolute_dir,
+                  output_filenames,
+                  simulation_start_time,
+                  wall_time,
+                  rusage=None):
+    """Returns the EPResult of a finished EnergyPlus simulation.
+    
+    :param returncode: The returncode of the EnergyPlus process.
+    :type returncode: int
+    :param stdout: The stdout of the EnergyPlus process.
+    :type stdout: str
+    :param sim_absolute_dir: The directory which holds the simulation files.
+    :type sim_absolute_dir: str
+    :param output_filenames: The output files which the simulation may write,
+        as returned by `_get_output_filenames`.
+    :type output_filenames: list (tuple)
+    :param simulation_start_time: The start time of the simulation in seconds 
+        since the epoch.
+    :type simulation_start_time: float
+    :param wall_time: The elapsed time of the simulation in seconds.
+    :type wall_time: float
+    :param rusage: The resource usage of the EnergyPlus process, if available.
+    :type rusage: resource.struct_rusage
     
-    # get files in sim_dir which were modified (or created) after the simulation start time
+    :rtype: EPResult
+    
+    """
+    # get the output files which were modified (or created) after the simulation start time
     files={}
-    for fp in os.listdir(sim_absolute_dir):
+    file_sizes={}
+    for extension,fp in output_filenames:
+        if extension in files:
+            continue
         afp=os.path.join(sim_absolute_dir,fp)
-        extension=os.path.splitext(fp)[1][1:]
-        modified_time=os.path.getmtime(afp)
-        if modified_time>simulation_start_time:
+        try:
+            st=os.stat(afp)
+        except OSError: # the file was not written
+            continue
+        if st.st_mtime>simulation_start_time:
             files[extension]=afp
+            file_sizes[extension]=st.st_size
     
     # set up the return object
     result=EPResult()
     result._returncode=returncode
     result._stdout=stdout
     result._files=files
+    result._file_sizes=file_sizes
+    result._wall_time=wall_time
+    result._start_time=simulation_start_time
+    result._predicted_time=None
+    result._cache_hit=False
+    result._fail_fast_message=None
+    result._exception=None
+    result._bytes_written=sum(file_sizes.values())
+    result._output_pruning=None
+    if rusage is None:
+        result._user_time=None
+        result._system_time=None
+        result._peak_rss=None
+    else:
+        result._user_time=rusage.ru_utime
+        result._system_time=rusage.ru_stime
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        result._peak_rss=rusage.ru_maxrss*(1 if sys.platform=='darwin' else 1024)
+    
+    return result
+    
+    
+def _get_failed_epresult(exception,
+                         simulation_start_time,
+                         wall_time):
+    """Returns the EPResult of a simulation for which `runsim` raised an exception.
+    
+    :param exception: The exception.
+    :type exception: Exception
+    :param simulation_start_time: The start time of the simulation in seconds 
+        since the epoch.
+    :type simulation_start_time: float
+    :param wall_time: The elapsed time until the exception in seconds.
+    :type wall_time: float
+    
+    :returns: An EPResult with a `returncode` of None and no files.
+    :rtype: EPResult
+    
+    """
+    result=_get_epresult(None,
+                         '',
+                         None,
+                         [],
+                         simulation_start_time,
+                         wall_time)
+    result._exception=exception
+    return result
+
+
+def _run_batch_job(kwargs):
+    """Runs a job of a batch of simulations.
+    
+    :param kwargs: The keyword arguments to `runsim`.
+    :type kwargs: dict
+    
+    :returns: The EPResult of the simulation. If `runsim` raises an exception,
+        it is stored in `EPResult.exception` rather than raised, so that it 
+        does not stop the other jobs of the batch.
+    :rtype: EPResult
+    
+    """
+    simulation_start_time=time.time()
+    start=time.perf_counter()
+    try:
+        return runsim(**kwargs)
+    except Exception as err:
+        return _get_failed_epresult(err,
+                                    simulation_start_time,
+                                    time.perf_counter()-start)
+
+
+def _cancel_futures(executor,futures):
+    """Cancels the futures which have not started and shuts down the executor.
+    
+    The executor waits for the futures which are running to finish.
+    
+    :param executor: The executor.
+    :type executor: concurrent.futures.Executor
+    :param futures: The futures submitted to the executor.
+    :type futures: iterable (concurrent.futures.Future)
+    
+    """
+    for future in futures:
+        future.cancel()
+    executor.shutdown(wait=True)
+
+
+def _get_batch_job_kwargs(jobs,kwargs):
+    """Returns the keyword arguments to `runsim` of each job in a batch.
+    
+    The simulation directory of each job is created if it does not exist. 
+    See `iter_runsim_batch` for the parameters.
+    
+    :rtype: list (dict)
+    
+    """
+    kwargs=dict(kwargs)
+    parent_sim_dir=kwargs.pop('sim_dir','.')
+    result=[]
+    for i,job in enumerate(jobs):
+        x=dict(kwargs)
+        x.update(job)
+        if not 'sim_dir' in job:
+            x['sim_dir']=os.path.join(parent_sim_dir,str(i))
+        os.makedirs(x['sim_dir'],exist_ok=True)
+        result.append(x)
+    return result
+
+
+def _get_batch_max_workers(max_workers):
+    """Returns the number of simulations of a batch to run at the same time.
+    
+    :param max_workers: The requested number, or None for the number of CPU cores.
+    :type max_workers: int
+    
+    :rtype: int
+    
+    """
+    cpu_count=os.cpu_count() or 1
+    return cpu_count if max_workers is None else max(min(max_workers,cpu_count),1)
+    
+    
+def iter_runsim_batch(jobs,
+                      max_workers=None,
+                      predictor=None,
+                      **kwargs):
+    """Runs a batch of EnergyPlus simulations concurrently and yields the results as they finish.
+    
+    Each simulation runs in its own EnergyPlus process. At most `max_workers` 
+    processes run at the same time.
+    
+    :param jobs: The simulations to run. Each job is a dictionary of keyword 
+        arguments to `runsim`, for example {'input_filepath':'1.idf',
+        'epw_filepath':'1.epw'}.
+    :type jobs: list (dict)
+    :param max_workers: The maximum number of simulations to run at the same time.
+        Default is None, which is the number of CPU cores. Values greater than 
+        the number of CPU cores are reduced to the number of CPU cores.
+    :type max_workers: int
+    :param predictor: If given, the runtime of each job is predicted and the jobs
+        are started in order of longest predicted runtime first, which reduces
+        the time for the batch to finish. The predicted runtimes are stored in 
+        `EPResult.predicted_time` and the measured runtimes of successful jobs
+        are added to the history of the predictor.
+    :type predictor: EPRuntimePredictor
+    :param kwargs: Keyword arguments to `runsim` which are used for all jobs,
+        for example `ep_dir`. Values in the job dictionaries take precedence.
+        If a job has no 'sim_dir', it is run in a subdirectory of the `sim_dir`
+        keyword argument (default '.') named after the index of the job, 
+        so that each job has its own simulation directory.
+    
+    :returns: A generator of (index, EPResult) tuples, where `index` is the 
+        index of the job in `jobs`, in the order in which the simulations finish.
+        If `runsim` raises an exception for a job, for example a 
+        `subprocess.TimeoutExpired` or an error in the input filepath, the 
+        EPResult of the job has a `returncode` of None and the exception in 
+        `EPResult.exception`. If the generator is closed early or interrupted,
+        the jobs which have not started are cancelled and the running 
+        simulations are waited for.
+    :rtype: generator
+    
+    """
+    max_workers=_get_batch_max_workers(max_workers)
+    job_kwargs=_get_batch_job_kwargs(jobs,kwargs)
+    
+    # the order to start the jobs, longest predicted runtime first
+    order=list(range(len(job_kwargs)))
+    if not predictor is None:
+        features=[predictor.get_features(**x) for x in job_kwargs]
+        predicted_times=[predictor.predict(x) for x in features]
+        order.sort(key=lambda i: -predicted_times[i])
+    
+    # the EnergyPlus processes run outside of Python, so the simulations are 
+    # started and waited on from a pool of threads
+    # - the executor starts the jobs in the order they are submitted
+    executor=concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    futures={executor.submit(_run_batch_job,job_kwargs[i]):i for i in order}
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            i=futures[future]
+            epresult=future.result()
+            if not predictor is None:
+                epresult._predicted_time=predicted_times[i]
+                if epresult.returncode==0 and not epresult._cache_hit:
+                    predictor.add_run(features[i],epresult.wall_time)
+            yield i, epresult
+    finally:
+        _cancel_futures(executor,futures)
+        if not predictor is None:
+            predictor.save()
+    
+    
+def runsim_batch(jobs,
+                 max_workers=None,
+                 callback=None,
+                 **kwargs):
+    """Runs a batch of EnergyPlus simulations concurrently.
+    
+    See `iter_runsim_batch` for the parameters.
+    
+    :param callback: If given, a function which is called with the arguments
+        (index, EPResult) as each simulation finishes.
+    :type callback: function
+    
+    :returns: A list of EPResult objects, one for each job in the same order as `jobs`.
+        Jobs for which `runsim` raised an exception have a `returncode` of None,
+        see `iter_runsim_batch`.
+    :rtype: list (EPResult)
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> from eprun import runsim_batch
+       >>> jobs=[{'input_filepath':'1ZoneUncontrolled.idf',
+       >>>        'epw_filepath':epw} 
+       >>>       for epw in ['USA_CO_Golden-NREL.724666_TMY3.epw',
+       >>>                   'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw']]
+       >>> epresults=runsim_batch(jobs,
+       >>>                        ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                        sim_dir='simulation_files')
+       >>> print([x.returncode for x in epresults])
+       [0, 0]
+    
+    """
+    jobs=list(jobs)
+    result=[None]*len(jobs)
+    for i,epresult in iter_runsim_batch(jobs,max_workers,**kwargs):
+        result[i]=epresult
+        if not callback is None:
+            callback(i,epresult)
+    return result
+    
+    
+def iter_runsim_pipeline(jobs,
+                         postprocess,
+                         max_workers=None,
+                         postprocess_workers=1,
+                         max_pending=None,
+                         delete_files=False,
+                         **kwargs):
+    """Runs a batch of EnergyPlus simulations and postprocesses the results of each simulation as soon as it finishes.
+    
+    The simulations run as for `iter_runsim_batch`. When a simulation finishes,
+    its EPResult is passed to the `postprocess` function in a second pool of
+    threads, while the other simulations continue to run. The time to run and 
+    postprocess the batch is then close to the longer of the two, rather than 
+    their sum.
+    
+    :param jobs: The simulations to run. See `iter_runsim_batch`.
+    :type jobs: list (dict)
+    :param postprocess: A function which is called with the EPResult of each
+        simulation, for example to read variables from the .eso file and return 
+        a summary. The returned values are yielded by the generator. If `runsim`
+        raised an exception for a job, its EPResult has a `returncode` of None,
+        see `iter_runsim_batch`.
+    :type postprocess: function
+    :param max_workers: The maximum number of simulations to run at the same time.
+        See `iter_runsim_batch`.
+    :type max_workers: int
+    :param postprocess_workers: The number of threads which run `postprocess`.
+    :type postprocess_workers: int
+    :param max_pending: The maximum number of finished simulations waiting to
+        be postprocessed. When this is reached, no further simulations start 
+        until a postprocessing finishes. This limits the disk space used by the
+        output files when postprocessing is slower than the simulations. 
+        Default is None, which is two times `postprocess_workers`.
+    :type max_pending: int
+    :param delete_files: If True, the output files of each simulation are deleted
+        after it is postprocessed. If a list of file extensions, for example
+        ['eso','sql'], only these output files are deleted. Results returned from
+        an EPCache are never deleted.
+    :type delete_files: bool or list (str)
+    :param kwargs: Keyword arguments to `runsim` which are used for all jobs.
+        See `iter_runsim_batch`.
+    
+    :returns: A generator of (index, value) tuples, where `index` is the 
+        index of the job in `jobs` and `value` is the value returned by 
+        `postprocess`, in the order in which the postprocessing finishes.
+        An exception raised by `postprocess` is raised by the generator. If the
+        generator is closed early, interrupted or raises an exception, the jobs 
+        which have not started are cancelled and the running simulations and 
+        postprocessing are waited for.
+    :rtype: generator
     
+    """
+    max_workers=_get_batch_max_workers(max_workers)
+    job_kwargs=_get_batch_job_kwargs(jobs,kwargs)
+    if max_pending is None:
+        max_pending=2*postprocess_workers
+    
+    # a slot is taken when a simulation starts and given back when its 
+    # postprocessing finishes
+    slots=threading.Semaphore(max_workers+max_pending)
+    finished=collections.deque()
+    finished_condition=threading.Condition()
+    stopped=threading.Event() # set when the generator exits
+    
+    def put_finished(i,future):
+        with finished_condition:
+            finished.append((i,future))
+            finished_condition.notify()
+    
+    def simulate(i):
+        slots.acquire()
+        if stopped.is_set():
+            return None
+        try:
+            return _run_batch_job(job_kwargs[i])
+        except BaseException:
+            slots.release()
+            raise
+    
+    def run_postprocess(epresult):
+        try:
+            value=postprocess(epresult)
+            if delete_files and not epresult._cache_hit:
+                for k,fp in epresult.files.items():
+                    if delete_files is True or k in delete_files:
+                        try:
+                            os.remove(fp)
+                        except OSError:
+                            pass
+            return value
+        finally:
+            slots.release()
+    
+    def submit_postprocess(i,future):
+        if stopped.is_set() or future.cancelled():
+            return
+        elif not future.exception() is None:
+            put_finished(i,future)
+        else:
+            postprocess_future=postprocess_executor.submit(run_postprocess,future.result())
+            postprocess_future.add_done_callback(lambda f: put_finished(i,f))
+    
+    postprocess_executor=concurrent.futures.ThreadPoolExecutor(max_workers=postprocess_workers)
+    executor=concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    futures=[]
+    try:
+        for i in range(len(job_kwargs)):
+            future=executor.submit(simulate,i)
+            future.add_done_callback(lambda f,i=i: submit_postprocess(i,f))
+            futures.append(future)
+        for _ in range(len(job_kwargs)):
+            with finished_condition:
+                while not finished:
+                    finished_condition.wait()
+                i,future=finished.popleft()
+            yield i, future.result()
+    finally:
+        # the simulations waiting for a slot are woken up and return, then the
+        # simulation executor is shut down first, as it submits to the 
+        # postprocess executor
+        stopped.set()
+        for _ in range(max_workers):
+            slots.release()
+        _cancel_futures(executor,futures)
+        postprocess_executor.shutdown(wait=True)
+            
+            
+def runsim_pipeline(jobs,
+                    postprocess,
+                    max_workers=None,
+                    **kwargs):
+    """Runs a batch of EnergyPlus simulations and postprocesses the results of each simulation as soon as it finishes.
+    
+    See `iter_runsim_pipeline` for the parameters.
+    
+    :returns: A list of the values returned by `postprocess`, one for each job 
+        in the same order as `jobs`.
+    :rtype: list
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> from eprun import runsim_pipeline
+       >>> def get_kpis(epresult):
+       >>>     eso=epresult.get_eso()
+       >>>     return eso.get_environment('RUN PERIOD 1').get_interval_summary()
+       >>> kpis=runsim_pipeline(jobs,
+       >>>                      get_kpis,
+       >>>                      ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                      sim_dir='simulation_files',
+       >>>                      delete_files=['eso'])
+    
+    """
+    jobs=list(jobs)
+    result=[None]*len(jobs)
+    for i,value in iter_runsim_pipeline(jobs,postprocess,max_workers,**kwargs):
+        result[i]=value
     return result
     
     
+def get_resource_usage(epresults):
+    """Returns the resources used by a batch of simulations.
+    
+    :param epresults: The results of the simulations, for example as returned 
+        by `runsim_batch`.
+    :type epresults: list (EPResult)
+    
+    :returns: A DataFrame with a row for each simulation and the columns 
+        'wall_time', 'user_time', 'system_time', 'peak_rss' and 'bytes_written'.
+        Values which are not available are NaN.
+    :rtype: pandas.DataFrame
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> from eprun import runsim_batch, get_resource_usage
+       >>> epresults=runsim_batch(jobs,ep_dir='C:\EnergyPlusV9-6-0')
+       >>> df=get_resource_usage(epresults)
+       >>> print(df.sum())
+       >>> print(df['peak_rss'].idxmax()) # the job which used the most memory
+    
+    """
+    return pd.DataFrame([x.get_resource_usage() for x in epresults],
+                        columns=['wall_time','user_time','system_time','peak_rss','bytes_written'],
+                        dtype=float)
+    
+    
+def get_schedule_report(epresults):
+    """Returns a summary of the runtime and the runtime predictions of a batch of simulations.
+    
+    :param epresults: The results of the simulations, as returned by `runsim_batch`
+        with a `predictor`.
+    :type epresults: list (EPResult)
+    
+    :returns: A dictionary with keys:
+        - 'makespan': the time in seconds from the start of the first simulation 
+          to the end of the last simulation.
+        - 'total_time': the sum of the runtimes of the simulations in seconds.
+        - 'mean_absolute_error': the mean absolute error of the predicted runtimes
+          in seconds, or None if there are no predictions.
+        - 'mean_absolute_percentage_error': the mean absolute percentage error of 
+          the predicted runtimes, or None if there are no predictions.
+    :rtype: dict
+    
+    """
+    x=[epresult for epresult in epresults if not epresult.start_time is None]
+    if x:
+        makespan=(max(epresult.start_time+epresult.wall_time for epresult in x)
+                  -min(epresult.start_time for epresult in x))
+    else:
+        makespan=None
+    errors=[(epresult.predicted_time-epresult.wall_time,epresult.wall_time) 
+            for epresult in epresults if not epresult.predicted_time is None]
+    return {'makespan':makespan,
+            'total_time':sum(epresult.wall_time for epresult in epresults),
+            'mean_absolute_error':(sum(abs(e) for e,t in errors)/len(errors) 
+                                   if errors else None),
+            'mean_absolute_percentage_error':(100*sum(abs(e)/t for e,t in errors if t>0)/len(errors) 
+                                              if errors else None)}
+    
+    
+async def arunsim(
+        input_filepath,
+        epw_filepath,
+        ep_dir,
+        sim_dir='.',
+        **kwargs
+        ):
+    """Runs an EnergyPlus simulation from an asyncio event loop and returns the results.
+    
+    This is the coroutine version of `runsim` and takes the same parameters. 
+    `runsim` is run in its own thread, so the event loop is not blocked while 
+    EnergyPlus runs, and the input files, output files, cache and resource 
+    usage are handled in the same way as for `runsim`. If the task is 
+    cancelled, the EnergyPlus process is killed and the `asyncio.CancelledError`
+    is raised once `runsim` has returned.
+    
+    See `runsim` for the parameters and the exceptions, for example 
+    `subprocess.TimeoutExpired` if the `timeout` keyword argument is exceeded.
+    
+    :rtype: EPResult
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> import asyncio
+       >>> from eprun import arunsim
+       >>> epresult=asyncio.run(arunsim(ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                              input_filepath='1ZoneUncontrolled.idf',
+       >>>                              epw_filepath='USA_CO_Golden-NREL.724666_TMY3.epw',
+       >>>                              sim_dir='simulation_files',
+       >>>                              timeout=600))
+       >>> print(epresult.returncode)
+       0
+    
+    """
+    # the EnergyPlus process is recorded so that it can be killed if the task is cancelled
+    lock=threading.Lock()
+    cancelled=threading.Event()
+    processes=[]
+    
+    def process_callback(process):
+        with lock:
+            processes.append(process)
+            if cancelled.is_set():
+                process.kill()
+    
+    # a thread for each simulation, so the number of simulations is not limited 
+    # by the default executor of the event loop
+    executor=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    future=asyncio.get_event_loop().run_in_executor(executor,
+                                                    functools.partial(runsim,
+                                                                      input_filepath,
+                                                                      epw_filepath,
+                                                                      ep_dir,
+                                                                      sim_dir,
+                                                                      _process_callback=process_callback,
+                                                                      **kwargs))
+    executor.shutdown(wait=False)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        with lock:
+            cancelled.set()
+            for process in processes:
+                process.kill()
+        try:
+            await future
+        except Exception:
+            pass
+        raise
+    
+
+async def arunsim_batch(jobs,
+                        max_workers=None,
+                        **kwargs):
+    """Runs a batch of EnergyPlus simulations concurrently from an asyncio event loop.
+    
+    The number of simulations running at the same time is limited by an 
+    `asyncio.Semaphore`. If the task is cancelled, all running EnergyPlus 
+    processes are killed.
+    
+    See `iter_runsim_batch` for the parameters. The keyword arguments are 
+    passed to `arunsim`, so can include `timeout`.
+    
+    :returns: A list of EPResult objects, one for each job in the same order as `jobs`.
+        Jobs for which `arunsim` raised an exception, for example a 
+        `subprocess.TimeoutExpired`, have a `returncode` of None and the 
+        exception in `EPResult.exception`, as for `runsim_batch`.
+    :rtype: list (EPResult)
+    
+    """
+    semaphore=asyncio.Semaphore(_get_batch_max_workers(max_workers))
+    
+    async def run(x):
+        async with semaphore:
+            simulation_start_time=time.time()
+            start=time.perf_counter()
+            try:
+                return await arunsim(**x)
+            except Exception as err:
+                return _get_failed_epresult(err,
+                                            simulation_start_time,
+                                            time.perf_counter()-start)
+    
+    tasks=[asyncio.ensure_future(run(x)) for x in _get_batch_job_kwargs(jobs,kwargs)]
+    try:
+        return await asyncio.gather(*tasks)
+    except asyncio.CancelledError: # gather has cancelled the simulations
+        await asyncio.gather(*tasks,return_exceptions=True)
+        raise
+    
+    
 class EPResult():
     """A class representing the results of an EnergyPlus simulation.
     
@@ -201,12 +1484,63 @@ class EPResult():
 
     """
     
+    @property
+    def file_sizes(self):
+        """A dictionary of the sizes of the results files in bytes.
+        The keys of the dictionary are the same as for `files`.
+        
+        :rtype: dict (str,int)
+        
+        """
+        return self._file_sizes
+    
+    
+    @property
+    def bytes_written(self):
+        """The total size in bytes of the output files written by the simulation.
+        
+        :rtype: int
+        
+        """
+        return self._bytes_written
+    
+    
+    @property
+    def exception(self):
+        """The exception raised by `runsim`, when the simulation is run by 
+        `runsim_batch` or a similar function which does not raise it. 
+        None if `runsim` returned normally.
+        
+        :rtype: Exception
+        
+        """
+        return self._exception
+    
+    
+    @property
+    def fail_fast_message(self):
+        """The .err file message which caused the simulation to be terminated early,
+        when `runsim` is called with the `fail_fast` argument.
+        None if the simulation was not terminated early.
+        
+        :rtype: str
+        
+        """
+        return self._fail_fast_message
+    
+    
     @property
     def files(self):
         """A dictionary of the results files from a successful EnergyPlus simulation.
         The keys of the dictionary are the file extensions e.g. 'eso', 'err' etc.
         The values of the dictionary are the absolute filepaths of the files.
         
+        The files are found from the output file names which EnergyPlus uses for the
+        `output_prefix` and `output_suffix` of the simulation, so other files in the 
+        simulation directory are not included. If more than one output file has the 
+        same extension, the main output file is used (for example 'eplusout.csv' 
+        rather than 'eplustbl.csv').
+        
         :rtype: dict (str,str)
         
         """
@@ -233,21 +1567,81 @@ class EPResult():
         return EPErr(fp)
     
     
-    def get_eso(self):
+    def get_eso(self,**kwargs):
         """Gets the .eso output file.
         
+        :param kwargs: Keyword arguments passed to `EPEso`, such as 
+            `report_codes`, `frequencies` or `environments`.
+        
         :rtype: EPEso       
         
         """
         fp=self.files['eso']
-        return EPEso(fp)
+        return EPEso(fp,**kwargs)
+    
+    
+    def get_resource_usage(self):
+        """Returns the resources used by the simulation.
+        
+        :returns: A dictionary with keys 'wall_time', 'user_time', 'system_time',
+            'peak_rss' and 'bytes_written'. See the properties of the same names.
+        :rtype: dict
+        
+        """
+        return {'wall_time':self.wall_time,
+                'user_time':self.user_time,
+                'system_time':self.system_time,
+                'peak_rss':self.peak_rss,
+                'bytes_written':self.bytes_written}
+    
+    
+    @property
+    def output_pruning(self):
+        """The report of `prune_output_variables` when `runsim` was called 
+        with `output_variables`, otherwise None.
+        
+        This includes the number of output objects before and after pruning and 
+        the 'estimated_eso_reduction' of the size of the .eso file.
+        
+        :rtype: dict
+        
+        """
+        return self._output_pruning
+    
+    
+    @property
+    def peak_rss(self):
+        """The peak resident set size (memory use) of the EnergyPlus process in bytes.
+        
+        As this is measured by the operating system from the time the process is 
+        created, it can include memory shared with the Python process before 
+        EnergyPlus starts, so is a maximum rather than an exact value for small models.
+        This is only available on Linux and macOS, and is None otherwise or if 
+        EnergyPlus was not run by `runsim`.
+        
+        :rtype: int
+        
+        """
+        return self._peak_rss
+    
+    
+    @property
+    def predicted_time(self):
+        """The predicted runtime of the simulation in seconds, when run by 
+        `runsim_batch` with a `predictor`, otherwise None.
+        
+        :rtype: float
+        
+        """
+        return self._predicted_time
     
     
     @property
     def returncode(self):
         """The returncode of the `subprocess.run` call to the EnergyPlus exe file.
         This indicates if the call to EnergyPlus was successful.
-        0 means success. 1 means failure.
+        0 means success. 1 means failure. None means that `runsim` raised an
+        exception, see `exception`.
         
         :rtype: int
         
@@ -265,47 +1659,3089 @@ class EPResult():
         """
         return self._stdout
     
-
-class EPEnd():
-    """A class for an EnergyPlus .end file.
-    
-    :param fp: The filepath for the .end file.
-    :type fp: str
     
-    .. rubric:: Code Example
+    @property
+    def start_time(self):
+        """The time the simulation started in seconds since the epoch.
         
-    .. code-block:: python
-           
-       >>> from eprun import EPEnd
-       >>> end=EPEnd(r'simulation_files\eplusout.end')
-       >>> print(type(end))
-       <class 'eprun.epend.EPEnd'>
-       >>> print(end.line)
-       EnergyPlus Completed Successfully-- 0 Warning; 0 Severe Errors; Elapsed Time=00hr 00min  2.21sec
+        :rtype: float
+        
+        """
+        return self._start_time
     
-    .. seealso::
     
-       Output Details and Examples, page 125.
-       https://energyplus.net/quickstart#reading
+    @property
+    def system_time(self):
+        """The system CPU time of the EnergyPlus process in seconds.
+        
+        This is only available on Linux and macOS, and is None otherwise or if 
+        EnergyPlus was not run by `runsim`.
+        
+        :rtype: float
+        
+        """
+        return self._system_time
     
-    """        
     
-    def __init__(self,fp):
-        ""
-        with open(fp,'r') as f:
-            self._line=f.readline().strip()
-            
-            
     @property
-    def line(self):
-        """The single line recorded in the .end file.
+    def user_time(self):
+        """The user CPU time of the EnergyPlus process in seconds.
+        
+        This is only available on Linux and macOS, and is None otherwise or if 
+        EnergyPlus was not run by `runsim`.
+        
+        :rtype: float
         
-        :rtype: str
         """
-        return self._line
+        return self._user_time
+    
+    
+    @property
+    def wall_time(self):
+        """The elapsed time of the EnergyPlus simulation in seconds.
         
+        :rtype: float
+        
+        """
+        return self._wall_time
+    
+
+def _get_input_file_hash(fp):
+    """Returns a hash of the contents of an EnergyPlus input file.
+    
+    The contents are normalized first, so that files which differ only in 
+    formatting have the same hash:
+    
+    - .epJSON files are read as JSON and written with sorted keys.
+    - other files (.idf, .imf) have comments, leading and trailing whitespace 
+      and empty lines removed, and use '\\n' line endings.
+    
+    :param fp: The filepath of the input file.
+    :type fp: str
+    
+    :rtype: str
+    
+    """
+    if fp.lower().endswith('.epjson'):
+        with open(fp,'r') as f:
+            x=json.dumps(json.load(f),sort_keys=True,separators=(',',':'))
+    else:
+        lines=[]
+        with open(fp,'r',errors='replace') as f:
+            for line in f:
+                line=line.split('!',1)[0].strip()
+                if line:
+                    lines.append(line)
+        x='\n'.join(lines)
+    return hashlib.sha256(x.encode()).hexdigest()
+
+
+def _get_file_hash(fp):
+    """Returns a hash of the bytes of a file.
+    
+    :param fp: The filepath of the file.
+    :type fp: str
+    
+    :rtype: str
+    
+    """
+    h=hashlib.sha256()
+    with open(fp,'rb') as f:
+        for b in iter(lambda: f.read(1<<20),b''):
+            h.update(b)
+    return h.hexdigest()
+
+
+def _get_energyplus_version(ep_dir):
+    """Returns a description of the EnergyPlus installation used for a simulation.
+    
+    This combines the version and build lines at the start of the 'Energy+.idd' 
+    file with the path, size and modification time of the EnergyPlus executable,
+    and is used in the cache keys of `EPCache`.
+    
+    :param ep_dir: The EnergyPlus directory.
+    :type ep_dir: str
+    
+    :rtype: list
+    
+    """
+    result=[]
+    try:
+        with open(os.path.join(ep_dir,'Energy+.idd'),'r',errors='replace') as f:
+            result.extend([f.readline().strip(),f.readline().strip()])
+    except OSError:
+        pass
+    for x in ('energyplus','energyplus.exe'):
+        fp=os.path.join(ep_dir,x)
+        try:
+            st=os.stat(fp)
+        except OSError:
+            continue
+        result.extend([os.path.realpath(fp),st.st_size,st.st_mtime_ns])
+        break
+    return result
+    
+    
+class EPCache():
+    """A local cache of EnergyPlus simulation results, for use with `runsim`.
+    
+    Each cache entry is a subdirectory of `cache_dir` named after a hash of
+    the normalized input file, the weather file, the EnergyPlus installation 
+    and the EnergyPlus arguments. It holds copies of the output files of a 
+    successful simulation. 
+    
+    When the cache is larger than `max_size` or `max_entries` the least 
+    recently used entries are removed.
+    
+    :param cache_dir: The directory which holds the cache. This is created 
+        if it does not exist.
+    :type cache_dir: str
+    :param max_size: If given, the maximum total size of the cached output files in bytes.
+    :type max_size: int
+    :param max_entries: If given, the maximum number of cached simulations.
+    :type max_entries: int
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import runsim, EPCache
+       >>> cache=EPCache('eprun_cache',max_size=10*1024**3)
+       >>> for i in range(2):
+       >>>     epresult=runsim(ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                     input_filepath='1ZoneUncontrolled.idf',
+       >>>                     epw_filepath='USA_CO_Golden-NREL.724666_TMY3.epw',
+       >>>                     sim_dir='simulation_files',
+       >>>                     cache=cache)
+       >>> print(cache.get_stats())
+       {'hits': 1, 'misses': 1, 'entries': 1, 'size': 2841911}
+    
+    """
+    
+    def __init__(self,
+                 cache_dir,
+                 max_size=None,
+                 max_entries=None):
+        ""
+        self._cache_dir=os.path.abspath(cache_dir)
+        self._max_size=max_size
+        self._max_entries=max_entries
+        self._hits=0
+        self._misses=0
+        self._lock=threading.Lock()
+        os.makedirs(self._cache_dir,exist_ok=True)
+        
+        
+    def __repr__(self):
+        ""
+        return 'EPCache(cache_dir="%s")' % self._cache_dir
+    
+    
+    @property
+    def cache_dir(self):
+        """The directory which holds the cache.
+        
+        :rtype: str
+        
+        """
+        return self._cache_dir
+    
+    
+    def clear(self):
+        """Removes all entries from the cache and resets the statistics.
+        
+        """
+        for key,mtime,size in self._get_entries():
+            shutil.rmtree(os.path.join(self._cache_dir,key),ignore_errors=True)
+        with self._lock:
+            self._hits=0
+            self._misses=0
+            
+            
+    def get_stats(self):
+        """Returns the statistics of the cache.
+        
+        :returns: A dictionary with keys 'hits' and 'misses', the number of
+            cache lookups by this instance which did or did not find a 
+            cached simulation, and 'entries' and 'size', the number of 
+            cached simulations and their total size in bytes.
+        :rtype: dict
+        
+        """
+        entries=self._get_entries()
+        return {'hits':self._hits,
+                'misses':self._misses,
+                'entries':len(entries),
+                'size':sum(x[2] for x in entries)}
+    
+    
+    @property
+    def hits(self):
+        """The number of cache lookups which found a cached simulation.
+        
+        :rtype: int
+        
+        """
+        return self._hits
+    
+    
+    @property
+    def misses(self):
+        """The number of cache lookups which did not find a cached simulation.
+        
+        :rtype: int
+        
+        """
+        return self._misses
+    
+    
+    def _evict(self):
+        """Removes the least recently used entries until the cache is within its limits.
+        
+        """
+        if self._max_size is None and self._max_entries is None:
+            return
+        entries=sorted(self._get_entries(),key=lambda x: x[1])
+        size=sum(x[2] for x in entries)
+        while entries and ((not self._max_size is None and size>self._max_size)
+                           or (not self._max_entries is None and len(entries)>self._max_entries)):
+            key,mtime,x=entries.pop(0)
+            shutil.rmtree(os.path.join(self._cache_dir,key),ignore_errors=True)
+            size-=x
+    
+    
+    def _get(self,key):
+        """Returns the cached results of a simulation.
+        
+        :param key: The cache key.
+        :type key: str
+        
+        :returns: The EPResult, or None if the simulation is not in the cache.
+        :rtype: EPResult
+        
+        """
+        entry_dir=os.path.join(self._cache_dir,key)
+        fp=os.path.join(entry_dir,'epresult.json')
+        try:
+            with open(fp,'r') as f:
+                x=json.load(f)
+            os.utime(fp) # the last used time
+        except (OSError,ValueError):
+            with self._lock:
+                self._misses+=1
+            return None
+        with self._lock:
+            self._hits+=1
+        
+        result=EPResult()
+        result._returncode=x['returncode']
+        result._stdout=x['stdout']
+        result._files={k:os.path.join(entry_dir,v) for k,v in x['files'].items()}
+        result._file_sizes=x['file_sizes']
+        result._wall_time=x['wall_time']
+        result._start_time=None
+        result._predicted_time=None
+        result._cache_hit=True
+        result._fail_fast_message=None
+        result._exception=None
+        result._bytes_written=0 # EnergyPlus was not run
+        result._output_pruning=None
+        result._user_time=None
+        result._system_time=None
+        result._peak_rss=None
+        return result
+    
+    
+    def _get_entries(self):
+        """Returns the entries in the cache.
+        
+        :returns: A list of (key, last_used_time, size) tuples.
+        :rtype: list (tuple)
+        
+        """
+        result=[]
+        for x in os.scandir(self._cache_dir):
+            if x.name.startswith('.') or not x.is_dir():
+                continue
+            fp=os.path.join(x.path,'epresult.json')
+            try:
+                mtime=os.path.getmtime(fp)
+                with open(fp,'r') as f:
+                    size=sum(json.load(f)['file_sizes'].values())
+            except (OSError,ValueError,KeyError):
+                continue
+            result.append((x.name,mtime,size))
+        return result
+    
+    
+    def _get_key(self,
+                 input_absolute_filepath,
+                 epw_absolute_filepath,
+                 ep_dir,
+                 options):
+        """Returns the cache key of a simulation.
+        
+        :param input_absolute_filepath: The filepath of the input file.
+        :type input_absolute_filepath: str
+        :param epw_absolute_filepath: The filepath of the weather file.
+        :type epw_absolute_filepath: str
+        :param ep_dir: The EnergyPlus directory.
+        :type ep_dir: str
+        :param options: The values of the other `runsim` arguments which are
+            passed to EnergyPlus.
+        :type options: list
+        
+        :rtype: str
+        
+        """
+        x=json.dumps([_get_input_file_hash(input_absolute_filepath),
+                      os.path.splitext(input_absolute_filepath)[1].lower(),
+                      _get_file_hash(epw_absolute_filepath),
+                      _get_energyplus_version(ep_dir),
+                      options])
+        return hashlib.sha256(x.encode()).hexdigest()
+    
+    
+    def _put(self,key,epresult):
+        """Adds the results of a successful simulation to the cache.
+        
+        The output files are copied to a temporary directory which is then 
+        renamed, so other processes sharing the cache never see a partial entry.
+        
+        :param key: The cache key.
+        :type key: str
+        :param epresult: The simulation results.
+        :type epresult: EPResult
+        
+        """
+        if not epresult.returncode==0:
+            return
+        temp_dir=tempfile.mkdtemp(prefix='.tmp-',dir=self._cache_dir)
+        try:
+            files={}
+            for k,fp in epresult.files.items():
+                files[k]=os.path.basename(fp)
+                shutil.copyfile(fp,os.path.join(temp_dir,files[k]))
+            with open(os.path.join(temp_dir,'epresult.json'),'w') as f:
+                json.dump({'returncode':epresult.returncode,
+                           'stdout':epresult.stdout,
+                           'files':files,
+                           'file_sizes':epresult.file_sizes,
+                           'wall_time':epresult.wall_time},f)
+            os.rename(temp_dir,os.path.join(self._cache_dir,key))
+        except OSError: # for example the entry was added by another process
+            shutil.rmtree(temp_dir,ignore_errors=True)
+            return
+        self._evict()
+        
+        
+# the classes of the input file objects which are counted as surfaces by `_get_input_features`
+_surface_classes={'buildingsurface:detailed','fenestrationsurface:detailed',
+                  'wall:detailed','roofceiling:detailed','floor:detailed',
+                  'wall:exterior','wall:adiabatic','wall:underground','wall:interzone',
+                  'roof','ceiling:adiabatic','ceiling:interzone',
+                  'floor:groundcontact','floor:adiabatic','floor:interzone',
+                  'window','door','glazeddoor',
+                  'window:interzone','door:interzone','glazeddoor:interzone'}
+
+
+def _read_input_objects(fp):
+    """Reads the objects in an EnergyPlus input file.
+    
+    :param fp: The filepath of the .idf or .epJSON file.
+    :type fp: str
+    
+    :returns: A dictionary with the lower case object class names as keys and 
+        a list of the objects as values. Each object is a dictionary of its 
+        fields, using the epJSON field names for .epJSON files and the 
+        positions of the fields after the class name for .idf files.
+    :rtype: dict
+    
+    """
+    result={}
+    if fp.lower().endswith('.epjson'):
+        with open(fp,'r') as f:
+            for k,v in json.load(f).items():
+                result[k.lower()]=list(v.values()) if isinstance(v,dict) else []
+    else:
+        with open(fp,'r',errors='replace') as f:
+            text=''.join(line.split('!',1)[0] for line in f)
+        for x in text.split(';'):
+            fields=[y.strip() for y in x.split(',')]
+            if fields[0]:
+                result.setdefault(fields[0].lower(),[]).append(dict(enumerate(fields[1:])))
+    return result
+
+
+def _get_input_features(input_filepath,
+                        annual=False,
+                        design_day=False):
+    """Returns features of an EnergyPlus input file which indicate its runtime.
+    
+    :param input_filepath: The filepath of the .idf or .epJSON file.
+    :type input_filepath: str
+    :param annual: The `annual` argument of `runsim`.
+    :type annual: bool
+    :param design_day: The `design_day` argument of `runsim`.
+    :type design_day: bool
+    
+    :returns: A dictionary with keys 'zones', 'surfaces', 'timesteps_per_hour',
+        'run_period_days' and 'design_days'.
+    :rtype: dict
+    
+    """
+    objects=_read_input_objects(input_filepath)
+    epjson=input_filepath.lower().endswith('.epjson')
+    
+    def get_int(x,key,index,default):
+        try:
+            return int(float(x.get(key if epjson else index)))
+        except (TypeError,ValueError):
+            return default
+    
+    timesteps_per_hour=6 # the EnergyPlus default
+    for x in objects.get('timestep',[]):
+        timesteps_per_hour=get_int(x,'number_of_timesteps_per_hour',0,timesteps_per_hour)
+        
+    run_weather_file_run_periods=True
+    run_sizing_periods=True
+    for x in objects.get('simulationcontrol',[]):
+        run_sizing_periods=not str(x.get('run_simulation_for_sizing_periods' if epjson else 3,
+                                         'Yes')).lower()=='no'
+        run_weather_file_run_periods=not str(x.get('run_simulation_for_weather_file_run_periods' if epjson else 4,
+                                                   'Yes')).lower()=='no'
+    
+    run_period_days=0
+    for x in objects.get('runperiod',[]):
+        start=datetime.date(2001,get_int(x,'begin_month',1,1),get_int(x,'begin_day_of_month',2,1))
+        end=datetime.date(2001,get_int(x,'end_month',4,12),get_int(x,'end_day_of_month',5,31))
+        run_period_days+=((end-start).days%365)+1
+    design_days=len(objects.get('sizingperiod:designday',[]))
+    
+    if annual:
+        run_period_days,design_days=365,0
+    elif design_day:
+        run_period_days=0
+    else:
+        if not run_weather_file_run_periods:
+            run_period_days=0
+        if not run_sizing_periods:
+            design_days=0
+    
+    return {'zones':len(objects.get('zone',[])),
+            'surfaces':sum(len(v) for k,v in objects.items() if k in _surface_classes),
+            'timesteps_per_hour':timesteps_per_hour,
+            'run_period_days':run_period_days,
+            'design_days':design_days}
+
+
+# the reporting frequencies of output variables and meters, with lower case keys
+_output_frequencies={x.lower():x for x in ('Detailed','Timestep','Hourly','Daily',
+                                           'Monthly','RunPeriod','Environment','Annual')}
+
+
+# the classes of the meter output objects, which report to the .eso file unless 'MeterFileOnly'
+_output_meter_classes=('output:meter','output:meter:meterfileonly',
+                       'output:meter:cumulative','output:meter:cumulative:meterfileonly')
+
+
+def _split_idf_objects(text):
+    """Splits the text of an .idf file into its objects.
+    
+    :param text: The text of the .idf file.
+    :type text: str
+    
+    :returns: A list of (raw, fields) tuples, one for each object. `raw` is the 
+        text of the object including any preceding comments, so that joining 
+        the `raw` texts gives `text`. `fields` is the list of the stripped fields 
+        of the object, starting with the class name. The last tuple holds any 
+        text after the last object and its `fields` is None.
+    :rtype: list (tuple)
+    
+    """
+    result=[]
+    raw=''
+    code=''
+    for line in text.splitlines(keepends=True):
+        x,sep,comment=line.partition('!')
+        parts=x.split(';')
+        for part in parts[:-1]:
+            raw+=part+';'
+            code+=part
+            result.append((raw,[y.strip() for y in code.split(',')]))
+            raw=''
+            code=''
+        raw+=parts[-1]+sep+comment
+        code+=parts[-1]
+    result.append((raw,None))
+    return result
+
+
+def _format_idf_object(fields,prefix='\n'):
+    """Returns the text of an .idf object.
+    
+    :param fields: The fields of the object, starting with the class name.
+    :type fields: list (str)
+    :param prefix: The text before the class name, such as comments and 
+        whitespace. The fields are indented by the last line of `prefix` 
+        plus four spaces.
+    :type prefix: str
+    
+    :rtype: str
+    
+    """
+    indent=prefix.split('\n')[-1]+'    '
+    return '%s%s,\n%s;' % (prefix,fields[0],',\n'.join(indent+x for x in fields[1:]))
+
+
+def _get_idf_object_prefix(raw):
+    """Returns the text of an .idf object before its class name.
+    
+    :param raw: The text of the object, as returned by `_split_idf_objects`.
+    :type raw: str
+    
+    :returns: The comments and whitespace before the class name.
+    :rtype: str
+    
+    """
+    i=0
+    for line in raw.splitlines(keepends=True):
+        code=line.partition('!')[0]
+        if code.strip():
+            return raw[:i+len(code)-len(code.lstrip())]
+        i+=len(line)
+    return raw
+
+
+def _get_pruned_outputs(class_name,
+                        key,
+                        name,
+                        frequency,
+                        requests,
+                        output_frequency):
+    """Returns the output requests to keep in place of an output variable or meter object.
+    
+    :param class_name: The lower case class name.
+    :type class_name: str
+    :param key: The key value of an 'Output:Variable', or the meter name.
+    :type key: str
+    :param name: The variable name of an 'Output:Variable', or None for meters.
+    :type name: str
+    :param frequency: The reporting frequency.
+    :type frequency: str
+    :param requests: The requested outputs as (key or None, name) tuples.
+    :type requests: list (tuple)
+    :param output_frequency: If given, the reporting frequency of the kept outputs.
+    :type output_frequency: str
+    
+    :returns: A list of (key, frequency) tuples. This is empty if the object
+        is not requested, and can be longer than one if the object has a '*' 
+        key and specific keys are requested.
+    :rtype: list (tuple)
+    
+    """
+    frequency=output_frequency or _output_frequencies.get(str(frequency).lower(),'Hourly')
+    if class_name=='output:variable':
+        keys=[k for k,x in requests if x.lower()==name.lower()]
+    else:
+        keys=[k for k,x in requests if x.lower()==key.lower() and k is None]
+    if not keys:
+        return []
+    elif None in keys or '*' in keys:
+        return [(key,frequency)]
+    elif key=='*': # only the requested keys
+        return [(k,frequency) for k in dict.fromkeys(keys)]
+    elif key.lower() in [k.lower() for k in keys]:
+        return [(key,frequency)]
+    else:
+        return []
+
+
+def prune_output_variables(input_filepath,
+                           output_filepath,
+                           variables,
+                           frequency=None):
+    """Writes a copy of an EnergyPlus input file which requests only the given output variables and meters.
+    
+    'Output:Variable', 'Output:Meter', 'Output:Meter:MeterFileOnly', 
+    'Output:Meter:Cumulative' and 'Output:Meter:Cumulative:MeterFileOnly' 
+    objects which do not match `variables` are removed. An 'Output:Variable' 
+    with a '*' key is replaced by objects with the requested keys, if only 
+    specific keys are requested. Variables and meters which are requested but
+    not in the input file are not added. 
+    
+    :param input_filepath: The filepath of the .idf or .epJSON input file.
+    :type input_filepath: str
+    :param output_filepath: The filepath of the pruned input file, which should 
+        have the same file extension.
+    :type output_filepath: str
+    :param variables: The output variables and meters to keep. Each item is either
+        a variable or meter name, for example 'Zone Mean Air Temperature' or 
+        'Electricity:Facility', or a (key, variable name) tuple, for example
+        ('ZONE ONE','Zone Mean Air Temperature'). Names are not case sensitive.
+    :type variables: list (str or tuple)
+    :param frequency: If given, the reporting frequency of all kept outputs, 
+        for example 'Hourly' or 'Monthly'.
+    :type frequency: str
+    
+    :raises ValueError: If `frequency` is not a valid reporting frequency.
+    
+    :returns: A dictionary with keys:
+        - 'outputs_before' and 'outputs_after': the number of output objects.
+        - 'eso_rows_before' and 'eso_rows_after': the estimated number of values
+          written to the .eso file per year of simulation. A '*' key counts as 
+          one key.
+        - 'estimated_eso_reduction': the estimated fraction by which the size
+          of the data section of the .eso file is reduced, or None if the input
+          file has no outputs in the .eso file.
+    :rtype: dict
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> from eprun import prune_output_variables
+       >>> report=prune_output_variables('model.idf',
+       >>>                               'model-pruned.idf',
+       >>>                               ['Electricity:Facility',
+       >>>                                ('ZONE ONE','Zone Mean Air Temperature')],
+       >>>                               frequency='Hourly')
+       >>> print(report['estimated_eso_reduction'])
+       0.93
+    
+    """
+    if not frequency is None:
+        try:
+            frequency=_output_frequencies[frequency.lower()]
+        except KeyError:
+            raise ValueError('Invalid reporting frequency: %s' % frequency)
+    requests=[(None,x.strip()) if isinstance(x,str) else (x[0].strip(),x[1].strip()) 
+              for x in variables]
+    timesteps_per_hour=_get_input_features(input_filepath)['timesteps_per_hour']
+    
+    def get_rows(class_name,frequency):
+        if class_name.endswith('meterfileonly'):
+            return 0
+        x=_output_frequencies.get(str(frequency).lower(),'Hourly')
+        return {'Detailed':8760*timesteps_per_hour,
+                'Timestep':8760*timesteps_per_hour,
+                'Hourly':8760,
+                'Daily':365,
+                'Monthly':12}.get(x,1)
+    
+    before=[]
+    after=[]
+    seen=set()
+    
+    def prune(class_name,key,name,x):
+        "Returns the kept (key, frequency) tuples, without duplicates."
+        before.append((class_name,x))
+        result=[]
+        for k,f in _get_pruned_outputs(class_name,key,name,x,requests,frequency):
+            y=(class_name,k.lower(),(name or '').lower(),f.lower())
+            if not y in seen:
+                seen.add(y)
+                after.append((class_name,f))
+                result.append((k,f))
+        return result
+    
+    if input_filepath.lower().endswith('.epjson'):
+        with open(input_filepath,'r') as f:
+            epjson=json.load(f)
+        for class_name in list(epjson):
+            if class_name.lower()=='output:variable':
+                objects={}
+                for object_name,x in epjson[class_name].items():
+                    kept=prune('output:variable',
+                               x.get('key_value','*'),
+                               x['variable_name'],
+                               x.get('reporting_frequency','Hourly'))
+                    for i,(k,f) in enumerate(kept):
+                        y=dict(x,key_value=k,reporting_frequency=f)
+                        objects[object_name if i==0 else '%s %s' % (object_name,i)]=y
+            elif class_name.lower() in _output_meter_classes:
+                objects={}
+                for object_name,x in epjson[class_name].items():
+                    for k,f in prune(class_name.lower(),
+                                     x['key_name'],
+                                     None,
+                                     x.get('reporting_frequency','Hourly')):
+                        objects[object_name]=dict(x,reporting_frequency=f)
+            else:
+                continue
+            if objects:
+                epjson[class_name]=objects
+            else:
+                del epjson[class_name]
+        with open(output_filepath,'w') as f:
+            json.dump(epjson,f,indent=4)
+    else:
+        with open(input_filepath,'r',errors='replace') as f:
+            objects=_split_idf_objects(f.read())
+        text=[]
+        for raw,fields in objects:
+            class_name='' if fields is None else fields[0].lower()
+            if class_name=='output:variable':
+                fields=fields+['']*(4-len(fields))
+                prefix=_get_idf_object_prefix(raw)
+                for k,f in prune(class_name,fields[1] or '*',fields[2],fields[3]):
+                    if k==fields[1] and f.lower()==fields[3].lower(): # unchanged
+                        text.append(raw)
+                    else:
+                        text.append(_format_idf_object([fields[0],k,fields[2],f]+fields[4:],prefix))
+                    prefix='\n'+prefix.split('\n')[-1]
+            elif class_name in _output_meter_classes:
+                fields=fields+['']*(3-len(fields))
+                for k,f in prune(class_name,fields[1],None,fields[2]):
+                    if f.lower()==fields[2].lower(): # unchanged
+                        text.append(raw)
+                    else:
+                        text.append(_format_idf_object([fields[0],k,f],_get_idf_object_prefix(raw)))
+            else:
+                text.append(raw)
+        with open(output_filepath,'w') as f:
+            f.write(''.join(text))
+    
+    eso_rows_before=sum(get_rows(*x) for x in before)
+    eso_rows_after=sum(get_rows(*x) for x in after)
+    return {'outputs_before':len(before),
+            'outputs_after':len(after),
+            'eso_rows_before':eso_rows_before,
+            'eso_rows_after':eso_rows_after,
+            'estimated_eso_reduction':1-eso_rows_after/eso_rows_before if eso_rows_before else None}
+
+
+# the output files kept by the `output_profile` argument of `runsim`, by file extension
+# - the .err and .end files are always kept
+_output_profiles={'minimal':(),
+                  'eso':('eso','mtr'),
+                  'sql':('sql',),
+                  'tables':('htm','tab','txt','xml','csv')}
+
+
+# the input objects which request output files, with the file extensions they write
+# - an object is removed by `_set_output_control` if none of its files are kept
+_output_request_classes={'output:variable':('eso','sql'),
+                         'output:meter':('eso','mtr','sql'),
+                         'output:meter:cumulative':('eso','mtr','sql'),
+                         'output:meter:meterfileonly':('mtr','sql'),
+                         'output:meter:cumulative:meterfileonly':('mtr','sql'),
+                         'output:variabledictionary':('rdd','mdd'),
+                         'output:surfaces:drawing':('dxf','wrl','svg'),
+                         'output:surfaces:list':('eio','sln'),
+                         'output:constructions':('eio',),
+                         'output:schedules':('eio',),
+                         'output:debuggingdata':('dbg',),
+                         'output:energymanagementsystem':('edd',),
+                         'output:sqlite':('sql',),
+                         'output:json':('json',),
+                         'output:table:summaryreports':('htm','tab','txt','xml','csv','sql'),
+                         'output:table:monthly':('htm','tab','txt','xml','csv','sql'),
+                         'output:table:annual':('htm','tab','txt','xml','csv','sql'),
+                         'output:table:timebins':('htm','tab','txt','xml','csv','sql')}
+
+
+# the file extensions of the 'OutputControl:Files' fields whose names are not 'Output <extension>'
+# - the DElight, PerfLog, ExtShd and Tarcog files have no extension in `_output_files`,
+#   so they are kept only if their field name is in `keep_outputs`, for example 'perflog'
+_output_control_fields={'output tabular':('htm','tab','txt','xml','csv'),
+                        'output sqlite':('sql',),
+                        'output space sizing':('csv',),
+                        'output zone sizing':('csv',),
+                        'output system sizing':('csv',),
+                        'output screen':('csv',),
+                        'output delightin':('delightin',),
+                        'output delighteldmp':('delighteldmp',),
+                        'output delightdfdmp':('delightdfdmp',),
+                        'output perflog':('perflog',),
+                        'output extshd':('extshd',),
+                        'output tarcog':('tarcog',)}
+
+
+def _get_idd_fields(ep_dir,class_name):
+    """Returns the field names of an object class in the 'Energy+.idd' file of an EnergyPlus installation.
+    
+    :param ep_dir: The EnergyPlus directory.
+    :type ep_dir: str
+    :param class_name: The class name, for example 'OutputControl:Files'.
+    :type class_name: str
+    
+    :returns: The field names, or None if the class or the 'Energy+.idd' file
+        does not exist.
+    :rtype: list (str)
+    
+    """
+    try:
+        with open(os.path.join(ep_dir,'Energy+.idd'),'r',errors='replace') as f:
+            for line in f:
+                if line.strip().lower()=='%s,' % class_name.lower():
+                    break
+            else:
+                return None
+            result=[]
+            for line in f:
+                if not line.strip() or not line[0].isspace(): # the end of the class
+                    break
+                x=line.split('\\field',1)
+                if len(x)==2:
+                    result.append(x[1].strip())
+            return result
+    except OSError:
+        return None
+
+
+def _set_output_control(input_filepath,
+                        output_filepath,
+                        keep_outputs,
+                        ep_dir):
+    """Writes a copy of an EnergyPlus input file which requests only the given output files.
+    
+    The output request objects (see `_output_request_classes`) for files which
+    are not kept are removed. If the EnergyPlus installation supports the 
+    'OutputControl:Files' object (EnergyPlus 9.5 and later), this is added
+    to the input file, or replaces an existing one, to switch off the other 
+    output files.
+    
+    :param input_filepath: The filepath of the .idf or .epJSON input file.
+    :type input_filepath: str
+    :param output_filepath: The filepath of the new input file, which should 
+        have the same file extension.
+    :type output_filepath: str
+    :param keep_outputs: The file extensions of the output files to keep.
+    :type keep_outputs: set (str)
+    :param ep_dir: The EnergyPlus directory.
+    :type ep_dir: str
+    
+    """
+    removed={k for k,v in _output_request_classes.items() if not keep_outputs.intersection(v)}
+    removed.add('outputcontrol:files')
+    
+    fields=_get_idd_fields(ep_dir,'OutputControl:Files')
+    if not fields is None:
+        values=[]
+        for x in fields:
+            extensions=_output_control_fields.get(x.lower(),(x.lower().split()[-1],))
+            values.append('Yes' if keep_outputs.intersection(extensions) else 'No')
+    
+    if input_filepath.lower().endswith('.epjson'):
+        with open(input_filepath,'r') as f:
+            epjson=json.load(f)
+        for class_name in list(epjson):
+            if class_name.lower() in removed:
+                del epjson[class_name]
+        if not fields is None:
+            epjson['OutputControl:Files']={'OutputControl:Files 1':
+                                           {x.lower().replace(' ','_'):y for x,y in zip(fields,values)}}
+        with open(output_filepath,'w') as f:
+            json.dump(epjson,f,indent=4)
+    else:
+        with open(input_filepath,'r',errors='replace') as f:
+            objects=_split_idf_objects(f.read())
+        text=[raw for raw,x in objects if x is None or not x[0].lower() in removed]
+        if not fields is None:
+            text.append('\n'+_format_idf_object(['OutputControl:Files']+values)+'\n')
+        with open(output_filepath,'w') as f:
+            f.write(''.join(text))
+
+
+# the `runsim` options, other than `annual` and `design_day`, which change the 
+# work done by EnergyPlus and are part of the 'run_key' of `EPRuntimePredictor`
+_predictor_options=('epmacro','expand_objects','convert','readvars','output_variables',
+                    'output_frequency','output_profile','keep_outputs')
+
+
+def _get_run_period_days(run_period):
+    """Returns the number of days in a run period.
+    
+    :param run_period: A dictionary with keys 'begin_month', 'begin_day_of_month',
+        'end_month' and 'end_day_of_month', as in `set_run_periods`.
+    :type run_period: dict
+    
+    :rtype: int
+    
+    """
+    start=datetime.date(2001,run_period['begin_month'],run_period['begin_day_of_month'])
+    end=datetime.date(2001,run_period['end_month'],run_period['end_day_of_month'])
+    return ((end-start).days%365)+1
+
+
+class EPRuntimePredictor():
+    """Predicts the runtime of EnergyPlus simulations, for scheduling a batch of simulations.
+    
+    The prediction uses features of the input file (see `get_features`) 
+    combined into a single measure of the amount of work in the simulation:
+    the number of simulated timesteps multiplied by the number of zones and surfaces.
+    The runtime is predicted from this using a linear fit to the history of 
+    previous runs. With less than two previous runs, a default rate is used, 
+    which still gives the order of the jobs. If the same simulation has been 
+    run before, that is the same input file with the same weather file, run 
+    periods and `runsim` options, the mean of its previous runtimes is used 
+    instead.
+    
+    :param history_filepath: If given, the JSON file which stores the history 
+        of previous runs, so that it is kept between batches.
+    :type history_filepath: str
+    :param max_history: The maximum number of previous runs to keep.
+    :type max_history: int
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> from eprun import runsim_batch, EPRuntimePredictor, get_schedule_report
+       >>> predictor=EPRuntimePredictor('runtime_history.json')
+       >>> epresults=runsim_batch(jobs,
+       >>>                        ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                        predictor=predictor)
+       >>> print(get_schedule_report(epresults))
+       {'makespan': 431.2, 'total_time': 3310.5, 'mean_absolute_error': 12.1, 
+        'mean_absolute_percentage_error': 9.8}
+    
+    """
+    
+    # the default runtime in seconds per unit of work, used with less than two previous runs
+    default_rate=2e-6
+    
+    def __init__(self,
+                 history_filepath=None,
+                 max_history=10000):
+        ""
+        self._history_filepath=history_filepath
+        self._max_history=max_history
+        self._history=[]
+        if not history_filepath is None:
+            try:
+                with open(history_filepath,'r') as f:
+                    self._history=json.load(f)
+            except (OSError,ValueError):
+                pass
+        self._fit=None
+        self._epw_hashes={} # the hashes of the weather files, by filepath, size and mtime
+        
+        
+    def __repr__(self):
+        ""
+        return 'EPRuntimePredictor(history=%s runs)' % len(self._history)
+    
+    
+    def add_run(self,features,wall_time):
+        """Adds a measured runtime to the history.
+        
+        :param features: The features of the simulation, as returned by `get_features`.
+        :type features: dict
+        :param wall_time: The measured runtime in seconds.
+        :type wall_time: float
+        
+        """
+        self._history.append({'features':features,
+                              'wall_time':wall_time})
+        del self._history[:-self._max_history]
+        self._fit=None
+    
+    
+    def get_features(self,
+                     input_filepath,
+                     annual=False,
+                     design_day=False,
+                     epw_filepath=None,
+                     run_periods=None,
+                     **kwargs):
+        """Returns the features of a simulation used to predict its runtime.
+        
+        :param input_filepath: The filepath of the .idf or .epJSON file.
+        :type input_filepath: str
+        :param annual: The `annual` argument of `runsim`.
+        :type annual: bool
+        :param design_day: The `design_day` argument of `runsim`.
+        :type design_day: bool
+        :param epw_filepath: The `epw_filepath` argument of `runsim`.
+        :type epw_filepath: str
+        :param run_periods: The `run_periods` argument of `runsim`. If given, 
+            these replace the run periods of the input file.
+        :type run_periods: list (dict)
+        :param kwargs: Other arguments of `runsim`. The options which change 
+            the work done by EnergyPlus (see `_predictor_options`) are part of
+            the 'run_key', the others are not used, so that the keyword arguments 
+            of a job can be passed directly.
+            
+        :returns: A dictionary with keys 'zones', 'surfaces', 'timesteps_per_hour',
+            'run_period_days', 'design_days', 'input_hash' and 'run_key'. The 
+            'run_key' is a hash of the input hash, the run period days, the 
+            design days, the weather file and the `runsim` options, which 
+            identifies repeated runs of the same simulation.
+        :rtype: dict
+        
+        """
+        result=_get_input_features(input_filepath,annual,design_day)
+        if not run_periods is None and result['run_period_days']>0 and not annual:
+            result['run_period_days']=sum(_get_run_period_days(x) for x in run_periods)
+        result['input_hash']=_get_input_file_hash(input_filepath)
+        options=dict(annual=annual,design_day=design_day)
+        options.update({k:kwargs.get(k) for k in _predictor_options})
+        x=[result['input_hash'],
+           result['run_period_days'],
+           result['design_days'],
+           None if epw_filepath is None else self._get_epw_hash(epw_filepath),
+           sorted(options.items())]
+        result['run_key']=hashlib.sha256(json.dumps(x,default=str).encode()).hexdigest()
+        return result
+    
+    
+    def predict(self,features):
+        """Returns the predicted runtime of a simulation in seconds.
+        
+        :param features: The features of the simulation, as returned by `get_features`.
+        :type features: dict
+        
+        :rtype: float
+        
+        """
+        run_key=features.get('run_key')
+        x=[run['wall_time'] for run in self._history 
+           if not run_key is None and run['features'].get('run_key')==run_key]
+        if x:
+            return sum(x)/len(x)
+        if self._fit is None:
+            self._fit=self._get_fit()
+        a,b=self._fit
+        return max(a+b*self._get_work(features),0.0)
+    
+    
+    def save(self):
+        """Saves the history to the history file, if there is one.
+        
+        """
+        if not self._history_filepath is None:
+            with open(self._history_filepath,'w') as f:
+                json.dump(self._history,f)
+        
+        
+    def _get_fit(self):
+        """Returns the coefficients (a,b) of the linear fit runtime=a+b*work.
+        
+        :rtype: tuple
+        
+        """
+        work=np.array([self._get_work(run['features']) for run in self._history],dtype=float)
+        wall_time=np.array([run['wall_time'] for run in self._history],dtype=float)
+        if len(set(work))>=2:
+            b,a=np.polyfit(work,wall_time,1)
+            if b>0:
+                return a,b
+        if work.sum()>0: # a rate with no intercept
+            return 0.0,wall_time.sum()/work.sum()
+        return 0.0,self.default_rate
+    
+    
+    def _get_epw_hash(self,epw_filepath):
+        """Returns the hash of a weather file, which is stored until the file changes.
+        
+        :rtype: str
+        
+        """
+        fp=os.path.abspath(epw_filepath)
+        try:
+            st=os.stat(fp)
+        except OSError: # the file does not exist, so the filepath is used
+            return epw_filepath
+        key=(fp,st.st_size,st.st_mtime_ns)
+        if not key in self._epw_hashes:
+            self._epw_hashes[key]=_get_file_hash(fp)
+        return self._epw_hashes[key]
+    
+    
+    @staticmethod
+    def _get_work(features):
+        """Returns the amount of work in a simulation, based on its features.
+        
+        Each design day is counted as 7 days to allow for the warmup days.
+        
+        :rtype: float
+        
+        """
+        days=features['run_period_days']+7*features['design_days']
+        return (days*24*features['timesteps_per_hour']
+                *(features['zones']+features['surfaces']))
+        
+        
+class EPJobLedger():
+    """A resumable batch of EnergyPlus simulations, recorded in an SQLite database.
+    
+    Each job is recorded in the ledger with its `runsim` keyword arguments, 
+    a hash of its input file, its state ('pending', 'running', 'done' or 'failed'),
+    its output files and the resources used by the simulation. If a batch is 
+    interrupted, calling `run` again with the same jobs runs only the jobs 
+    which are not done.
+    
+    :param fp: The filepath of the SQLite database. This is created if it does
+        not exist.
+    :type fp: str
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> from eprun import EPJobLedger
+       >>> ledger=EPJobLedger('sweep.sqlite')
+       >>> ledger.run(jobs,
+       >>>            ep_dir='C:\EnergyPlusV9-6-0',
+       >>>            sim_dir='sweep')
+       >>> print(ledger.get_stats())
+       {'total': 20000, 'pending': 0, 'running': 0, 'done': 19950, 'failed': 50, 
+        'failure_rate': 0.0025, 'mean_wall_time': 41.3, 'throughput_per_hour': 5210.4}
+    
+    """
+    
+    _columns=('id','job_key','job','input_hash','state','sim_dir','returncode',
+              'files','wall_time','user_time','system_time','peak_rss','bytes_written',
+              'start_time','end_time','attempts','error')
+    
+    def __init__(self,fp):
+        ""
+        self._fp=fp
+        self._lock=threading.Lock()
+        with self._connect() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                                  id INTEGER PRIMARY KEY,
+                                  job_key TEXT UNIQUE NOT NULL,
+                                  job TEXT NOT NULL,
+                                  input_hash TEXT,
+                                  state TEXT NOT NULL,
+                                  sim_dir TEXT NOT NULL,
+                                  returncode INTEGER,
+                                  files TEXT,
+                                  wall_time REAL,
+                                  user_time REAL,
+                                  system_time REAL,
+                                  peak_rss INTEGER,
+                                  bytes_written INTEGER,
+                                  start_time REAL,
+                                  end_time REAL,
+                                  attempts INTEGER NOT NULL DEFAULT 0,
+                                  error TEXT)""")
+        
+        
+    def __repr__(self):
+        ""
+        return 'EPJobLedger(fp="%s")' % self._fp
+    
+    
+    def add_jobs(self,jobs,sim_dir='.'):
+        """Adds jobs to the ledger. Jobs which are already in the ledger are not added again.
+        
+        :param jobs: The simulations. Each job is a dictionary of keyword 
+            arguments to `runsim` which can be stored as JSON, for example 
+            {'input_filepath':'1.idf','epw_filepath':'1.epw'}.
+        :type jobs: list (dict)
+        :param sim_dir: If a job has no 'sim_dir', it is run in a subdirectory
+            of this directory named after the index of the job, as for `runsim_batch`.
+        :type sim_dir: str
+        
+        :returns: The ids of the jobs in the ledger, in the same order as `jobs`.
+        :rtype: list (int)
+        
+        """
+        result=[]
+        with self._lock, self._connect() as connection:
+            for job in _get_batch_job_kwargs(jobs,{'sim_dir':sim_dir}):
+                job['sim_dir']=os.path.abspath(job['sim_dir'])
+                x=json.dumps(job,sort_keys=True)
+                job_key=hashlib.sha256(x.encode()).hexdigest()
+                row=connection.execute('SELECT id FROM jobs WHERE job_key=?',(job_key,)).fetchone()
+                if row is None:
+                    try:
+                        input_hash=_get_input_file_hash(job['input_filepath'])
+                    except (OSError,ValueError,KeyError):
+                        input_hash=None
+                    cursor=connection.execute('INSERT INTO jobs (job_key,job,input_hash,state,sim_dir) '
+                                              'VALUES (?,?,?,?,?)',
+                                              (job_key,x,input_hash,'pending',job['sim_dir']))
+                    result.append(cursor.lastrowid)
+                else:
+                    result.append(row[0])
+        return result
+    
+    
+    def get_dataframe(self):
+        """Returns the jobs in the ledger as a DataFrame.
+        
+        :returns: A DataFrame with a row for each job, indexed by the job id. 
+        :rtype: pandas.DataFrame
+        
+        """
+        with self._connect() as connection:
+            return pd.read_sql_query('SELECT * FROM jobs ORDER BY id',
+                                     connection,
+                                     index_col='id')
+    
+    
+    def get_jobs(self,state=None):
+        """Returns the jobs in the ledger.
+        
+        :param state: If given, only the jobs in this state are returned.
+            One of 'pending', 'running', 'done' or 'failed'.
+        :type state: str
+        
+        :returns: A list of dictionaries, one for each job, with the keys 
+            'id', 'job_key', 'job', 'input_hash', 'state', 'sim_dir', 'returncode', 
+            'files', 'wall_time', 'user_time', 'system_time', 'peak_rss', 
+            'bytes_written', 'start_time', 'end_time', 'attempts' and 'error'.
+            The 'job' and 'files' values are decoded from JSON.
+        :rtype: list (dict)
+        
+        """
+        with self._connect() as connection:
+            if state is None:
+                rows=connection.execute('SELECT * FROM jobs ORDER BY id').fetchall()
+            else:
+                rows=connection.execute('SELECT * FROM jobs WHERE state=? ORDER BY id',
+                                        (state,)).fetchall()
+        result=[]
+        for row in rows:
+            x=dict(zip(self._columns,row))
+            x['job']=json.loads(x['job'])
+            x['files']=None if x['files'] is None else json.loads(x['files'])
+            result.append(x)
+        return result
+    
+    
+    def get_stats(self):
+        """Returns statistics of the jobs in the ledger.
+        
+        :returns: A dictionary with keys:
+            - 'total', 'pending', 'running', 'done' and 'failed': the number of jobs.
+            - 'failure_rate': the fraction of finished jobs which failed, or None.
+            - 'mean_wall_time': the mean runtime in seconds of the done jobs, or None.
+            - 'throughput_per_hour': the number of finished jobs per hour between
+              the first start and the last end of a job, or None.
+        :rtype: dict
+        
+        """
+        with self._connect() as connection:
+            counts=dict(connection.execute('SELECT state,COUNT(*) FROM jobs GROUP BY state').fetchall())
+            mean_wall_time=connection.execute("SELECT AVG(wall_time) FROM jobs WHERE state='done'").fetchone()[0]
+            start_time,end_time=connection.execute("SELECT MIN(start_time),MAX(end_time) FROM jobs "
+                                                   "WHERE state IN ('done','failed')").fetchone()
+        result={'total':sum(counts.values())}
+        for state in ('pending','running','done','failed'):
+            result[state]=counts.get(state,0)
+        finished=result['done']+result['failed']
+        result['failure_rate']=result['failed']/finished if finished else None
+        result['mean_wall_time']=mean_wall_time
+        if finished and end_time>start_time:
+            result['throughput_per_hour']=finished/(end_time-start_time)*3600
+        else:
+            result['throughput_per_hour']=None
+        return result
+    
+    
+    def reconcile(self):
+        """Resets the jobs which did not finish, so that they are run again.
+        
+        Jobs left in the 'running' state, for example after a crash or a reboot,
+        and 'done' jobs whose output files are missing are set back to 'pending'.
+        The output files in the simulation directories of the 'running' jobs are
+        removed, so that no half-written files remain.
+        
+        :returns: The ids of the jobs which were reset.
+        :rtype: list (int)
+        
+        """
+        result=[]
+        for x in self.get_jobs('running'):
+            job=x['job']
+            for extension,fp in _get_output_filenames(job.get('output_prefix','eplus'),
+                                                      job.get('output_suffix','L'),
+                                                      job.get('input_filepath'),
+                                                      job.get('convert',False)):
+                try:
+                    os.remove(os.path.join(x['sim_dir'],fp))
+                except OSError:
+                    pass
+            result.append(x['id'])
+        for x in self.get_jobs('done'):
+            if not all(os.path.isfile(fp) for fp in (x['files'] or {}).values()):
+                result.append(x['id'])
+        with self._lock, self._connect() as connection:
+            connection.executemany("UPDATE jobs SET state='pending' WHERE id=?",
+                                   [(i,) for i in result])
+        return result
+    
+    
+    def run(self,
+            jobs=None,
+            max_workers=None,
+            retry_failed=False,
+            **kwargs):
+        """Runs the jobs in the ledger which are not done.
+        
+        The ledger is first reconciled (see `reconcile`), then the pending jobs 
+        are run concurrently as for `runsim_batch`. The state of each job is
+        updated in the ledger when it starts and finishes.
+        
+        :param jobs: If given, jobs which are added to the ledger first. 
+            See `add_jobs`.
+        :type jobs: list (dict)
+        :param max_workers: The maximum number of simulations to run at the same time.
+            See `iter_runsim_batch`.
+        :type max_workers: int
+        :param retry_failed: If True, the failed jobs are also run again.
+        :type retry_failed: bool
+        :param kwargs: Keyword arguments to `runsim` which are used for all jobs,
+            for example `ep_dir`. These are not stored in the ledger. 
+            A 'sim_dir' keyword argument is passed to `add_jobs`.
+        
+        :returns: A dictionary of the EPResult of each job which was run, with 
+            the job ids as keys. Jobs for which `runsim` raised an exception 
+            have a `returncode` of None, see `iter_runsim_batch`. If the run is
+            interrupted, the jobs which have not started are cancelled and stay
+            pending.
+        :rtype: dict (int,EPResult)
+        
+        """
+        sim_dir=kwargs.pop('sim_dir','.')
+        if not jobs is None:
+            self.add_jobs(jobs,sim_dir)
+        self.reconcile()
+        
+        states=('pending','failed') if retry_failed else ('pending',)
+        x=[job for state in states for job in self.get_jobs(state)]
+        
+        result={}
+        executor=concurrent.futures.ThreadPoolExecutor(max_workers=_get_batch_max_workers(max_workers))
+        futures={executor.submit(self._run_job,job['id'],job['job'],kwargs):job['id'] 
+                 for job in x}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                result[futures[future]]=future.result()
+        finally:
+            _cancel_futures(executor,futures)
+        return result
+    
+    
+    @contextlib.contextmanager
+    def _connect(self):
+        """Opens a new connection to the database, which is committed and closed on exit.
+        
+        :rtype: sqlite3.Connection
+        
+        """
+        connection=sqlite3.connect(self._fp,timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+    
+    
+    def _run_job(self,job_id,job,kwargs):
+        """Runs a job and records its state and results in the ledger.
+        
+        :returns: The EPResult. If `runsim` raised an exception, this has a 
+            `returncode` of None, see `_get_failed_epresult`.
+        :rtype: EPResult
+        
+        """
+        with self._lock, self._connect() as connection:
+            connection.execute("UPDATE jobs SET state='running',start_time=?,end_time=NULL,"
+                               "attempts=attempts+1,error=NULL WHERE id=?",
+                               (time.time(),job_id))
+        x=dict(kwargs)
+        x.update(job)
+        epresult=_run_batch_job(x)
+        if not epresult.exception is None:
+            with self._lock, self._connect() as connection:
+                connection.execute("UPDATE jobs SET state='failed',end_time=?,error=? WHERE id=?",
+                                   (time.time(),repr(epresult.exception),job_id))
+            return epresult
+        with self._lock, self._connect() as connection:
+            connection.execute('UPDATE jobs SET state=?,returncode=?,files=?,wall_time=?,user_time=?,'
+                               'system_time=?,peak_rss=?,bytes_written=?,end_time=? WHERE id=?',
+                               ('done' if epresult.returncode==0 else 'failed',
+                                epresult.returncode,
+                                json.dumps(epresult.files),
+                                epresult.wall_time,
+                                epresult.user_time,
+                                epresult.system_time,
+                                epresult.peak_rss,
+                                epresult.bytes_written,
+                                time.time(),
+                                job_id))
+        return epresult
+        
+        
+class EPJobQueue():
+    """A queue of EnergyPlus simulations in a directory, shared by any number of worker processes.
+    
+    The queue needs no central service: it is a directory, for example on an NFS 
+    mount shared by several computers, with the subdirectories 'pending', 
+    'claimed', 'done' and 'failed'. Each job is a JSON file which is moved 
+    between these subdirectories with atomic renames. A worker claims a job by
+    renaming its file from 'pending' to 'claimed', and renews the lease on the job
+    while the simulation runs by updating the modification time of the file. 
+    Jobs whose lease has expired, for example because their worker has died, 
+    are moved back to 'pending' by the other workers. 
+    
+    :param queue_dir: The directory of the queue. This is created if it does 
+        not exist.
+    :type queue_dir: str
+    :param lease_time: The time in seconds after which a job claimed by a worker
+        which has not renewed its lease is claimed again. As the lease times 
+        are compared between computers, this should be much longer than any 
+        difference between their clocks.
+    :type lease_time: float
+    
+    .. rubric:: Code Example
+    
+    .. code-block:: python
+           
+       >>> # on one computer
+       >>> from eprun import EPJobQueue
+       >>> queue=EPJobQueue('/mnt/shared/queue')
+       >>> queue.put([{'input_filepath':'/mnt/shared/%s.idf' % i} for i in range(1000)])
+       
+       >>> # on each computer, once or more
+       >>> from eprun import EPJobQueue
+       >>> queue=EPJobQueue('/mnt/shared/queue')
+       >>> queue.run_worker(ep_dir='/usr/local/EnergyPlus-9-6-0',
+       >>>                  epw_filepath='/mnt/shared/weather.epw')
+       
+       >>> # when all workers are done
+       >>> print(queue.get_stats())
+       {'pending': 0, 'claimed': 0, 'done': 998, 'failed': 2}
+    
+    """
+    
+    _states=('pending','claimed','done','failed')
+    
+    def __init__(self,queue_dir,lease_time=600):
+        ""
+        self._queue_dir=os.path.abspath(queue_dir)
+        self._lease_time=lease_time
+        for state in self._states:
+            os.makedirs(os.path.join(self._queue_dir,state),exist_ok=True)
+        
+        
+    def __repr__(self):
+        ""
+        return 'EPJobQueue(queue_dir="%s")' % self._queue_dir
+    
+    
+    def get_results(self):
+        """Returns the results published by the workers.
+        
+        :returns: A dictionary with the job ids as keys and dictionaries as values,
+            with keys 'job', 'worker', 'returncode', 'stdout', 'files', 'wall_time',
+            'user_time', 'system_time', 'peak_rss', 'bytes_written', 'start_time' 
+            and 'error'. The 'error' is the exception raised by `runsim`, if any,
+            in which case the results of the simulation are None.
+        :rtype: dict
+        
+        """
+        result={}
+        for state in ('done','failed'):
+            for job_id in self._list(state):
+                try:
+                    with open(self._get_filepath(state,job_id),'r') as f:
+                        result[job_id]=json.load(f)
+                except (OSError,ValueError): # for example the job was claimed again
+                    pass
+        return dict(sorted(result.items()))
+    
+    
+    def get_stats(self):
+        """Returns the number of jobs in each state.
+        
+        :returns: A dictionary with keys 'pending', 'claimed', 'done' and 'failed'.
+        :rtype: dict
+        
+        """
+        return {state:len(self._list(state)) for state in self._states}
+    
+    
+    def put(self,jobs,sim_dir=None):
+        """Adds jobs to the queue.
+        
+        :param jobs: The simulations. Each job is a dictionary of keyword 
+            arguments to `runsim` which can be stored as JSON, for example 
+            {'input_filepath':'1.idf'}. The filepaths should be absolute filepaths
+            on the shared file system.
+        :type jobs: list (dict)
+        :param sim_dir: If a job has no 'sim_dir', it is run in a subdirectory
+            of this directory named after the job id. Defaults to the 'sims' 
+            subdirectory of the queue directory.
+        :type sim_dir: str
+        
+        :returns: The job ids.
+        :rtype: list (str)
+        
+        """
+        if sim_dir is None:
+            sim_dir=os.path.join(self._queue_dir,'sims')
+        batch_id='%x-%s' % (int(time.time()),hashlib.sha256(os.urandom(16)).hexdigest()[:8])
+        result=[]
+        for i,job in enumerate(jobs):
+            job_id='%s-%06d' % (batch_id,i)
+            job=dict(job)
+            job.setdefault('sim_dir',os.path.join(os.path.abspath(sim_dir),job_id))
+            self._write('pending',job_id,job)
+            result.append(job_id)
+        return result
+    
+    
+    def reclaim(self):
+        """Moves the claimed jobs whose lease has expired back to the pending jobs.
+        
+        :returns: The ids of the jobs which were moved.
+        :rtype: list (str)
+        
+        """
+        result=[]
+        now=time.time()
+        for x in os.listdir(os.path.join(self._queue_dir,'claimed')):
+            if not x.endswith('.json'): # a job whose results are being published
+                continue
+            fp=os.path.join(self._queue_dir,'claimed',x)
+            try:
+                if now-os.path.getmtime(fp)<self._lease_time:
+                    continue
+                job_id=x.split('.')[0]
+                os.rename(fp,self._get_filepath('pending',job_id))
+            except OSError: # for example the job was finished or reclaimed by another worker
+                continue
+            result.append(job_id)
+        return result
+    
+    
+    def run_worker(self,
+                   max_jobs=None,
+                   wait=False,
+                   poll_interval=1,
+                   **kwargs):
+        """Claims and runs jobs from the queue, until there are none left.
+        
+        Any number of workers can run at the same time, in the same or different
+        processes and computers. 
+        
+        :param max_jobs: If given, the worker stops after running this number of jobs.
+        :type max_jobs: int
+        :param wait: If True, the worker does not stop while there are claimed 
+            jobs, which may be claimed again if their worker dies. If False, the 
+            worker stops as soon as there are no pending jobs.
+        :type wait: bool
+        :param poll_interval: The time in seconds between checks of the queue 
+            when `wait` is True.
+        :type poll_interval: float
+        :param kwargs: Keyword arguments to `runsim` which are used for all jobs,
+            for example `ep_dir`. The keyword arguments of each job take 
+            precedence.
+        
+        :returns: The ids of the jobs run by this worker.
+        :rtype: list (str)
+        
+        """
+        worker_id='%s-%s-%s' % (os.uname().nodename if hasattr(os,'uname') else 'localhost',
+                                os.getpid(),
+                                threading.get_ident())
+        worker_id=worker_id.replace('.','_') # job ids are split from the filenames at '.'
+        result=[]
+        while max_jobs is None or len(result)<max_jobs:
+            self.reclaim()
+            x=self._claim(worker_id)
+            if x is None:
+                if wait and self._list('claimed'):
+                    time.sleep(poll_interval)
+                    continue
+                break
+            job_id,job=x
+            self._run_job(job_id,job,worker_id,kwargs)
+            result.append(job_id)
+        return result
+    
+    
+    def _claim(self,worker_id):
+        """Claims a pending job.
+        
+        :returns: A (job_id, job) tuple, or None if there are no pending jobs.
+        :rtype: tuple
+        
+        """
+        for job_id in self._list('pending'):
+            fp=self._get_filepath('claimed',job_id,worker_id)
+            try:
+                # the rename keeps the modification time, so the file is touched
+                # first to start the lease, otherwise a concurrent `reclaim` could
+                # see the time of `put` and move the job straight back to pending
+                os.utime(self._get_filepath('pending',job_id))
+                os.rename(self._get_filepath('pending',job_id),fp)
+                os.utime(fp)
+                with open(fp,'r') as f:
+                    return job_id,json.load(f)
+            except OSError: # the job was claimed by another worker
+                continue
+        return None
+    
+    
+    def _get_filepath(self,state,job_id,worker_id=None):
+        """Returns the filepath of a job file.
+        
+        :rtype: str
+        
+        """
+        if worker_id is None:
+            return os.path.join(self._queue_dir,state,'%s.json' % job_id)
+        else:
+            return os.path.join(self._queue_dir,state,'%s.%s.json' % (job_id,worker_id))
+        
+        
+    def _list(self,state):
+        """Returns the ids of the jobs in a state.
+        
+        :rtype: list (str)
+        
+        """
+        return sorted(x.split('.')[0] 
+                      for x in os.listdir(os.path.join(self._queue_dir,state))
+                      if x.endswith('.json'))
+    
+    
+    def _run_job(self,job_id,job,worker_id,kwargs):
+        """Runs a claimed job and publishes its results.
+        
+        If the lease on the job is lost, because the job was moved back to 
+        pending by another worker, the simulation is stopped at the next line 
+        of EnergyPlus output and no results are published.
+        
+        :returns: True if the results were published, otherwise False.
+        :rtype: bool
+        
+        """
+        fp=self._get_filepath('claimed',job_id,worker_id)
+        finished=threading.Event()
+        lost=threading.Event()
+        
+        def renew_lease():
+            while not finished.wait(self._lease_time/4):
+                try:
+                    os.utime(fp)
+                except OSError: # the job was claimed again
+                    lost.set()
+                    return
+        
+        def progress_callback(progress):
+            if lost.is_set():
+                raise RuntimeError('the lease on job %s was lost' % job_id)
+            if not kwargs.get('progress_callback') is None:
+                kwargs['progress_callback'](progress)
+                
+        thread=threading.Thread(target=renew_lease,daemon=True)
+        thread.start()
+        x=dict(kwargs)
+        x.update(job)
+        x['progress_callback']=progress_callback
+        os.makedirs(x['sim_dir'],exist_ok=True)
+        result={'job':job,'worker':worker_id,'error':None}
+        try:
+            epresult=runsim(**x)
+        except Exception as err:
+            epresult=None
+            result['error']=repr(err)
+        finally:
+            finished.set()
+            thread.join()
+        
+        # the claimed file is renamed before the results are published, so that
+        # it cannot be reclaimed in between
+        publishing_fp='%s.%s.publishing' % (fp,os.getpid())
+        try:
+            os.rename(fp,publishing_fp)
+        except OSError: # the job was claimed again by another worker
+            return False
+        for k in ('returncode','stdout','files','wall_time','user_time','system_time',
+                  'peak_rss','bytes_written','start_time'):
+            result[k]=None if epresult is None else getattr(epresult,k)
+        state='done' if not epresult is None and epresult.returncode==0 else 'failed'
+        self._write(state,job_id,result)
+        os.remove(publishing_fp)
+        return True
+        
+        
+    def _write(self,state,job_id,x):
+        """Writes a job file, using a temporary file which is then renamed.
+        
+        """
+        fp=self._get_filepath(state,job_id)
+        temp_fp='%s.%s.tmp' % (fp,os.getpid())
+        with open(temp_fp,'w') as f:
+            json.dump(x,f)
+        os.replace(temp_fp,fp)
+        
+        
+class EPEnd():
+    """A class for an EnergyPlus .end file.
+    
+    :param fp: The filepath for the .end file.
+    :type fp: str
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import EPEnd
+       >>> end=EPEnd(r'simulation_files\eplusout.end')
+       >>> print(type(end))
+       <class 'eprun.epend.EPEnd'>
+       >>> print(end.line)
+       EnergyPlus Completed Successfully-- 0 Warning; 0 Severe Errors; Elapsed Time=00hr 00min  2.21sec
+    
+    .. seealso::
+    
+       Output Details and Examples, page 125.
+       https://energyplus.net/quickstart#reading
+    
+    """        
+    
+    def __init__(self,fp):
+        ""
+        with open(fp,'r') as f:
+            self._line=f.readline().strip()
+            
+            
+    @property
+    def line(self):
+        """The single line recorded in the .end file.
+        
+        :rtype: str
+        """
+        return self._line
+        
+
+                    
+# the names of the fields of the data rows of an .epw file
+_epw_columns=('year','month','day','hour','minute','data_source_and_uncertainty_flags',
+              'dry_bulb_temperature','dew_point_temperature','relative_humidity',
+              'atmospheric_station_pressure','extraterrestrial_horizontal_radiation',
+              'extraterrestrial_direct_normal_radiation','horizontal_infrared_radiation_intensity',
+              'global_horizontal_radiation','direct_normal_radiation','diffuse_horizontal_radiation',
+              'global_horizontal_illuminance','direct_normal_illuminance',
+              'diffuse_horizontal_illuminance','zenith_luminance','wind_direction','wind_speed',
+              'total_sky_cover','opaque_sky_cover','visibility','ceiling_height',
+              'present_weather_observation','present_weather_codes','precipitable_water',
+              'aerosol_optical_depth','snow_depth','days_since_last_snowfall','albedo',
+              'liquid_precipitation_depth','liquid_precipitation_quantity')
+
+
+# the numpy dtypes of the .epw data fields which are not np.float64
+# - an integer field with missing values is stored as np.float64
+_epw_dtypes={'year':np.int16,
+             'month':np.int8,
+             'day':np.int8,
+             'hour':np.int8,
+             'minute':np.int8,
+             'data_source_and_uncertainty_flags':str,
+             'present_weather_observation':np.int8,
+             'present_weather_codes':str}
+
+
+# the values of the .epw data fields which indicate a missing value
+# - see the EnergyPlus Auxiliary Programs documentation, 'Data Field Descriptions'
+_epw_missing_values={'dry_bulb_temperature':99.9,
+                     'dew_point_temperature':99.9,
+                     'relative_humidity':999,
+                     'atmospheric_station_pressure':999999,
+                     'extraterrestrial_horizontal_radiation':9999,
+                     'extraterrestrial_direct_normal_radiation':9999,
+                     'horizontal_infrared_radiation_intensity':9999,
+                     'global_horizontal_radiation':9999,
+                     'direct_normal_radiation':9999,
+                     'diffuse_horizontal_radiation':9999,
+                     'global_horizontal_illuminance':999999,
+                     'direct_normal_illuminance':999999,
+                     'diffuse_horizontal_illuminance':999999,
+                     'zenith_luminance':9999,
+                     'wind_direction':999,
+                     'wind_speed':999,
+                     'total_sky_cover':99,
+                     'opaque_sky_cover':99,
+                     'visibility':9999,
+                     'ceiling_height':99999,
+                     'precipitable_water':999,
+                     'aerosol_optical_depth':0.999,
+                     'snow_depth':999,
+                     'days_since_last_snowfall':99,
+                     'albedo':999,
+                     'liquid_precipitation_depth':999,
+                     'liquid_precipitation_quantity':99}
+
+
+_epw_cache_magic=b'EPRUNEPW'
+
+
+_epw_cache_version=1
+
+
+_epw_cache_alignment=64
+
+
+def _to_float(x):
+    """Returns a field of an .epw header record as a float, or None if it is empty.
+    
+    :rtype: float
+    
+    """
+    x=x.strip()
+    return float(x) if x else None
+
+
+def _read_epw_header(lines):
+    """Reads the header records of an .epw file.
+    
+    :param lines: The header lines, from 'LOCATION' to 'DATA PERIODS'.
+    :type lines: list (str)
+    
+    :returns: A dictionary with keys 'location', 'design_conditions', 
+        'typical_extreme_periods', 'ground_temperatures', 
+        'holidays_daylight_savings', 'comments_1', 'comments_2' and 'data_periods'.
+        See the `EPEpw` properties for the values.
+    :rtype: dict
+    
+    """
+    result={'location':None,
+            'design_conditions':None,
+            'typical_extreme_periods':[],
+            'ground_temperatures':[],
+            'holidays_daylight_savings':None,
+            'comments_1':None,
+            'comments_2':None,
+            'data_periods':None}
+    for line in lines:
+        record,_,x=line.rstrip('\r\n').partition(',')
+        record=record.strip().upper()
+        fields=x.split(',')
+        
+        if record=='LOCATION':
+            result['location']={'city':fields[0].strip(),
+                                'state_province_region':fields[1].strip(),
+                                'country':fields[2].strip(),
+                                'data_source':fields[3].strip(),
+                                'wmo_number':fields[4].strip(),
+                                'latitude':_to_float(fields[5]),
+                                'longitude':_to_float(fields[6]),
+                                'time_zone':_to_float(fields[7]),
+                                'elevation':_to_float(fields[8])}
+            
+        elif record=='DESIGN CONDITIONS':
+            d={'number_of_design_conditions':int(fields[0] or 0),
+               'source':fields[1].strip() if len(fields)>1 else None}
+            key=None
+            for y in fields[3:]:
+                if y.strip().lower() in ('heating','cooling','extremes'):
+                    key=y.strip().lower()
+                    d[key]=[]
+                elif not key is None:
+                    d[key].append(_to_float(y))
+            result['design_conditions']=d
+            
+        elif record=='TYPICAL/EXTREME PERIODS':
+            for i in range(int(fields[0] or 0)):
+                y=fields[1+i*4:5+i*4]
+                result['typical_extreme_periods'].append({'name':y[0].strip(),
+                                                          'type':y[1].strip(),
+                                                          'start_day':y[2].replace(' ',''),
+                                                          'end_day':y[3].replace(' ','')})
+                
+        elif record=='GROUND TEMPERATURES':
+            for i in range(int(fields[0] or 0)):
+                y=fields[1+i*16:17+i*16]
+                result['ground_temperatures'].append({'depth':_to_float(y[0]),
+                                                      'soil_conductivity':_to_float(y[1]),
+                                                      'soil_density':_to_float(y[2]),
+                                                      'soil_specific_heat':_to_float(y[3]),
+                                                      'monthly_temperatures':[_to_float(z) for z in y[4:16]]})
+                
+        elif record=='HOLIDAYS/DAYLIGHT SAVINGS':
+            result['holidays_daylight_savings']={
+                'leap_year_observed':fields[0].strip().lower()=='yes',
+                'daylight_saving_start_day':fields[1].strip(),
+                'daylight_saving_end_day':fields[2].strip(),
+                'holidays':[{'name':fields[4+i*2].strip(),'day':fields[5+i*2].strip()}
+                            for i in range(int(fields[3] or 0))]}
+            
+        elif record=='COMMENTS 1':
+            result['comments_1']=x.strip()
+            
+        elif record=='COMMENTS 2':
+            result['comments_2']=x.strip()
+            
+        elif record=='DATA PERIODS':
+            result['data_periods']={
+                'number_of_records_per_hour':int(fields[1]),
+                'periods':[{'name':fields[2+i*4].strip(),
+                            'start_day_of_week':fields[3+i*4].strip(),
+                            'start_day':fields[4+i*4].replace(' ',''),
+                            'end_day':fields[5+i*4].replace(' ','')}
+                           for i in range(int(fields[0]))]}
+            
+    return result
+
+
+class EPEpw():
+    """A class for an EnergyPlus .epw weather file.
+    
+    The header records are read into dictionaries and the hourly (or sub-hourly)
+    data rows are read in one pass into a numpy array for each field.
+    
+    :param fp: The filepath for the .epw file.
+    :type fp: str
+    :param cache: If True, the file is read from a binary cache file next to 
+        the .epw file (with '.cache' appended to `fp`), which is written on 
+        first use and written again if the .epw file changes. See `to_cache`.
+    :type cache: bool
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import EPEpw
+       >>> epw=EPEpw('USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+       >>> print(epw.location)
+       {'city': 'San Francisco Intl Ap', 'state_province_region': 'CA', 
+        'country': 'USA', 'data_source': 'TMY3', 'wmo_number': '724940', 
+        'latitude': 37.62, 'longitude': -122.4, 'time_zone': -8.0, 'elevation': 2.0}
+       >>> print(epw.columns['dry_bulb_temperature'].mean())
+       13.79
+       
+    .. seealso::
+    
+       Auxiliary Programs, Weather Converter Program, EnergyPlus Weather File (EPW) Data Dictionary.
+       https://energyplus.net/documentation
+    
+    """
+    
+    def __init__(self,fp,cache=False):
+        ""
+        self._fp=fp
+        if cache:
+            cache_fp=fp+'.cache'
+            try:
+                st=os.stat(fp)
+                header=self._read_cache(cache_fp)
+                if header['size']==st.st_size and header['mtime_ns']==st.st_mtime_ns:
+                    return
+            except (OSError,ValueError,KeyError): # no valid cache file
+                pass
+        
+        header_lines=[]
+        with open(fp,'r',errors='replace') as f:
+            for line in f:
+                header_lines.append(line)
+                if line.upper().startswith('DATA PERIODS'):
+                    break
+                    
+        df=pd.read_csv(fp,
+                       skiprows=len(header_lines),
+                       header=None,
+                       names=_epw_columns,
+                       usecols=range(len(_epw_columns)),
+                       dtype={k:str for k,v in _epw_dtypes.items() if v is str})
+        columns={}
+        for k in _epw_columns:
+            dtype=_epw_dtypes.get(k,np.float64)
+            if dtype is str:
+                columns[k]=df[k].fillna('').to_numpy(dtype=str)
+            else:
+                x=df[k].to_numpy(dtype=np.float64)
+                columns[k]=x if dtype is np.float64 or np.isnan(x).any() else x.astype(dtype)
+        
+        self._header_lines=[x.rstrip('\r\n') for x in header_lines]
+        self._header=_read_epw_header(header_lines)
+        self._columns=columns
+        self._column_text={}
+        
+        if cache:
+            try:
+                self.to_cache(cache_fp)
+            except OSError:
+                pass
+        
+        
+    def __repr__(self):
+        ""
+        return 'EPEpw(fp="%s")' % self._fp
+    
+    
+    @property
+    def columns(self):
+        """The data fields of the .epw file.
+        
+        :returns: A dictionary with the field names as keys, for example 
+            'dry_bulb_temperature', and numpy arrays with a value for each 
+            data row as values. See `_epw_columns` and `_epw_dtypes`.
+        :rtype: dict (str,numpy.ndarray)
+        
+        """
+        return self._columns
+    
+    
+    @property
+    def comments_1(self):
+        """The COMMENTS 1 record of the .epw file.
+        
+        :rtype: str
+        
+        """
+        return self._header['comments_1']
+    
+    
+    @property
+    def comments_2(self):
+        """The COMMENTS 2 record of the .epw file.
+        
+        :rtype: str
+        
+        """
+        return self._header['comments_2']
+    
+    
+    @property
+    def data_periods(self):
+        """The DATA PERIODS record of the .epw file.
+        
+        :returns: A dictionary with keys 'number_of_records_per_hour' and 
+            'periods', a list of dictionaries with keys 'name', 
+            'start_day_of_week', 'start_day' and 'end_day'.
+        :rtype: dict
+        
+        """
+        return self._header['data_periods']
+    
+    
+    @property
+    def design_conditions(self):
+        """The DESIGN CONDITIONS record of the .epw file.
+        
+        :returns: A dictionary with keys 'number_of_design_conditions', 'source'
+            and, if given, 'heating', 'cooling' and 'extremes' with lists of 
+            the values of the ASHRAE design conditions. Or None if the record
+            does not exist.
+        :rtype: dict
+        
+        """
+        return self._header['design_conditions']
+    
+    
+    @classmethod
+    def from_cache(cls,path):
+        """Returns an EPEpw instance from a cache file written by `EPEpw.to_cache`.
+        
+        The cache file is memory-mapped and the data columns are read-only numpy 
+        arrays which use the memory map as their buffer.
+        
+        :param path: The filepath of the cache file.
+        :type path: str
+        
+        :raises ValueError: If the file is not an EPEpw cache file of the current version.
+        
+        :rtype: EPEpw
+        
+        """
+        epepw=cls.__new__(cls)
+        header=epepw._read_cache(path)
+        epepw._fp=header['fp']
+        return epepw
+    
+    
+    def get_dataframe(self):
+        """Returns the data fields of the .epw file as a DataFrame.
+        
+        :returns: A DataFrame with a row for each data row of the .epw file 
+            and a column for each field.
+        :rtype: pandas.DataFrame
+        
+        """
+        return pd.DataFrame(self._columns,
+                            columns=_epw_columns)
+    
+    
+    @property
+    def ground_temperatures(self):
+        """The GROUND TEMPERATURES record of the .epw file.
+        
+        :returns: A list of dictionaries, one for each depth, with keys 'depth',
+            'soil_conductivity', 'soil_density', 'soil_specific_heat' and 
+            'monthly_temperatures'.
+        :rtype: list (dict)
+        
+        """
+        return self._header['ground_temperatures']
+    
+    
+    @property
+    def header_lines(self):
+        """The lines of the header records of the .epw file, without line endings.
+        
+        :rtype: list (str)
+        
+        """
+        return self._header_lines
+    
+    
+    @property
+    def holidays_daylight_savings(self):
+        """The HOLIDAYS/DAYLIGHT SAVINGS record of the .epw file.
+        
+        :returns: A dictionary with keys 'leap_year_observed', 
+            'daylight_saving_start_day', 'daylight_saving_end_day' and 'holidays'.
+        :rtype: dict
+        
+        """
+        return self._header['holidays_daylight_savings']
+    
+    
+    @property
+    def location(self):
+        """The LOCATION record of the .epw file.
+        
+        :returns: A dictionary with keys 'city', 'state_province_region', 
+            'country', 'data_source', 'wmo_number', 'latitude', 'longitude', 
+            'time_zone' and 'elevation'.
+        :rtype: dict
+        
+        """
+        return self._header['location']
+    
+    
+    def morph(self,transformations):
+        """Returns a copy of the weather file with transformed data fields.
+        
+        Each field is transformed as a whole numpy array, using the 'shift',
+        'stretch' and 'scale' methods used to morph weather files for climate
+        change studies (Belcher et al., 2005):
+            
+        - stretch: x = mean + stretch * (x - mean), where mean is the monthly
+          mean of the field, so the monthly means are unchanged.
+        - scale: x = scale * x
+        - shift: x = x + shift
+        
+        These are applied in this order and the result is then limited to 
+        the 'min' and 'max' values, if given. Each value can be a number or a 
+        sequence of 12 monthly values. Fields which depend on a transformed 
+        field, for example the dew point temperature, are not changed unless 
+        they are also transformed. Missing values, which are given by a field's
+        missing code such as 99.9 for the dry bulb temperature or 9999 for the
+        radiation fields, are left out of the monthly means and are not 
+        changed. A function in `transformations` receives the values including
+        the missing codes.
+        
+        :param transformations: A dictionary with the field names as keys, 
+            for example 'dry_bulb_temperature', and as values either a 
+            dictionary with any of the keys 'shift', 'stretch', 'scale', 'min' 
+            and 'max', or a function which is called with the arguments 
+            (values, epepw) and returns the new numpy array of values.
+        :type transformations: dict
+        
+        :raises KeyError: If a field name is not an .epw data field.
+        
+        :rtype: EPEpw
+        
+        .. rubric:: Code Example
+            
+        .. code-block:: python
+               
+           >>> from eprun import EPEpw
+           >>> epw=EPEpw('USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+           >>> epw2=epw.morph({'dry_bulb_temperature':{'shift':2.0,'stretch':1.1},
+           >>>                 'dew_point_temperature':{'shift':2.0},
+           >>>                 'global_horizontal_radiation':{'scale':1.05,'min':0}})
+           >>> epw2.write('San_Francisco_2050.epw')
+        
+        """
+        columns=dict(self._columns)
+        month=self._columns['month'].astype(np.intp)
+        for k,transformation in transformations.items():
+            x=self._columns[k]
+            if callable(transformation):
+                columns[k]=np.asarray(transformation(x,self))
+            else:
+                columns[k]=_morph_epw_column(x,
+                                             month,
+                                             missing_value=_epw_missing_values.get(k),
+                                             **transformation)
+        
+        epepw=self.__class__.__new__(self.__class__)
+        epepw._fp=None
+        epepw._header_lines=list(self._header_lines)
+        epepw._header=self._header
+        epepw._columns=columns
+        epepw._column_text=dict(self._column_text) # the text of the fields which are not changed
+        return epepw
+        
+        
+    def to_cache(self,path):
+        """Writes the .epw file to a binary cache file.
+        
+        The cache file holds the header lines and the data columns as raw arrays.
+        Use `EPEpw.from_cache` to load it.
+        
+        :param path: The filepath of the cache file.
+        :type path: str
+        
+        """
+        arrays=[]
+        columns=[]
+        offset=0
+        for k in _epw_columns:
+            a=np.ascontiguousarray(self._columns[k])
+            columns.append({'name':k,
+                            'dtype':a.dtype.str,
+                            'offset':offset,
+                            'length':len(a)})
+            arrays.append(a)
+            offset+=-(-a.nbytes//_epw_cache_alignment)*_epw_cache_alignment
+            
+        try:
+            st=os.stat(self._fp)
+            size,mtime_ns=st.st_size,st.st_mtime_ns
+        except (OSError,TypeError): # for example a morphed weather file with no filepath
+            size,mtime_ns=None,None
+            
+        header=json.dumps({'version':_epw_cache_version,
+                           'fp':self._fp,
+                           'size':size,
+                           'mtime_ns':mtime_ns,
+                           'header_lines':self._header_lines,
+                           'columns':columns}).encode()
+        start=-(-(16+len(header))//_epw_cache_alignment)*_epw_cache_alignment
+        
+        # the cache file is written to a temporary file which is then renamed,
+        # as other processes may read it at the same time
+        temp_path='%s.%s.tmp' % (path,os.getpid())
+        with open(temp_path,'wb') as f:
+            f.write(_epw_cache_magic)
+            f.write(len(header).to_bytes(8,'little'))
+            f.write(header)
+            f.write(bytes(start-16-len(header)))
+            for a in arrays:
+                f.write(a.tobytes())
+                f.write(bytes(-a.nbytes%_epw_cache_alignment))
+        os.replace(temp_path,path)
+        
+        
+    @property
+    def typical_extreme_periods(self):
+        """The TYPICAL/EXTREME PERIODS record of the .epw file.
+        
+        :returns: A list of dictionaries, one for each period, with keys 'name',
+            'type', 'start_day' and 'end_day'.
+        :rtype: list (dict)
+        
+        """
+        return self._header['typical_extreme_periods']
+    
+    
+    def write(self,fp):
+        """Writes the weather file to an .epw file.
+        
+        The header records are written unchanged. Each data field is formatted 
+        as a whole column, with each distinct value formatted only once. 
+        The fields of a morphed copy which are not transformed use the text 
+        formatted for the original, if it has been written.
+        
+        :param fp: The filepath of the new .epw file.
+        :type fp: str
+        
+        """
+        columns=[self._get_column_text(k) for k in _epw_columns]
+        with open(fp,'w',newline='\r\n') as f:
+            f.write('\n'.join(self._header_lines))
+            f.write('\n')
+            f.write('\n'.join(map(','.join,zip(*columns))))
+            f.write('\n')
+            
+            
+    def _get_column_text(self,k):
+        """Returns the text of the values of a data field.
+        
+        The text is stored, and used again while the field is not changed,
+        so that the unchanged fields of morphed copies are formatted only once.
+        
+        :param k: The field name.
+        :type k: str
+        
+        :rtype: list (str)
+        
+        """
+        x=self._columns[k]
+        y,text=self._column_text.get(k,(None,None))
+        if not y is x:
+            text=_format_epw_column(x)
+            self._column_text[k]=(x,text)
+        return text
+    
+    
+    def _read_cache(self,path):
+        """Reads the header lines and data columns from a cache file.
+        
+        :param path: The filepath of the cache file.
+        :type path: str
+        
+        :raises ValueError: If the file is not an EPEpw cache file of the current version.
+        
+        :returns: The header of the cache file.
+        :rtype: dict
+        
+        """
+        with open(path,'rb') as f:
+            mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+            
+        if not mm[:8]==_epw_cache_magic:
+            raise ValueError('"%s" is not an EPEpw cache file' % path)
+        header_length=int.from_bytes(mm[8:16],'little')
+        header=json.loads(mm[16:16+header_length].decode())
+        if not header['version']==_epw_cache_version:
+            raise ValueError('EPEpw cache file "%s" has version %s, expected %s' 
+                             % (path,header['version'],_epw_cache_version))
+        start=-(-(16+header_length)//_epw_cache_alignment)*_epw_cache_alignment
+        
+        self._header_lines=header['header_lines']
+        self._header=_read_epw_header(header['header_lines'])
+        self._columns={x['name']:np.frombuffer(mm,
+                                               dtype=x['dtype'],
+                                               count=x['length'],
+                                               offset=start+x['offset'])
+                       for x in header['columns']}
+        self._column_text={}
+        return header
+    
+    
+def _format_epw_column(x):
+    """Returns the text of the values of an .epw data field.
+    
+    :param x: The values.
+    :type x: numpy.ndarray
+    
+    :returns: The text of each value. Missing (NaN) values are empty strings.
+    :rtype: list (str)
+    
+    """
+    if x.dtype.kind in 'US':
+        return x.astype(str).tolist()
+    values,inverse=np.unique(x,return_inverse=True)
+    if x.dtype.kind=='f':
+        text=np.array(['' if np.isnan(y) else '%.10g' % y for y in values.tolist()],dtype=object)
+    else:
+        text=np.array([str(y) for y in values.tolist()],dtype=object)
+    return text[inverse.ravel()].tolist()
+
+
+def _morph_epw_column(x,
+                      month,
+                      shift=None,
+                      stretch=None,
+                      scale=None,
+                      min=None,
+                      max=None,
+                      missing_value=None):
+    """Returns the transformed values of an .epw data field.
+    
+    See `EPEpw.morph` for the parameters.
+    
+    :param x: The values.
+    :type x: numpy.ndarray
+    :param month: The month of each value, from 1 to 12.
+    :type month: numpy.ndarray
+    :param missing_value: The value which indicates a missing value of the field,
+        see `_epw_missing_values`. Missing values, and empty fields read as NaN,
+        are left out of the monthly means and returned unchanged.
+    :type missing_value: float
+    
+    :rtype: numpy.ndarray
+    
+    """
+    def get_monthly(y):
+        y=np.asarray(y,dtype=np.float64)
+        return y[month-1] if y.ndim else y
+    
+    x=x.astype(np.float64)
+    missing=np.isnan(x)
+    if not missing_value is None:
+        missing|=np.isclose(x,missing_value,rtol=0,atol=1e-9)
+    valid=~missing
+    
+    result=x.copy()
+    if not stretch is None:
+        means=(np.bincount(month[valid],weights=result[valid],minlength=13)
+               /np.maximum(np.bincount(month[valid],minlength=13),1))[month]
+        result=means+get_monthly(stretch)*(result-means)
+    if not scale is None:
+        result=result*get_monthly(scale)
+    if not shift is None:
+        result=result+get_monthly(shift)
+    if not min is None or not max is None:
+        result=np.clip(result,
+                       None if min is None else get_monthly(min),
+                       None if max is None else get_monthly(max))
+    result[missing]=x[missing]
+    return result
+
+
+# the weather file morphed by the worker processes of `morph_epw_batch`
+_morph_epw=None
+
+
+def _init_morph_epw_worker(epw_filepath):
+    """Reads the weather file in a worker process of `morph_epw_batch`.
+    
+    """
+    global _morph_epw
+    _morph_epw=EPEpw(epw_filepath)
+    for k in _epw_columns: # format the fields once for all morphed copies
+        _morph_epw._get_column_text(k)
+    
+    
+def _write_morphed_epw(transformations,fp):
+    """Writes a morphed copy of the weather file read by `_init_morph_epw_worker`.
+    
+    :rtype: str
+    
+    """
+    _morph_epw.morph(transformations).write(fp)
+    return fp
+
+
+def morph_epw_batch(epw_filepath,
+                    variants,
+                    output_dir='.',
+                    max_workers=None):
+    """Writes morphed copies of a weather file, for example for a climate change or sensitivity study.
+    
+    :param epw_filepath: The filepath of the .epw file.
+    :type epw_filepath: str
+    :param variants: The transformations of each morphed copy. See `EPEpw.morph`.
+        When `max_workers` is greater than 1, any functions in the 
+        transformations must be defined at the top level of a module, so that
+        they can be sent to the worker processes.
+    :type variants: list (dict)
+    :param output_dir: The directory of the morphed .epw files, which are named
+        after `epw_filepath` and the index of the variant, for example 
+        'weather-0.epw'. This is created if it does not exist.
+    :type output_dir: str
+    :param max_workers: If greater than 1, the files are written by this number
+        of worker processes.
+    :type max_workers: int
+    
+    :returns: The filepaths of the morphed .epw files, in the same order as `variants`.
+    :rtype: list (str)
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import morph_epw_batch, runsim_batch
+       >>> variants=[{'dry_bulb_temperature':{'shift':x}} for x in (0.5,1.0,1.5,2.0)]
+       >>> fps=morph_epw_batch('USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+       >>>                     variants,
+       >>>                     output_dir='morphed',
+       >>>                     max_workers=4)
+       >>> epresults=runsim_batch([{'epw_filepath':fp} for fp in fps],
+       >>>                        input_filepath='1ZoneUncontrolled.idf',
+       >>>                        ep_dir='C:\EnergyPlusV9-6-0')
+    
+    """
+    os.makedirs(output_dir,exist_ok=True)
+    name=os.path.splitext(os.path.basename(epw_filepath))[0]
+    fps=[os.path.join(output_dir,'%s-%s.epw' % (name,i)) for i in range(len(variants))]
+    
+    if max_workers is None or max_workers<=1:
+        epepw=EPEpw(epw_filepath)
+        for k in _epw_columns: # format the fields once for all morphed copies
+            epepw._get_column_text(k)
+        for transformations,fp in zip(variants,fps):
+            epepw.morph(transformations).write(fp)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+                                                    initializer=_init_morph_epw_worker,
+                                                    initargs=(epw_filepath,)) as executor:
+            futures=[executor.submit(_write_morphed_epw,transformations,fp) 
+                     for transformations,fp in zip(variants,fps)]
+            for future in futures:
+                future.result()
+    return fps
+
+
+# the weather file fields used to select representative periods, and their weights
+_sampling_columns={'dry_bulb_temperature':1.0,
+                   'global_horizontal_radiation':1.0,
+                   'relative_humidity':0.5,
+                   'wind_speed':0.5}
+
+
+# the units of the .eso variables and meters which are summed over each reporting 
+# period, the values of variables with other units are averaged
+_summed_units=('J','kJ','MJ','GJ','Wh','kWh','MWh','m3','L','kg','hr')
+
+
+# the day of the year before the first day of each month, in a year without a leap day
+_month_start_days=(0,31,59,90,120,151,181,212,243,273,304,334)
+
+
+# the days of the week, in the order of `datetime.date.weekday`
+_weekdays=('Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday')
+
+
+def _get_day_of_year(month,day):
+    """Returns the day of the year of a date, in a year without a leap day.
+    
+    :rtype: int
+    
+    """
+    return _month_start_days[int(month)-1]+int(day)
+
+
+def _get_kmeans_labels(x,
+                       n_clusters,
+                       seed=0,
+                       max_iterations=100):
+    """Clusters the rows of an array with the k-means algorithm.
+    
+    The initial centroids are chosen with the k-means++ method.
+    
+    :param x: The array to cluster, with one row for each item.
+    :type x: numpy.ndarray
+    :param n_clusters: The number of clusters.
+    :type n_clusters: int
+    :param seed: The seed of the random number generator.
+    :type seed: int
+    :param max_iterations: The maximum number of iterations.
+    :type max_iterations: int
+    
+    :returns: The cluster index of each row. Some clusters may be empty, for 
+        example if `x` has fewer distinct rows than `n_clusters`.
+    :rtype: numpy.ndarray (int)
+    
+    """
+    rng=np.random.default_rng(seed)
+    centroids=x[[rng.integers(len(x))]]
+    while len(centroids)<n_clusters:
+        d=((x[:,None,:]-centroids[None,:,:])**2).sum(axis=2).min(axis=1)
+        if not d.sum()>0:
+            break
+        centroids=np.vstack([centroids,x[rng.choice(len(x),p=d/d.sum())]])
+    labels=None
+    for _ in range(max_iterations):
+        new_labels=((x[:,None,:]-centroids[None,:,:])**2).sum(axis=2).argmin(axis=1)
+        if not labels is None and (new_labels==labels).all():
+            break
+        labels=new_labels
+        centroids=np.array([x[labels==i].mean(axis=0) if (labels==i).any() else centroids[i]
+                            for i in range(len(centroids))])
+    return labels
+
+
+def get_representative_periods(epw,
+                               n_periods=6,
+                               period_days=7,
+                               columns=None,
+                               seed=0):
+    """Selects representative periods of a weather file, for a reduced run period simulation.
+    
+    The year is split into consecutive periods of `period_days` days (the 
+    last period also holds any remaining days). Each period is described by 
+    the mean and standard deviation of the hourly values of a number of 
+    weather fields, which are standardized and weighted, and the periods are 
+    grouped into `n_periods` clusters with the k-means algorithm. For each 
+    cluster, the period closest to the centre of the cluster represents the 
+    cluster and its weight is the number of days in the cluster.
+    
+    :param epw: The .epw weather file, either as a filepath or an EPEpw instance.
+    :type epw: str or EPEpw
+    :param n_periods: The number of representative periods.
+    :type n_periods: int
+    :param period_days: The number of days in each period, for example 7 for 
+        representative weeks or 1 for representative days.
+    :type period_days: int
+    :param columns: If given, the weather fields to cluster on and their 
+        weights, for example {'dry_bulb_temperature':1.0}. Default is None,
+        which is the dry bulb temperature and global horizontal radiation
+        with weights of 1.0 and the relative humidity and wind speed with
+        weights of 0.5.
+    :type columns: dict (str,float)
+    :param seed: The seed of the random number generator of the k-means algorithm.
+    :type seed: int
+    
+    :returns: A list of dictionaries, one for each representative period in 
+        date order, with keys 'name' ('Sample 1', 'Sample 2' etc.), 
+        'begin_month', 'begin_day_of_month', 'end_month', 'end_day_of_month',
+        'days' (the number of days in the period) and 'weight' (the number of
+        days of the year which the period represents). The weights sum to
+        the number of days in the weather file.
+    :rtype: list (dict)
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import get_representative_periods
+       >>> run_periods=get_representative_periods('USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+       >>>                                        n_periods=4)
+       >>> print(run_periods[0])
+       {'name': 'Sample 1', 'begin_month': 1, 'begin_day_of_month': 22, 
+        'end_month': 1, 'end_day_of_month': 28, 'days': 7, 'weight': 126}
+    
+    """
+    if isinstance(epw,str):
+        epw=EPEpw(epw)
+    month=epw.columns['month']
+    day=epw.columns['day']
+    
+    # the index of the day and of the period of each row
+    new_day=np.concatenate([[True],(month[1:]!=month[:-1])|(day[1:]!=day[:-1])])
+    day_index=np.cumsum(new_day)-1
+    n=max((day_index[-1]+1)//period_days,1)
+    period_index=np.minimum(day_index//period_days,n-1)
+    
+    # the standardized features of each period
+    counts=np.bincount(period_index)
+    features=[]
+    for k,weight in (columns or _sampling_columns).items():
+        x=epw.columns[k].astype(np.float64)
+        mean=np.bincount(period_index,x)/counts
+        std=np.sqrt(np.maximum(np.bincount(period_index,x**2)/counts-mean**2,0))
+        for y in (mean,std):
+            features.append((y-y.mean())/y.std()*weight if y.std()>0 else np.zeros(n))
+    features=np.column_stack(features)
+    
+    # the period closest to the centre of each cluster
+    labels=_get_kmeans_labels(features,min(n_periods,n),seed)
+    days=np.bincount(period_index[new_day])
+    result=[]
+    for label in np.unique(labels):
+        members=np.flatnonzero(labels==label)
+        centre=features[members].mean(axis=0)
+        i=members[((features[members]-centre)**2).sum(axis=1).argmin()]
+        rows=np.flatnonzero(period_index==i)
+        result.append({'begin_month':int(month[rows[0]]),
+                       'begin_day_of_month':int(day[rows[0]]),
+                       'end_month':int(month[rows[-1]]),
+                       'end_day_of_month':int(day[rows[-1]]),
+                       'days':int(days[i]),
+                       'weight':int(days[members].sum())})
+    result.sort(key=lambda x: (x['begin_month'],x['begin_day_of_month']))
+    return [dict(name='Sample %s' % (i+1),**x) for i,x in enumerate(result)]
+
+
+def _get_start_weekday(run_period,
+                       month,
+                       day):
+    """Returns the day of the week of a date, as simulated by a run period.
+    
+    :param run_period: The 'begin_month', 'begin_day_of_month', 'begin_year'
+        and 'day_of_week_for_start_day' fields of a RunPeriod object. These
+        can be None or empty strings if not given.
+    :type run_period: dict
+    :param month: The month of the date.
+    :type month: int
+    :param day: The day of the month of the date.
+    :type day: int
+    
+    :returns: The name of the day, for example 'Monday'.
+    :rtype: str
+    
+    """
+    begin_month=run_period['begin_month'] or 1
+    begin_day=run_period['begin_day_of_month'] or 1
+    weekdays=[x.lower() for x in _weekdays]
+    x=str(run_period['day_of_week_for_start_day'] or '').lower()
+    if x in weekdays:
+        i=weekdays.index(x)
+    elif run_period['begin_year']:
+        i=datetime.date(int(run_period['begin_year']),int(begin_month),int(begin_day)).weekday()
+    else: # the EnergyPlus default
+        i=_weekdays.index('Sunday')
+    return _weekdays[(i+_get_day_of_year(month,day)-_get_day_of_year(begin_month,begin_day))%7]
+
+
+def set_run_periods(input_filepath,
+                    output_filepath,
+                    run_periods):
+    """Writes a copy of an EnergyPlus input file with the given run periods.
+    
+    All 'RunPeriod' objects are replaced by a 'RunPeriod' object for each of 
+    `run_periods`. The other fields, such as the use of the weather file 
+    holidays, are copied from the first 'RunPeriod' object of the input file. 
+    The day of the week of the start day of each run period is set so that 
+    each day has the same day of the week as in the original run period, 
+    and the begin and end years are left blank.
+    
+    :param input_filepath: The filepath of the .idf or .epJSON input file.
+    :type input_filepath: str
+    :param output_filepath: The filepath of the new input file, which should 
+        have the same file extension.
+    :type output_filepath: str
+    :param run_periods: The run periods, each a dictionary with keys 'name',
+        'begin_month', 'begin_day_of_month', 'end_month' and 'end_day_of_month', 
+        as returned by `get_representative_periods`.
+    :type run_periods: list (dict)
+    
+    :raises ValueError: If the input file has no 'RunPeriod' object.
+    
+    """
+    keys=('name','begin_month','begin_day_of_month','begin_year',
+          'end_month','end_day_of_month','end_year','day_of_week_for_start_day')
+    
+    if input_filepath.lower().endswith('.epjson'):
+        with open(input_filepath,'r') as f:
+            epjson=json.load(f)
+        if not epjson.get('RunPeriod'):
+            raise ValueError('The input file has no RunPeriod object: %s' % input_filepath)
+        template=next(iter(epjson['RunPeriod'].values()))
+        weekday_fields={k:template.get(k) for k in keys}
+        objects={}
+        for x in run_periods:
+            y=dict(template,
+                   begin_month=x['begin_month'],
+                   begin_day_of_month=x['begin_day_of_month'],
+                   end_month=x['end_month'],
+                   end_day_of_month=x['end_day_of_month'],
+                   day_of_week_for_start_day=_get_start_weekday(weekday_fields,
+                                                                x['begin_month'],
+                                                                x['begin_day_of_month']))
+            y.pop('begin_year',None)
+            y.pop('end_year',None)
+            objects[x['name']]=y
+        epjson['RunPeriod']=objects
+        with open(output_filepath,'w') as f:
+            json.dump(epjson,f,indent=4)
+    else:
+        with open(input_filepath,'r',errors='replace') as f:
+            objects=_split_idf_objects(f.read())
+        indices=[i for i,(raw,fields) in enumerate(objects) 
+                 if not fields is None and fields[0].lower()=='runperiod']
+        if not indices:
+            raise ValueError('The input file has no RunPeriod object: %s' % input_filepath)
+        raw,template=objects[indices[0]]
+        template=template+['']*(9-len(template))
+        weekday_fields=dict(zip(keys,template[1:9]))
+        prefix=_get_idf_object_prefix(raw)
+        text=[]
+        for x in run_periods:
+            fields=[template[0],
+                    x['name'],
+                    str(x['begin_month']),
+                    str(x['begin_day_of_month']),
+                    '',
+                    str(x['end_month']),
+                    str(x['end_day_of_month']),
+                    '',
+                    _get_start_weekday(weekday_fields,
+                                       x['begin_month'],
+                                       x['begin_day_of_month'])]+template[9:]
+            text.append(_format_idf_object(fields,prefix))
+            prefix='\n\n'+prefix.split('\n')[-1]
+        for i in indices: # remove the comments on the last lines of the replaced objects
+            raw,fields=objects[i+1]
+            line,sep,rest=raw.partition('\n')
+            if not line.partition('!')[0].strip():
+                objects[i+1]=(sep+rest,fields)
+        with open(output_filepath,'w') as f:
+            f.write(''.join(''.join(text) if i==indices[0] else raw
+                            for i,(raw,fields) in enumerate(objects) if not i in indices[1:]))
+    
+
+def _get_environment_totals(epesose):
+    """Returns the totals or means of the variables and meters of a simulation environment.
+    
+    Each variable is read at the longest reporting frequency in the 
+    simulation environment, which gives the same total or mean as the shorter
+    frequencies.
+    
+    :param epesose: The simulation environment.
+    :type epesose: EPEsoSimulationEnvironment
+    
+    :returns: A dictionary with keys as (object_name, quantity, unit) tuples
+        and values as (summed, value) tuples. If `summed` is True the value is 
+        the total over the simulation environment, otherwise it is the mean.
+    :rtype: dict
+    
+    """
+    data=epesose._data
+    variable_dictionary=epesose._epeso._variable_dictionary
+    result={}
+    for k,report_code in (('annual_data',6),('run_period_data',5),('monthly_data',4),
+                          ('daily_data',3),('interval_data',2)):
+        if k=='monthly_data' and data[k].get(4): # weight the monthly means by their days
+            weights=np.diff(data[k][4][0],prepend=0)
+        else:
+            weights=None
+        for rc,x in data[k].items():
+            if rc==report_code or not len(x) or not len(x[0]):
+                continue
+            d=variable_dictionary[rc]
+            key=(d['object_name'],d['quantity'],d['unit'])
+            if key in result:
+                continue
+            summed=d['unit'] in _summed_units
+            values=np.asarray(x[0],dtype=np.float64)
+            if summed:
+                result[key]=(True,values.sum())
+            else:
+                result[key]=(False,np.average(values,weights=weights))
+    return result
+    
+
+def get_annual_totals(epeso,
+                      run_periods=None):
+    """Returns the annual totals of the variables and meters in an .eso file.
+    
+    Variables and meters with energy, volume, mass or time units (for 
+    example 'J' or 'm3') are summed. For other variables, such as 
+    temperatures or powers, the mean is returned.
+    
+    If `run_periods` is given, the annual totals are extrapolated from the 
+    simulation environments of the representative periods: the total of each
+    period is multiplied by its weight divided by its number of days, and the
+    means are weighted by the weights.
+    
+    :param epeso: The results of an annual simulation or of a simulation of
+        representative periods.
+    :type epeso: EPEso
+    :param run_periods: The representative periods which were simulated, as 
+        returned by `get_representative_periods`. Default is None, which uses
+        the last simulation environment in the .eso file (the weather file run
+        period of an annual simulation).
+    :type run_periods: list (dict)
+    
+    :raises IndexError: If a run period does not match a simulation environment.
+    
+    :returns: The annual total or mean of each variable and meter, indexed by
+        (object_name, quantity, unit). Meters have an empty object name.
+    :rtype: pandas.Series
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import runsim, get_representative_periods, get_annual_totals
+       >>> run_periods=get_representative_periods('USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+       >>> epresult=runsim('1ZoneUncontrolled.idf',
+       >>>                 'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+       >>>                 ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                 run_periods=run_periods)
+       >>> totals=get_annual_totals(epresult.get_eso(),run_periods)
+       >>> print(totals['','Electricity:Facility','J'])
+       2.1e10
+    
+    """
+    if run_periods is None:
+        environments=[(epeso.get_environments()[-1],1,1)]
+    else:
+        environments=[(epeso.get_environment(x['name'].upper()),x['weight'],x['days']) 
+                      for x in run_periods]
+    totals={}
+    weights={}
+    for epesose,weight,days in environments:
+        for key,(summed,value) in _get_environment_totals(epesose).items():
+            if summed:
+                totals[key]=totals.get(key,0.0)+value*weight/days
+            else:
+                totals[key]=totals.get(key,0.0)+value*weight
+                weights[key]=weights.get(key,0)+weight
+    for key,weight in weights.items():
+        totals[key]/=weight
+    return pd.Series(list(totals.values()),
+                     index=pd.MultiIndex.from_tuples(list(totals),
+                                                     names=('object_name','quantity','unit')),
+                     dtype=np.float64)
+
+
+def runsim_sampled(input_filepath,
+                   epw_filepath,
+                   ep_dir,
+                   n_periods=6,
+                   period_days=7,
+                   seed=0,
+                   **kwargs):
+    """Runs an EnergyPlus simulation of representative periods of the weather year and estimates the annual totals.
+    
+    This is a fast approximation of an annual simulation, for example for 
+    the early screening of design options. The representative periods are 
+    selected with `get_representative_periods`, simulated in a single 
+    EnergyPlus run with a 'RunPeriod' object for each period (see the 
+    `run_periods` argument of `runsim`), and the annual totals are 
+    extrapolated with `get_annual_totals`. 
+    
+    The runtime is roughly in proportion to the number of simulated days, plus
+    the warmup days which EnergyPlus simulates at the start of each run period.
+    For example, 4 representative weeks simulate 28 of 365 days. Use 
+    `validate_sampling` to check the errors of the estimates for a set of 
+    models.
+    
+    :param input_filepath: The filepath of the .idf or .epJSON input file, 
+        which should have a 'RunPeriod' object for the whole year.
+    :type input_filepath: str
+    :param epw_filepath: The filepath of the .epw weather file.
+    :type epw_filepath: str
+    :param ep_dir: The EnergyPlus directory.
+    :type ep_dir: str
+    :param n_periods: The number of representative periods.
+    :type n_periods: int
+    :param period_days: The number of days in each period.
+    :type period_days: int
+    :param seed: The seed of the random number generator of the clustering.
+    :type seed: int
+    :param kwargs: Keyword arguments to `runsim`, for example `sim_dir` or 
+        `output_variables`.
+    
+    :returns: A dictionary with keys 'epresult' (the EPResult of the 
+        simulation), 'run_periods' (the representative periods) and 
+        'annual_totals' (the estimated annual totals, see `get_annual_totals`,
+        or None if the simulation failed).
+    :rtype: dict
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import runsim_sampled
+       >>> result=runsim_sampled('1ZoneUncontrolled.idf',
+       >>>                       'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+       >>>                       ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                       sim_dir='simulation_files',
+       >>>                       n_periods=4)
+       >>> print(result['annual_totals']['ZONE ONE','Zone Total Internal Latent Gain Energy','J'])
+       0.0
+    
+    """
+    run_periods=get_representative_periods(epw_filepath,
+                                           n_periods,
+                                           period_days,
+                                           seed=seed)
+    epresult=runsim(input_filepath,
+                    epw_filepath,
+                    ep_dir,
+                    run_periods=run_periods,
+                    **kwargs)
+    if epresult.returncode==0 and 'eso' in epresult.files:
+        annual_totals=get_annual_totals(epresult.get_eso(),run_periods)
+    else:
+        annual_totals=None
+    return {'epresult':epresult,
+            'run_periods':run_periods,
+            'annual_totals':annual_totals}
+
+
+def validate_sampling(jobs,
+                      n_periods=6,
+                      period_days=7,
+                      seed=0,
+                      max_workers=None,
+                      **kwargs):
+    """Compares the annual totals estimated by `runsim_sampled` with those of annual simulations.
+    
+    Each job is simulated twice, as an annual simulation and as a simulation
+    of representative periods, and all the simulations are run with 
+    `runsim_batch`. Jobs for which either simulation fails or raises an 
+    exception are left out, and the other jobs are still compared.
+    
+    :param jobs: The validation set. Each job is a dictionary of keyword 
+        arguments to `runsim`, as for `runsim_batch`. 
+    :type jobs: list (dict)
+    :param n_periods: The number of representative periods.
+    :type n_periods: int
+    :param period_days: The number of days in each period.
+    :type period_days: int
+    :param seed: The seed of the random number generator of the clustering.
+    :type seed: int
+    :param max_workers: The maximum number of simulations to run at the same time.
+        See `runsim_batch`.
+    :type max_workers: int
+    :param kwargs: Keyword arguments to `runsim` which are used for all jobs.
+        If a job has no 'sim_dir', it is run in a subdirectory of the `sim_dir`
+        keyword argument (default '.') named after the index of the job. The
+        two simulations of each job are run in the 'full' and 'sampled' 
+        subdirectories of its simulation directory.
+    
+    :returns: A DataFrame indexed by (job, object_name, quantity, unit) with 
+        columns 'full' (the annual total), 'sampled' (the estimated annual 
+        total), 'error' (the relative error of the estimate, or NaN if the 
+        annual total is zero) and 'speed_up' (the wall time of the annual 
+        simulation divided by the wall time of the sampled simulation).
+    :rtype: pandas.DataFrame
+    
+    .. rubric:: Code Example
+        
+    .. code-block:: python
+           
+       >>> from eprun import validate_sampling
+       >>> df=validate_sampling([{'input_filepath':fp} for fp in ('1.idf','2.idf','3.idf')],
+       >>>                      n_periods=4,
+       >>>                      epw_filepath='USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+       >>>                      ep_dir='C:\EnergyPlusV9-6-0',
+       >>>                      sim_dir='validation')
+       >>> print(df['error'].abs().groupby('quantity').max())
+    
+    """
+    job_kwargs=_get_batch_job_kwargs(jobs,kwargs)
+    
+    # the representative periods of each weather file
+    run_periods={}
+    for x in job_kwargs:
+        if not x['epw_filepath'] in run_periods:
+            run_periods[x['epw_filepath']]=get_representative_periods(x['epw_filepath'],
+                                                                      n_periods,
+                                                                      period_days,
+                                                                      seed=seed)
+    
+    # an annual and a sampled simulation of each job
+    batch=[]
+    for x in job_kwargs:
+        batch.append(dict(x,sim_dir=os.path.join(x['sim_dir'],'full')))
+        batch.append(dict(x,
+                          sim_dir=os.path.join(x['sim_dir'],'sampled'),
+                          run_periods=run_periods[x['epw_filepath']]))
+    epresults=runsim_batch(batch,max_workers)
+    
+    result={}
+    for i,x in enumerate(job_kwargs):
+        full,sampled=epresults[2*i:2*i+2]
+        if (not full.returncode==0 or not sampled.returncode==0
+            or not 'eso' in full.files or not 'eso' in sampled.files):
+            continue
+        df=pd.DataFrame({'full':get_annual_totals(full.get_eso()),
+                         'sampled':get_annual_totals(sampled.get_eso(),
+                                                     run_periods[x['epw_filepath']])})
+        df['error']=(df['sampled']-df['full'])/df['full'].where(df['full']!=0)
+        df['speed_up']=full.wall_time/sampled.wall_time
+        result[i]=df
+    if not result:
+        return pd.DataFrame(columns=['full','sampled','error','speed_up'])
+    return pd.concat(result,names=['job'])
+    
+
+def _get_err_line_type(line):
+    """Returns the type of a line in an EnergyPlus .err file.
+    
+    :param line: The line.
+    :type line: str
+    
+    :returns: 'warning', 'severe' or 'fatal' for the first line of a message, 
+        'continuation' for a continuation line of a message, otherwise None.
+    :rtype: str
+    
+    """
+    x=line[:17]
+    if x=='   ** Warning ** ':
+        return 'warning'
+    elif x=='   ** Severe  ** ':
+        return 'severe'
+    elif x=='   **  Fatal  ** ':
+        return 'fatal'
+    elif x=='   **   ~~~   ** ':
+        return 'continuation'
+    else:
+        return None
+
 
-                    
 class EPErr():
     """A class for an EnergyPlus .err file.
     
@@ -348,18 +4784,20 @@ class EPErr():
                 if line.startswith('Program Version'):
                     firstline=line
                 
+                line_type=_get_err_line_type(line)
+                
                 # warning
-                if line.startswith('   ** Warning ** '):
+                if line_type=='warning':
                     warnings.append(line[17:].strip())
                     current_message=warnings
                     
                 # severe
-                if line.startswith('   ** Severe  ** '):
+                if line_type=='severe':
                     severes.append(line[17:].strip())
                     current_message=severes
                     
                 # error message continuation
-                if line.startswith('   **   ~~~   ** '):
+                if line_type=='continuation':
                     current_message[-1]+=' ' + line[17:].strip()
         
         self._firstline=firstline
@@ -370,61 +4808,1110 @@ class EPErr():
         
         
         
-    @property
-    def firstline(self):
-        """The first line recorded in the .err file.
+    @property
+    def firstline(self):
+        """The first line recorded in the .err file.
+        
+        :rtype: str
+        
+        """
+        return self._firstline
+    
+    
+    @property
+    def lastline(self):
+        """The last line recorded in the .err file.
+        
+        :rtype: str
+        
+        """
+        return self._lastline
+    
+        
+    @property
+    def lines(self):
+        """The lines recorded in the .err file.
+        
+        :rtype: str
+        
+        """
+        return self._lines
+        
+    
+    @property
+    def severes(self):
+        """The severe errors recorded in the .err file.
+        
+        :rtype: list (str)
+        
+        """
+        return self._severes
+    
+    
+    @property
+    def warnings(self):
+        """The warning errors recorded in the .err file.
+        
+        :rtype: list (str)
+        
+        """
+        return self._warnings
+
+
+# the numpy dtypes of the columns of the time period report codes in an .eso file
+# - 'category' indicates a day type column, stored as a pandas.Categorical
+_eso_period_dtypes={2:(np.int32,np.int8,np.int8,np.int8,np.int8,np.int8,np.int8,'category'),
+                    3:(np.int32,np.int8,np.int8,np.int8,'category'),
+                    4:(np.int32,np.int8),
+                    5:(np.int32,),
+                    6:(np.int16,)}
+
+# the frequencies of the time period report codes in an .eso file
+_eso_period_frequencies={'2':'interval',
+                         '3':'daily',
+                         '4':'monthly',
+                         '5':'runperiod',
+                         '6':'annual'}
+
+# the keys of the simulation environment dictionaries and the time period report codes
+# for each frequency
+_eso_frequency_keys={'interval':('interval_data',2),
+                     'daily':('daily_data',3),
+                     'monthly':('monthly_data',4),
+                     'runperiod':('run_period_data',5),
+                     'annual':('annual_data',6)}
+
+# the numpy dtypes of the columns of the variable report codes in an .eso file,
+# based on the number of values in the data dictionary
+# - 1: [Value]
+# - 7: [Value,Min,Hour,Minute,Max,Hour,Minute]
+# - 9: [Value,Min,Day,Hour,Minute,Max,Day,Hour,Minute]
+# - 11: [Value,Min,Month,Day,Hour,Minute,Max,Month,Day,Hour,Minute]
+_eso_variable_dtypes={1:(np.float64,),
+                      7:(np.float64,np.float64,np.int8,np.int8,
+                         np.float64,np.int8,np.int8),
+                      9:(np.float64,np.float64,np.int8,np.int8,np.int8,
+                         np.float64,np.int8,np.int8,np.int8),
+                      11:(np.float64,np.float64,np.int8,np.int8,np.int8,np.int8,
+                          np.float64,np.int8,np.int8,np.int8,np.int8)}
+
+
+def _convert_environment_data(simulation_environment,
+                              variable_dictionary):
+    """Converts the rows of string values of a simulation environment to typed columns.
+
+    The lists of rows held for each report code are replaced (in place) by
+    tuples of columns, as returned by `_get_typed_columns`.
+
+    :param simulation_environment: A simulation environment dictionary
+        created when reading an .eso file.
+    :type simulation_environment: dict
+    :param variable_dictionary: The variable dictionary of the .eso file.
+    :type variable_dictionary: dict
+
+    """
+    for k in ('interval_data','daily_data','monthly_data','run_period_data','annual_data'):
+        d=simulation_environment[k]
+        for report_code in d:
+            d[report_code]=_get_typed_columns(d[report_code],
+                                              _get_eso_dtypes(report_code,variable_dictionary))
+
+
+def _get_eso_dtypes(report_code,
+                    variable_dictionary):
+    """Returns the dtypes of the columns of a report code in the data section of an .eso file.
+    
+    :param report_code: The report code.
+    :type report_code: int
+    :param variable_dictionary: The variable dictionary of the .eso file.
+    :type variable_dictionary: dict
+    
+    :rtype: tuple
+    
+    """
+    if report_code<=6:
+        return _eso_period_dtypes[report_code]
+    else:
+        number_of_values=variable_dictionary[report_code]['number_of_values']
+        return _eso_variable_dtypes.get(number_of_values,
+                                        (np.float64,)*number_of_values)
+
+
+def _get_typed_columns(rows,dtypes):
+    """Converts rows of string values to a tuple of typed columns.
+
+    :param rows: A list of rows, each row being a list of strings.
+    :type rows: list
+    :param dtypes: The dtype of each column.
+        'category' creates a pandas.Categorical, otherwise a read-only
+        numpy array of the dtype is created.
+    :type dtypes: tuple
+
+    :rtype: tuple
+
+    """
+    result=[]
+    for column,dtype in zip(zip(*rows),dtypes):
+        if dtype=='category':
+            a=pd.Categorical([x.strip() for x in column])
+        else:
+            a=np.array(column,dtype=np.float64) # also reads integers written as '0.00'
+            if not dtype is np.float64:
+                a=a.astype(dtype)
+            a.flags.writeable=False
+        result.append(a)
+    return tuple(result)
+
+
+def _get_datetime64(months,
+                    days=1,
+                    hours=0,
+                    minutes=0):
+    """Returns a numpy datetime64 array built from arrays of time components.
+
+    The times are placed in the year 2001, as for the `get_start_times` methods.
+
+    :param months: The month numbers, starting at 1.
+    :type months: numpy.ndarray (int)
+    :param days: The day numbers in the month, starting at 1.
+    :type days: numpy.ndarray (int) or int
+    :param hours: The hours, starting at 0.
+    :type hours: numpy.ndarray (int) or int
+    :param minutes: The minutes, starting at 0.
+    :type minutes: numpy.ndarray (int) or int
+
+    :returns: The (time zone naive) times.
+    :rtype: numpy.ndarray (numpy.datetime64)
+
+    """
+    x=np.datetime64('2001-01','M')+(np.asarray(months,dtype=np.int64)-1)
+    x=x.astype('datetime64[D]')+(np.asarray(days,dtype=np.int64)-1)
+    x=(x.astype('datetime64[m]')
+       +np.asarray(hours,dtype=np.int64)*60
+       +np.asarray(minutes,dtype=np.int64))
+    return x.astype('datetime64[ns]')
+
+
+def _get_datetime_index(tz,
+                        months,
+                        days=1,
+                        hours=0,
+                        minutes=0):
+    """Returns a pandas DatetimeIndex built from arrays of time components.
+
+    :param tz: The time zone of the times.
+    :type tz: datetime.timezone
+    
+    See `_get_datetime64` for the other parameters.
+
+    :rtype: pandas.DatetimeIndex
+
+    """
+    return pd.DatetimeIndex(_get_datetime64(months,days,hours,minutes)).tz_localize(tz)
+
+
+def _get_variables_dataframe(index,
+                             variables,
+                             tz=None,
+                             missing_unit='-'):
+    """Returns a pandas DataFrame of the data of a number of variables.
+
+    The DataFrame is built column by column. The values, minimum values and
+    maximum values of all variables are assembled into a single 2-D float array 
+    and the minimum and maximum times (if any) into a separate 2-D datetime
+    array. No Python row tuples are created.
+
+    :param index: The index of the DataFrame.
+    :type index: pandas.Index
+    :param variables: The variables, all of the same frequency.
+        If these are daily or monthly variables then the DataFrame contains
+        the 'value', 'min_value', 'min_time', 'max_value' and 'max_time' 
+        of each variable, otherwise only the 'value'.
+    :type variables: list
+    :param tz: The time zone of the minimum and maximum times.
+    :type tz: datetime.timezone
+    :param missing_unit: The 'unit' column level of the variables which have 
+        no unit.
+    :type missing_unit: str
+
+    :rtype: pandas.DataFrame
+
+    """
+    column_level_names=('object_name','quantity','unit','value_type')
+    n=len(index)
+    k=len(variables)
+    min_max_flag=k>0 and hasattr(variables[0],'min_values')
+    
+    # float block, with all 'value' columns first then 'min_value' and 'max_value' columns
+    float_block=np.empty((n,k*3 if min_max_flag else k),dtype=np.float64)
+    for j,v in enumerate(variables):
+        float_block[:,j]=v.values
+        if min_max_flag:
+            float_block[:,k+j]=v.min_values
+            float_block[:,2*k+j]=v.max_values
+    df=pd.DataFrame(data=float_block,
+                    index=index,
+                    copy=False)
+    
+    if min_max_flag:
+        
+        # datetime block, with all 'min_time' columns first then the 'max_time' columns
+        time_block=np.empty((n,k*2),dtype='datetime64[ns]')
+        for j,v in enumerate(variables):
+            time_block[:,j]=v._get_min_times_array()
+            time_block[:,k+j]=v._get_max_times_array()
+        time_df=pd.DataFrame(data=time_block,
+                             index=index,
+                             columns=range(k*3,k*5),
+                             copy=False)
+        time_df=time_df.apply(lambda x: x.dt.tz_localize(tz))
+        
+        # interleave the columns of each variable
+        order=[]
+        for j in range(k):
+            order+=[j,k+j,k*3+j,k*2+j,k*4+j]
+        df=pd.concat([df,time_df],axis=1).iloc[:,order]
+        value_types=['value','min_value','min_time','max_value','max_time']
+    
+    else:
+        
+        value_types=['value']
+        
+    m=len(value_types)
+    df.columns=pd.MultiIndex.from_arrays([[v.object_name for v in variables for _ in range(m)],
+                                          [v.quantity for v in variables for _ in range(m)],
+                                          [missing_unit if v.unit is None else v.unit 
+                                           for v in variables for _ in range(m)],
+                                          value_types*k],
+                                         names=column_level_names)
+    return df
+
+
+def _read_eso_data_dictionary(lines):
+    """Reads the programme version statement and the data dictionary of an .eso file.
+    
+    Lines are read up to and including the 'End of Data Dictionary' line, so
+    that if `lines` is a file object the next line read is the first line of 
+    the data section.
+    
+    :param lines: The lines of the .eso file, for example a file object.
+    :type lines: iterable (str)
+    
+    :returns: A tuple of (programme_version_statement, standard_items_dictionary,
+        variable_dictionary). See the `EPEso` properties of the same names.
+    :rtype: tuple
+    
+    """
+    programme_version_statement_flag=True # True if in this section
+    
+    standard_items_dictionary={}
+    variable_dictionary={}
+    
+    for line in lines: # loop through lines in file
+        
+        if programme_version_statement_flag: # programme version statement (first row)
+            
+            row=line.strip().split(',')
+            programme_version_statement={'programme':row[1].strip(),
+                                         'version':row[2].strip(),
+                                         'timestamp':row[3].strip()}
+            programme_version_statement_flag=False
+            
+        elif line.startswith('End of Data Dictionary'): # end of section line
+            
+            break
+                
+        else: # a data dictionary line
+        
+            line_and_comment=line.split('!')
+            row=line_and_comment[0].split(',')
+            try:
+                comment=line_and_comment[1].strip()
+            except IndexError:
+                comment=None
+        
+            report_code=int(row[0])
+            number_of_values=int(row[1])
+            
+            if report_code<=6: # a 'standard item'
+            
+                items=[]
+                for item in row[2:]:
+                    a=item.split('[')
+                    name=a[0].strip()
+                    try:
+                        unit=a[1].split(']')[0].strip() or None
+                    except IndexError:
+                        unit=None
+                    items.append({'name':name,
+                                  'unit':unit})
+                
+                standard_items_dictionary[report_code]={'number_of_values':number_of_values,
+                                                        'items':items,
+                                                        'comment':comment}
+            
+            else: # a 'variable item', or a meter which has no object name
+                
+                if len(row)>3:
+                    object_name=row[2]
+                    a=row[3].split('[')
+                else:
+                    object_name=''
+                    a=row[2].split('[')
+                quantity=a[0].strip()
+                try:
+                    unit=a[1].split(']')[0].strip() or None
+                except IndexError:
+                    unit=None
+            
+                variable_dictionary[report_code]={'number_of_values':number_of_values,
+                                                  'object_name':object_name,
+                                                  'quantity':quantity,
+                                                  'unit':unit,
+                                                  'comment':comment}
+                
+    return (programme_version_statement,
+            standard_items_dictionary,
+            variable_dictionary)
+
+
+def _get_eso_simulation_environment(row):
+    """Returns a new simulation environment dictionary with no data.
+    
+    :param row: The split '1' line which starts the simulation environment 
+        in the data section of an .eso file.
+    :type row: list (str)
+    
+    :rtype: dict
+    
+    """
+    return {'environment_title':row[1].strip(),
+            'latitude':row[2].strip(),
+            'longitude':row[3].strip(),
+            'time_zone':row[4].strip(),
+            'elevation':row[5].strip(),
+            'interval_data':{2:[]},
+            'daily_data':{3:[]},
+            'monthly_data':{4:[]},
+            'run_period_data':{5:[]},
+            'annual_data':{6:[]}}
+
+
+def _filter_eso_lines(lines,
+                      report_codes=None,
+                      frequencies=None,
+                      environments=None,
+                      skip_environment=False):
+    """Returns the wanted lines of the data section of an .eso file.
+    
+    Unwanted lines are discarded by looking at the report code at the start of
+    the line, before the line is split. The parse time and memory use of the
+    callers then depend on the amount of data requested rather than the size 
+    of the file.
+    
+    :param lines: The lines of the data section, for example a file object
+        positioned after the 'End of Data Dictionary' line. The lines are read
+        up to the 'End of Data' line.
+    :type lines: iterable (str)
+    :param report_codes: See `EPEso`.
+    :type report_codes: list (int)
+    :param frequencies: See `EPEso`.
+    :type frequencies: list (str)
+    :param environments: See `EPEso`.
+    :type environments: list (str)
+    :param skip_environment: True if the first lines belong to an unwanted 
+        simulation environment. Used when `lines` start part way through a 
+        simulation environment.
+    :type skip_environment: bool
+    
+    :returns: A generator of the lines of the wanted simulation environments, 
+        time periods and variables.
+    :rtype: generator
+    
+    """
+    filter_flag=not (report_codes is None and frequencies is None and environments is None)
+    if not report_codes is None:
+        report_codes=set(str(x) for x in report_codes)
+    skip_section=False # True if in an unwanted frequency section
+    
+    for line in lines:
+        
+        if line.startswith('End of Data'):
+            break
+        
+        if filter_flag:
+            
+            x=line[:line.find(',')] # the report code
+            
+            if x=='1': # start of a new simulation environment
+                skip_environment=(not environments is None
+                                  and not line.split(',')[1].strip() in environments)
+                skip_section=False
+                if skip_environment:
+                    continue
+                
+            elif skip_environment:
+                continue
+            
+            elif x in _eso_period_frequencies: # start of a new time period
+                skip_section=(not frequencies is None
+                              and not _eso_period_frequencies[x] in frequencies)
+                if skip_section:
+                    continue
+                
+            elif skip_section or (not report_codes is None and not x in report_codes):
+                continue
+            
+        yield line
+
+
+def _read_eso_data(lines,
+                   variable_dictionary,
+                   report_codes=None,
+                   frequencies=None,
+                   environments=None,
+                   simulation_environment=None):
+    """Reads the data section of an .eso file.
+    
+    :param lines: The lines of the data section, for example a file object
+        positioned after the 'End of Data Dictionary' line.
+    :type lines: iterable (str)
+    :param variable_dictionary: The variable dictionary of the .eso file.
+    :type variable_dictionary: dict
+    :param report_codes: See `EPEso`.
+    :type report_codes: list (int)
+    :param frequencies: See `EPEso`.
+    :type frequencies: list (str)
+    :param environments: See `EPEso`.
+    :type environments: list (str)
+    :param simulation_environment: If given, the simulation environment which
+        the first line belongs to. Used when `lines` start part way through a
+        simulation environment, at the start of a time period.
+    :type simulation_environment: dict
+    
+    :returns: A list of simulation environment dictionaries holding the typed 
+        columns of each report code. If `simulation_environment` is given and 
+        not filtered out, it is the first item of the list.
+    :rtype: list (dict)
+    
+    """
+    skip_environment=False # True if in an unwanted simulation environment
+    
+    data=[]
+    
+    if not simulation_environment is None:
+        skip_environment=(not environments is None
+                          and not simulation_environment['environment_title'] in environments)
+        if not skip_environment:
+            data.append(simulation_environment)
+    
+    for line in _filter_eso_lines(lines, # loop through the wanted lines in the data section
+                                  report_codes,
+                                  frequencies,
+                                  environments,
+                                  skip_environment):
+        
+        row=line.split(',')
+        report_code=int(row[0])
+
+        if report_code==1: # start of a new simulation environment
+
+            if data: # convert the previous simulation environment
+                _convert_environment_data(data[-1],variable_dictionary)
+
+            simulation_environment=_get_eso_simulation_environment(row)
+
+            data.append(simulation_environment)
+
+
+        elif report_code==2:
+
+            d=simulation_environment['interval_data']
+            d[report_code].append(row[1:])
+
+        elif report_code==3:
+
+            d=simulation_environment['daily_data']
+            d[report_code].append(row[1:])
+
+        elif report_code==4:
+
+            d=simulation_environment['monthly_data']
+            d[report_code].append(row[1:])
+
+
+        elif report_code==5:
+
+            d=simulation_environment['run_period_data']
+            d[report_code].append(row[1:])
+
+        elif report_code==6:
+
+            d=simulation_environment['annual_data']
+            d[report_code].append(row[1:])
+
+        else:
+
+            x=d.setdefault(report_code,[])
+            x.append(row[1:])
+
+    # convert the last simulation environment
+    if data:
+        _convert_environment_data(data[-1],variable_dictionary)
+    
+    return data
+
+
+def _read_eso_data_chunk(fp,
+                         start,
+                         end,
+                         environment_line,
+                         variable_dictionary,
+                         report_codes=None,
+                         frequencies=None,
+                         environments=None):
+    """Reads a chunk of the data section of an .eso file.
+    
+    This runs in a worker process of `_read_eso_data_parallel`.
+    
+    :param fp: The filepath of the .eso file.
+    :type fp: str
+    :param start: The byte offset of the start of the chunk.
+    :type start: int
+    :param end: The byte offset of the end of the chunk.
+    :type end: int
+    :param environment_line: If the chunk starts part way through a simulation 
+        environment, the '1' line of that simulation environment, otherwise None.
+    :type environment_line: str
+    
+    :returns: A tuple of (continued, data). `continued` is True if the first 
+        simulation environment in `data` is continued from the previous chunk.
+    :rtype: tuple
+    
+    """
+    with open(fp,'rb') as f:
+        with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as mm:
+            lines=mm[start:end].decode().splitlines()
+    
+    if environment_line is None:
+        simulation_environment=None
+    else:
+        simulation_environment=_get_eso_simulation_environment(environment_line.split(','))
+        
+    data=_read_eso_data(lines,
+                        variable_dictionary,
+                        report_codes,
+                        frequencies,
+                        environments,
+                        simulation_environment)
+    
+    continued=not simulation_environment is None and bool(data) and data[0] is simulation_environment
+    
+    return continued, data
+
+
+def _concatenate_typed_columns(columns1,columns2):
+    """Joins two tuples of typed columns of the same report code.
+    
+    :param columns1: The first typed columns, as returned by `_get_typed_columns`.
+    :type columns1: tuple
+    :param columns2: The typed columns to append.
+    :type columns2: tuple
+    
+    :rtype: tuple
+    
+    """
+    if not columns1:
+        return columns2
+    if not columns2:
+        return columns1
+    result=[]
+    for a,b in zip(columns1,columns2):
+        if isinstance(a,pd.Categorical):
+            x=pd.api.types.union_categoricals([a,b],sort_categories=True)
+        else:
+            x=np.concatenate([a,b])
+            x.flags.writeable=False
+        result.append(x)
+    return tuple(result)
+
+
+def _read_eso_data_parallel(fp,
+                            variable_dictionary,
+                            report_codes=None,
+                            frequencies=None,
+                            environments=None,
+                            max_workers=2):
+    """Reads the data section of an .eso file using a pool of worker processes.
+    
+    The file is memory-mapped and the data section is split into `max_workers`
+    chunks of about equal size. Each chunk starts at a time period or a simulation
+    environment line, so that the chunks can be read independently by 
+    `_read_eso_data_chunk`. The typed columns of the chunks are then joined.
+    
+    :param fp: The filepath of the .eso file.
+    :type fp: str
+    :param max_workers: The number of worker processes and chunks.
+    :type max_workers: int
+    
+    :returns: The same as `_read_eso_data`.
+    :rtype: list (dict)
+    
+    """
+    period_or_environment_codes=(b'1,',b'2,',b'3,',b'4,',b'5,',b'6,')
+    
+    with open(fp,'rb') as f:
+        with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as mm:
+            
+            start=mm.find(b'\n',mm.find(b'End of Data Dictionary'))+1
+            end=mm.find(b'\nEnd of Data',start)
+            end=len(mm) if end==-1 else end+1
+            
+            boundaries=[start]
+            for i in range(1,max_workers):
+                x=max(start+(end-start)*i//max_workers,boundaries[-1])
+                x=mm.find(b'\n',x-1)+1 # the start of the next line
+                while 0<x<end and not mm[x:x+2] in period_or_environment_codes:
+                    x=mm.find(b'\n',x)+1
+                if boundaries[-1]<x<end:
+                    boundaries.append(x)
+            boundaries.append(end)
+            
+            chunks=[]
+            for a,b in zip(boundaries[:-1],boundaries[1:]):
+                if a==start or mm[a:a+2]==b'1,':
+                    environment_line=None
+                else:
+                    i=mm.rfind(b'\n1,',start-1,a)+1
+                    environment_line=mm[i:mm.find(b'\n',i)].decode()
+                chunks.append((a,b,environment_line))
+    
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures=[executor.submit(_read_eso_data_chunk,
+                                 fp,
+                                 a,
+                                 b,
+                                 environment_line,
+                                 variable_dictionary,
+                                 report_codes,
+                                 frequencies,
+                                 environments)
+                 for a,b,environment_line in chunks]
+        results=[future.result() for future in futures]
+    
+    data=[]
+    for continued,chunk_data in results:
+        if continued:
+            simulation_environment=data[-1]
+            for k in ('interval_data','daily_data','monthly_data','run_period_data','annual_data'):
+                d=simulation_environment[k]
+                for report_code,columns in chunk_data[0][k].items():
+                    d[report_code]=_concatenate_typed_columns(d.get(report_code,()),columns)
+            chunk_data=chunk_data[1:]
+        data.extend(chunk_data)
+        
+    return data
+
+
+# the version of the format of the .eso index files written by `_read_eso_index`
+_eso_index_version=1
+
+# the maximum number of report codes held in memory by a lazy `EPEso` instance
+_eso_lazy_cache_size=16
+
+# the size in bytes of the blocks in which a lazy `EPEso` instance scans a section
+_eso_lazy_block_size=1<<20
+
+
+def _index_eso_data(f):
+    """Scans the data section of an .eso file and records the byte offsets of its sections.
+    
+    The lines of the data section are not split or converted, only the report
+    code at the start of each line is looked at.
+    
+    :param f: An .eso file opened in binary mode, positioned at the start of 
+        the data section.
+    :type f: io.BufferedReader
+    
+    :returns: A list with a dictionary for each simulation environment. 
+        This holds the environment header values and a 'sections' dictionary 
+        with, for each frequency, the 'report_codes' which occur in the 
+        section and the 'runs' of the section, i.e. the [start,end) byte 
+        offsets of the consecutive lines which belong to the section.
+    :rtype: list (dict)
+    
+    """
+    period_frequencies={k.encode():v for k,v in _eso_period_frequencies.items()}
+    
+    environments=[]
+    frequency=None # the frequency of the current run of lines
+    offset=f.tell()
+    
+    for line in f:
+        
+        x=line[:line.find(b',')] # the report code
+        
+        if x in period_frequencies: # start of a new time period
+            
+            if period_frequencies[x]!=frequency: # start of a new run
+                if frequency:
+                    runs.append([run_start,offset])
+                frequency=period_frequencies[x]
+                section=sections[frequency]
+                runs=section['runs']
+                report_codes=section['report_codes']
+                run_start=offset
+            
+        elif x==b'1': # start of a new simulation environment
+            
+            if frequency:
+                runs.append([run_start,offset])
+            frequency=None
+            
+            row=line.decode().split(',')
+            sections={k:{'report_codes':{},'runs':[]} for k in _eso_frequency_keys}
+            environments.append({'environment_title':row[1].strip(),
+                                 'latitude':row[2].strip(),
+                                 'longitude':row[3].strip(),
+                                 'time_zone':row[4].strip(),
+                                 'elevation':row[5].strip(),
+                                 'sections':sections})
+            
+        elif line.startswith(b'End of Data'):
+            
+            break
+            
+        else: # a variable
+            
+            report_codes[x]=None
+            
+        offset+=len(line)
+        
+    if frequency:
+        runs.append([run_start,offset])
+    
+    for environment in environments:
+        for section in environment['sections'].values():
+            section['report_codes']=[int(x) for x in section['report_codes']]
+    
+    return environments
+    
+
+def _read_eso_index(fp):
+    """Returns the index of the data section of an .eso file.
+    
+    The index is saved in a sidecar file next to the .eso file, with '.idx' 
+    appended to the filepath. This file is reused while the size and the 
+    modification time of the .eso file are unchanged, otherwise the .eso 
+    file is scanned again and a new index file written.
+    
+    :param fp: The filepath of the .eso file.
+    :type fp: str
+    
+    :returns: A dictionary with keys 'version', 'size', 'mtime_ns' and 
+        'environments'. See `_index_eso_data` for the 'environments' value.
+    :rtype: dict
+    
+    """
+    st=os.stat(fp)
+    index_fp=fp+'.idx'
+    
+    try:
+        with open(index_fp,'r') as f:
+            index=json.load(f)
+        if (index['version']==_eso_index_version 
+            and index['size']==st.st_size 
+            and index['mtime_ns']==st.st_mtime_ns):
+            return index
+    except (OSError,ValueError,KeyError):
+        pass
+    
+    with open(fp,'rb') as f:
+        for line in f: # move to the start of the data section
+            if line.startswith(b'End of Data Dictionary'):
+                break
+        environments=_index_eso_data(f)
+    
+    index={'version':_eso_index_version,
+           'size':st.st_size,
+           'mtime_ns':st.st_mtime_ns,
+           'environments':environments}
+    
+    try:
+        with open(index_fp,'w') as f:
+            json.dump(index,f)
+    except OSError: # for example a read-only directory
+        pass
+    
+    return index
+
+
+class _EPEsoLazySection(collections.abc.Mapping):
+    """The data of one frequency of a simulation environment, read on demand.
+    
+    This takes the place of the dictionary of typed columns for each report code
+    when an `EPEso` instance is created with `lazy=True`. The first access to a 
+    report code scans the byte runs of the section from the .eso file in blocks
+    of bounded size, and records the byte offsets of the lines of every report 
+    code in the section. Later accesses read only the lines of their report code.
+    The most recently used report codes are kept in a cache of the `EPEso` instance.
+    
+    :param epeso: The lazy EPEso instance.
+    :type epeso: EPEso
+    :param period_report_code: The report code of the time periods of the section.
+    :type period_report_code: int
+    :param report_codes: The report codes of the variables in the section.
+    :type report_codes: list (int)
+    :param runs: The [start,end) byte offsets of the runs of lines in the section.
+    :type runs: list
+    
+    """
+    
+    def __init__(self,
+                 epeso,
+                 period_report_code,
+                 report_codes,
+                 runs):
+        ""
+        self._epeso=epeso
+        self._period_report_code=period_report_code
+        self._report_codes=report_codes
+        self._report_codes_set=set(report_codes)
+        self._runs=runs
+        self._line_offsets=None # set by `_scan`
         
-        :rtype: str
         
-        """
-        return self._firstline
+    def __contains__(self,report_code):
+        ""
+        return report_code==self._period_report_code or report_code in self._report_codes_set
     
     
-    @property
-    def lastline(self):
-        """The last line recorded in the .err file.
+    def __getitem__(self,report_code):
+        ""
+        if not report_code in self:
+            raise KeyError(report_code)
+        cache=self._epeso._lazy_cache
+        key=(id(self),report_code)
+        try:
+            result=cache.pop(key)
+        except KeyError:
+            result=self._read(report_code)
+        cache[key]=result
+        while len(cache)>_eso_lazy_cache_size:
+            cache.popitem(last=False)
+        return result
+    
+    
+    def __iter__(self):
+        ""
+        yield self._period_report_code
+        yield from self._report_codes
         
-        :rtype: str
         
-        """
-        return self._lastline
+    def __len__(self):
+        ""
+        return len(self._report_codes)+1
+    
     
+    def _read(self,report_code):
+        """Reads the typed columns of a report code from the .eso file.
         
-    @property
-    def lines(self):
-        """The lines recorded in the .err file.
+        :param report_code: The report code.
+        :type report_code: int
         
-        :rtype: str
+        :rtype: tuple
         
         """
-        return self._lines
-        
+        if self._line_offsets is None:
+            self._scan()
+        starts,ends=self._line_offsets.get(report_code,((),()))
+        rows=[]
+        if len(starts)>0:
+            with open(self._epeso._fp,'rb') as f:
+                with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as mm:
+                    for start,end in zip(starts.tolist(),ends.tolist()):
+                        rows.append(mm[start:end].decode().split(',')[1:])
+        return _get_typed_columns(rows,
+                                  _get_eso_dtypes(report_code,
+                                                  self._epeso._variable_dictionary))
+    
+    
+    def _scan(self):
+        """Records the byte offsets of the lines of each report code in the section.
+        
+        The runs of the section are read in blocks of at most `_eso_lazy_block_size`
+        bytes, so the memory used does not depend on the size of the section.
+        The offsets are stored in `_line_offsets` as a dictionary with the report
+        codes as keys and tuples of (starts, ends) arrays as values.
+        
+        """
+        starts=collections.defaultdict(list)
+        ends=collections.defaultdict(list)
+        with open(self._epeso._fp,'rb') as f:
+            for run_start,run_end in self._runs:
+                f.seek(run_start)
+                position=run_start # the file offset of `remainder`
+                remainder=b''
+                while position<run_end:
+                    block=remainder+f.read(min(_eso_lazy_block_size,
+                                               run_end-position-len(remainder)))
+                    if len(block)==len(remainder): # the end of the file
+                        break
+                    lines=block.split(b'\n')
+                    remainder=lines.pop() # a partial line, or b''
+                    for line in lines:
+                        end=position+len(line)
+                        report_code=line[:line.find(b',')]
+                        if report_code.isdigit():
+                            starts[int(report_code)].append(position)
+                            ends[int(report_code)].append(end-1 if line.endswith(b'\r') else end)
+                        position=end+1
+                    if position+len(remainder)>=run_end:
+                        break
+                if remainder:
+                    line=remainder.rstrip(b'\r')
+                    report_code=line[:line.find(b',')]
+                    if report_code.isdigit():
+                        starts[int(report_code)].append(position)
+                        ends[int(report_code)].append(position+len(line))
+        self._line_offsets={k:(np.array(v,dtype=np.int64),np.array(ends[k],dtype=np.int64)) 
+                            for k,v in starts.items()}
     
-    @property
-    def severes(self):
-        """The severe errors recorded in the .err file.
-        
-        :rtype: list (str)
-        
-        """
-        return self._severes
+
+def _get_eso_converters(dtypes):
+    """Returns functions which convert the string values of a line to Python values.
     
+    :param dtypes: The dtypes of the columns, as in `_eso_period_dtypes`.
+    :type dtypes: tuple
     
-    @property
-    def warnings(self):
-        """The warning errors recorded in the .err file.
-        
-        :rtype: list (str)
+    :rtype: tuple
+    
+    """
+    result=[]
+    for dtype in dtypes:
+        if dtype=='category':
+            result.append(str.strip)
+        elif dtype is np.float64:
+            result.append(float)
+        else:
+            result.append(lambda x: int(float(x))) # also reads integers written as '0.00'
+    return tuple(result)
+
+
+def iter_eso(fp,
+             report_codes=None,
+             frequencies=None,
+             environments=None):
+    """Iterates over the records in the data section of an .eso file.
+    
+    The file is read one line at a time and the data is not stored, so the 
+    memory used does not depend on the size of the file.
+    
+    :param fp: The filepath for the .eso file.
+    :type fp: str
+    :param report_codes: If given, only the records of the variables with these
+        report codes are returned. The time period records are always returned.
+    :type report_codes: list (int)
+    :param frequencies: If given, only the records of these frequencies are returned.
+        Options are 'interval', 'daily', 'monthly', 'runperiod' and 'annual'.
+    :type frequencies: list (str)
+    :param environments: If given, only the records of the simulation environments 
+        with these environment titles are returned.
+    :type environments: list (str)
+    
+    :returns: A generator of (report_code, values) tuples in file order. 
+        - report code 1 is the start of a simulation environment, and `values` 
+          holds the environment title, latitude, longitude, time zone and elevation
+          as strings.
+        - report codes 2 to 6 are the start of a time period of the frequencies 
+          'interval', 'daily', 'monthly', 'runperiod' and 'annual'. The values
+          are ints, and strings for the day types.
+        - other report codes are the values of a variable in the current time
+          period. The values are floats, and ints for the times of the minimum
+          and maximum values.
+    :rtype: generator
+    
+    .. rubric:: Code Example
         
-        """
-        return self._warnings
+    .. code-block:: python
+           
+       >>> from eprun import iter_eso
+       >>> for report_code,values in iter_eso(r'simulation_files\eplusout.eso',
+       >>>                                    report_codes=[7]):
+       >>>     print(report_code,values)
+       1 ('DENVER CENTENNIAL  GOLDEN   N ANN HTG 99% CONDNS DB', '37.62', '-122.40', '-8.00', '2.00')
+       2 (1, 12, 21, 0, 1, 0, 60, 'WinterDesignDay')
+       7 (-15.5,)
+       ...
+    
+    """
+    with open(fp,'r') as f:
         
+        variable_dictionary=_read_eso_data_dictionary(f)[2]
+        converters={}
         
+        for line in _filter_eso_lines(f, # loop through the wanted lines in the data section
+                                      report_codes,
+                                      frequencies,
+                                      environments):
+            
+            x=line[:line.find(',')] # the report code
+            
+            if x=='1': # start of a new simulation environment
+                yield 1, tuple(y.strip() for y in line.split(',')[1:])
+                continue
+            
+            report_code=int(x)
+            try:
+                c=converters[report_code]
+            except KeyError:
+                c=converters[report_code]=_get_eso_converters(_get_eso_dtypes(report_code,
+                                                                              variable_dictionary))
+            yield report_code, tuple(g(y) for g,y in zip(c,line.split(',')[1:]))
+    
+
+# the start of an EPEso cache file written by `EPEso.to_cache`
+_eso_cache_magic=b'EPRUNESO'
+
+# the version of the format of the EPEso cache files
+_eso_cache_version=1
+
+# the byte alignment of the arrays in an EPEso cache file
+_eso_cache_alignment=64
+
+
 class EPEso():
     """A class for an EnergyPlus .eso file.
     
     :param fp: The filepath for the .eso file.
     :type fp: str
+    :param report_codes: If given, only the data of the variables with these
+        report codes is read. The time period data is always read.
+    :type report_codes: list (int)
+    :param frequencies: If given, only the data of these frequencies is read.
+        Options are 'interval', 'daily', 'monthly', 'runperiod' and 'annual'.
+    :type frequencies: list (str)
+    :param environments: If given, only the simulation environments with these
+        environment titles are read.
+    :type environments: list (str)
+    :param lazy: If True, the data section is not read when the instance is
+        created. Instead the byte offsets of its sections are read from an
+        index file saved next to the .eso file (with '.idx' appended to `fp`),
+        which is created on first use, and the data of each variable is read
+        from the .eso file when it is first accessed.
+    :type lazy: bool
+    :param max_workers: If greater than 1, the data section is memory-mapped,
+        split into this number of chunks at time period boundaries and the 
+        chunks are read in a pool of worker processes. Not used if `lazy` is True.
+        The speed-up with several cores has not been measured yet, see 
+        'tests/benchmark_eso_parser.py'. On a single core this is slower than 
+        the serial parser, as the typed columns of the chunks are sent back from
+        the worker processes.
+    :type max_workers: int
+
+    Unwanted lines in the data section are discarded by looking at the report code
+    at the start of the line, before the line is split. The parse time and memory use
+    then depend on the amount of data requested rather than the size of the file.
     
     .. rubric:: Code Example
         
@@ -464,157 +5951,68 @@ class EPEso():
 
     """
 
-    def __init__(self,fp):
+    def __init__(self,
+                 fp,
+                 report_codes=None,
+                 frequencies=None,
+                 environments=None,
+                 lazy=False,
+                 max_workers=None):
         ""
-        programme_version_statement_flag=True # True if in this section
-        data_dictionary_flag=False # True if in this section
-        data_flag=False # True if in this section
+        self._fp=fp
+        
+        if lazy:
+            
+            with open(fp,'r') as f:
+                (programme_version_statement,
+                 standard_items_dictionary,
+                 variable_dictionary)=_read_eso_data_dictionary(f)
+            
+            self._lazy_cache=collections.OrderedDict()
+            data=[]
+            
+            for x in _read_eso_index(fp)['environments']:
                 
-        standard_items_dictionary={}
-        variable_dictionary={}
-        data=[]
+                if not environments is None and not x['environment_title'] in environments:
+                    continue
                 
-        with open(fp,'r') as f:
+                simulation_environment={k:x[k] for k in ('environment_title','latitude','longitude',
+                                                         'time_zone','elevation')}
+                
+                for frequency,(key,period_report_code) in _eso_frequency_keys.items():
+                    section=x['sections'][frequency]
+                    if not frequencies is None and not frequency in frequencies:
+                        section={'report_codes':[],'runs':[]}
+                    section_report_codes=[rc for rc in section['report_codes']
+                                          if report_codes is None or rc in report_codes]
+                    simulation_environment[key]=_EPEsoLazySection(self,
+                                                                  period_report_code,
+                                                                  section_report_codes,
+                                                                  section['runs'])
+                data.append(simulation_environment)
+        
+        else:
             
-            for line in f: # loop through lines in file
+            with open(fp,'r') as f:
                 
-                if programme_version_statement_flag: # programme version statement (first row)
-                    
-                    row=line.strip().split(',')
-                    programme_version_statement={'programme':row[1].strip(),
-                                                 'version':row[2].strip(),
-                                                 'timestamp':row[3].strip()}
-                    programme_version_statement_flag=False
-                    data_dictionary_flag=True
-                    
-                    
-                elif data_dictionary_flag: # data dictionary section
-                    
-                    if line.startswith('End of Data Dictionary'): # end of section line
-                        
-                        data_dictionary_flag=False
-                        data_flag=True
-                        
-                    else: # a data dictionary line
-                    
-                        line_and_comment=line.split('!')
-                        row=line_and_comment[0].split(',')
-                        try:
-                            comment=line_and_comment[1].strip()
-                        except IndexError:
-                            comment=None
-                    
-                        report_code=int(row[0])
-                        number_of_values=int(row[1])
-                        
-                        if report_code<=6: # a 'standard item'
-                        
-                            items=[]
-                            for item in row[2:]:
-                                a=item.split('[')
-                                name=a[0].strip()
-                                try:
-                                    unit=a[1].split(']')[0].strip() or None
-                                except IndexError:
-                                    unit=None
-                                items.append({'name':name,
-                                              'unit':unit})
-                            
-                            standard_items_dictionary[report_code]={'number_of_values':number_of_values,
-                                                                    'items':items,
-                                                                    'comment':comment}
-                        
-                        else: # a 'variable item'
-                            
-                            object_name=row[2]
-                            a=row[3].split('[')
-                            quantity=a[0].strip()
-                            try:
-                                unit=a[1].split(']')[0].strip() or None
-                            except IndexError:
-                                unit=None
-                        
-                            variable_dictionary[report_code]={'number_of_values':number_of_values,
-                                                              'object_name':object_name,
-                                                              'quantity':quantity,
-                                                              'unit':unit,
-                                                              'comment':comment}
-                        
-    
-                elif data_flag: # data section
+                (programme_version_statement,
+                 standard_items_dictionary,
+                 variable_dictionary)=_read_eso_data_dictionary(f)
                 
-                    if line.startswith('End of Data'):
-                        
-                        data_flag=False
-                    
-                    else:
-                        
-                        row=[x.strip() for x in line.split(',')]
-                        report_code=int(row[0])
-                        
-                        if report_code==1: # start of a new simulation environment
-                            
-                            simulation_environment={'environment_title':row[1].strip(),
-                                                    'latitude':row[2].strip(),
-                                                    'longitude':row[3].strip(),
-                                                    'time_zone':row[4].strip(),
-                                                    'elevation':row[5].strip(),
-                                                    'interval_data':{2:[]},
-                                                    'daily_data':{3:[]},
-                                                    'monthly_data':{4:[]},
-                                                    'run_period_data':{5:[]},
-                                                    'annual_data':{6:[]}}
-                            
-                            data.append(simulation_environment)
-                            
-                            
-                        elif report_code==2:
-                            
-                            d=simulation_environment['interval_data']
-                            d[report_code].append(row[1:])
-                            
-                        elif report_code==3:
-                            
-                            d=simulation_environment['daily_data']
-                            d[report_code].append(row[1:])
-                            
-                        elif report_code==4:
-                            
-                            d=simulation_environment['monthly_data']
-                            d[report_code].append(row[1:])
-                            
-                            
-                        elif report_code==5:
-                            
-                            d=simulation_environment['run_period_data']
-                            d[report_code].append(row[1:])
-                            
-                        elif report_code==6:
-                            
-                            d=simulation_environment['annual_data']
-                            d[report_code].append(row[1:])
-                            
-                        else:
-                            
-                            x=d.setdefault(report_code,[])
-                            x.append(row[1:])
-                            
-                else: # beyond the data section
-                    
-                    pass
-
-        # zip the interval data
-        for env in data:
-            for k in env['interval_data'].keys():
-                env['interval_data'][k]=tuple(zip(*env['interval_data'][k]))
-            for k in env['daily_data'].keys():
-                env['daily_data'][k]=tuple(zip(*env['daily_data'][k]))
-            for k in env['monthly_data'].keys():
-                env['monthly_data'][k]=tuple(zip(*env['monthly_data'][k]))
-            for k in env['run_period_data'].keys():
-                env['run_period_data'][k]=tuple(zip(*env['run_period_data'][k]))
-            for k in env['annual_data'].keys():
-                env['annual_data'][k]=tuple(zip(*env['annual_data'][k]))
+                if max_workers is None or max_workers<=1:
+                    data=_read_eso_data(f,
+                                        variable_dictionary,
+                                        report_codes,
+                                        frequencies,
+                                        environments)
+            
+            if not max_workers is None and max_workers>1:
+                data=_read_eso_data_parallel(fp,
+                                             variable_dictionary,
+                                             report_codes,
+                                             frequencies,
+                                             environments,
+                                             max_workers)
             
         # set attributes
         self._programme_version_statement=programme_version_statement
@@ -623,6 +6021,78 @@ class EPEso():
         self._data=data
 
 
+    @classmethod
+    def from_cache(cls,path):
+        """Returns an EPEso instance from a cache file written by `EPEso.to_cache`.
+        
+        The cache file is memory-mapped and the data columns are read-only numpy 
+        arrays which use the memory map as their buffer, so no data is copied or 
+        parsed when the file is loaded. If the .eso file which the cache was 
+        written from still exists, its size and modification time must be the 
+        same as when the cache was written.
+        
+        :param path: The filepath of the cache file.
+        :type path: str
+        
+        :raises ValueError: If the file is not an EPEso cache file of the current 
+            version, or if the .eso file has changed since the cache was written.
+        
+        :rtype: EPEso
+        
+        """
+        with open(path,'rb') as f:
+            mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        
+        if not mm[:8]==_eso_cache_magic:
+            raise ValueError('"%s" is not an EPEso cache file' % path)
+        header_length=int.from_bytes(mm[8:16],'little')
+        header=json.loads(mm[16:16+header_length].decode())
+        if not header['version']==_eso_cache_version:
+            raise ValueError('EPEso cache file "%s" has version %s, expected %s' 
+                             % (path,header['version'],_eso_cache_version))
+        try:
+            st=os.stat(header['fp'])
+        except (OSError,TypeError): # the .eso file no longer exists
+            pass
+        else:
+            if not (header['size']==st.st_size and header['mtime_ns']==st.st_mtime_ns):
+                mm.close()
+                raise ValueError('EPEso cache file "%s" is out of date, "%s" has changed' 
+                                 % (path,header['fp']))
+        start=-(-(16+header_length)//_eso_cache_alignment)*_eso_cache_alignment
+        
+        def get_array(x):
+            return np.frombuffer(mm,
+                                 dtype=x['dtype'],
+                                 count=x['length'],
+                                 offset=start+x['offset'])
+        
+        data=[]
+        for x in header['environments']:
+            simulation_environment={k:x[k] for k in ('environment_title','latitude','longitude',
+                                                     'time_zone','elevation')}
+            for key in ('interval_data','daily_data','monthly_data','run_period_data','annual_data'):
+                d=simulation_environment[key]={}
+                for report_code,columns in x[key]:
+                    result=[]
+                    for column in columns:
+                        if 'categories' in column:
+                            result.append(pd.Categorical.from_codes(get_array(column),
+                                                                    column['categories']))
+                        else:
+                            result.append(get_array(column))
+                    d[report_code]=tuple(result)
+            data.append(simulation_environment)
+            
+        epeso=cls.__new__(cls)
+        epeso._fp=header['fp']
+        epeso._programme_version_statement=header['programme_version_statement']
+        epeso._standard_items_dictionary={k:v for k,v in header['standard_items_dictionary']}
+        epeso._variable_dictionary={k:v for k,v in header['variable_dictionary']}
+        epeso._data=data
+        return epeso
+        
+        
     def get_environment(self,environment_title):
         """Returns a simulation environment in the .eso file.
         
@@ -678,6 +6148,74 @@ class EPEso():
         return self._standard_items_dictionary
 
 
+    def to_cache(self,path):
+        """Writes the data of the .eso file to a binary cache file.
+        
+        The cache file holds the programme version statement, the data dictionary
+        and the typed columns of each simulation environment as raw arrays. 
+        Use `EPEso.from_cache` to load it.
+        
+        :param path: The filepath of the cache file.
+        :type path: str
+        
+        """
+        arrays=[]
+        offset=0
+        
+        def add_array(a):
+            nonlocal offset
+            a=np.ascontiguousarray(a)
+            result={'dtype':a.dtype.str,
+                    'offset':offset,
+                    'length':len(a)}
+            arrays.append(a)
+            offset+=-(-a.nbytes//_eso_cache_alignment)*_eso_cache_alignment
+            return result
+        
+        environments=[]
+        for x in self._data:
+            simulation_environment={k:x[k] for k in ('environment_title','latitude','longitude',
+                                                     'time_zone','elevation')}
+            for key in ('interval_data','daily_data','monthly_data','run_period_data','annual_data'):
+                d=simulation_environment[key]=[]
+                for report_code,columns in x[key].items():
+                    result=[]
+                    for column in columns:
+                        if isinstance(column,pd.Categorical):
+                            y=add_array(column.codes)
+                            y['categories']=list(column.categories)
+                        else:
+                            y=add_array(column)
+                        result.append(y)
+                    d.append([report_code,result])
+            environments.append(simulation_environment)
+            
+        try:
+            st=os.stat(self._fp)
+            size,mtime_ns=st.st_size,st.st_mtime_ns
+        except OSError:
+            size,mtime_ns=None,None
+        
+        header=json.dumps({'version':_eso_cache_version,
+                           'fp':self._fp,
+                           'size':size,
+                           'mtime_ns':mtime_ns,
+                           'programme_version_statement':self._programme_version_statement,
+                           'standard_items_dictionary':list(self._standard_items_dictionary.items()),
+                           'variable_dictionary':list(self._variable_dictionary.items()),
+                           'environments':environments}).encode()
+        start=-(-(16+len(header))//_eso_cache_alignment)*_eso_cache_alignment
+        
+        with open(path,'wb') as f:
+            f.write(_eso_cache_magic)
+            f.write(len(header).to_bytes(8,'little'))
+            f.write(header)
+            f.write(bytes(start-16-len(header)))
+            for a in arrays:
+                f.write(a.tobytes())
+                f.write(bytes(-a.nbytes%_eso_cache_alignment))
+        
+
     @property
     def variable_dictionary(self):
         """A dictionary of the variables in the data dictionary.
@@ -731,6 +6269,34 @@ class EPEsoSimulationEnvironment():
         """
         return self._epeso._data[self._index]
     
+    
+    def _filter_variables(self,
+                          variables,
+                          report_codes=None,
+                          names=None):
+        """Filters a sequence of variables.
+        
+        :param variables: The variables to filter.
+        :type variables: list
+        :param report_codes: If given, only the variables with these
+            report codes are kept.
+        :type report_codes: list (int)
+        :param names: If given, only the variables with these
+            (object_name, quantity) pairs are kept.
+        :type names: list (tuple)
+        
+        :rtype: list
+        
+        """
+        result=[]
+        for v in variables:
+            if not report_codes is None and not v.report_code in report_codes:
+                continue
+            if not names is None and not (v.object_name,v.quantity) in names:
+                continue
+            result.append(v)
+        return result
+    
         
     @property
     def elevation(self):
@@ -803,41 +6369,28 @@ class EPEsoSimulationEnvironment():
         """
     
     
-    def get_daily_dataframe(self):
+    def get_daily_dataframe(self,
+                            report_codes=None,
+                            variables=None):
         """Returns a pandas DataFrame from the daily data.
         
+        :param report_codes: If given, only the daily variables with these
+            report codes are included.
+        :type report_codes: list (int)
+        :param variables: If given, only the daily variables with these
+            (object_name, quantity) pairs are included.
+        :type variables: list (tuple)
+        
         :rtype: pandas.DataFrame
         
         """
-    
-        index=pd.Index(data=self.get_daily_periods().get_periods(),
-                       name='time_periods')
-        column_level_names=('object_name','quantity','unit','value_type')
-        
-        data=[]
-        columns=[[],[],[],[]]
-        
-        for dv in self.get_daily_variables():
-            
-            columns[0]+=[dv.object_name]*5
-            columns[1]+=[dv.quantity]*5
-            columns[2]+=[dv.unit or '-']*5
-            columns[3]+=['value','min_value','min_time','max_value','max_time']
-        
-            data+=[dv.values,
-                   dv.min_values,
-                   dv.get_min_times(),
-                   dv.max_values,
-                   dv.get_max_times()]
-        
-        columns=tuple(zip(*columns))
-        data=tuple(zip(*data))
-        
-        df=pd.DataFrame(index=index,
-                        data=data,
-                        columns=pd.MultiIndex.from_tuples(columns,
-                                                          names=column_level_names))
-        return df
+        index=self.get_daily_periods().get_period_index().rename('time_periods')
+        x=self._filter_variables(self.get_daily_variables(),
+                                 report_codes,
+                                 variables)
+        return _get_variables_dataframe(index,
+                                        x,
+                                        self.get_timezone())
 
 
     def get_daily_periods(self):
@@ -905,36 +6458,28 @@ class EPEsoSimulationEnvironment():
             raise KeyError('Report code %s does not match any interval variables.' % (report_code))
         
 
-    def get_interval_dataframe(self):
+    def get_interval_dataframe(self,
+                               report_codes=None,
+                               variables=None):
         """Returns a pandas DataFrame from the interval data.
         
+        :param report_codes: If given, only the interval variables with these
+            report codes are included.
+        :type report_codes: list (int)
+        :param variables: If given, only the interval variables with these
+            (object_name, quantity) pairs are included.
+        :type variables: list (tuple)
+        
         :rtype: pandas.DataFrame
         
         """
-        index=pd.Index(data=self.get_interval_periods().get_periods(),
-                       name='time_periods')
-        column_level_names=('object_name','quantity','unit','value_type')
-        
-        data=[]
-        columns=[[],[],[],[]]
-        
-        for dv in self.get_interval_variables():
-            
-            columns[0]+=[dv.object_name]
-            columns[1]+=[dv.quantity]
-            columns[2]+=[dv.unit or '-']
-            columns[3]+=['value']
-        
-            data+=[dv.values]
-        
-        columns=tuple(zip(*columns))
-        data=tuple(zip(*data))
-        
-        df=pd.DataFrame(index=index,
-                        data=data,
-                        columns=pd.MultiIndex.from_tuples(columns,
-                                                          names=column_level_names))
-        return df
+        index=self.get_interval_periods().get_period_index().rename('time_periods')
+        x=self._filter_variables(self.get_interval_variables(),
+                                 report_codes,
+                                 variables)
+        return _get_variables_dataframe(index,
+                                        x,
+                                        self.get_timezone())
 
     
     def get_interval_periods(self):
@@ -1003,41 +6548,29 @@ class EPEsoSimulationEnvironment():
         return result
     
     
-    def get_monthly_dataframe(self):
+    def get_monthly_dataframe(self,
+                              report_codes=None,
+                              variables=None):
         """Returns a pandas DataFrame from the monthly data.
         
+        :param report_codes: If given, only the monthly variables with these
+            report codes are included.
+        :type report_codes: list (int)
+        :param variables: If given, only the monthly variables with these
+            (object_name, quantity) pairs are included.
+        :type variables: list (tuple)
+        
         :rtype: pandas.DataFrame
         
         """
-        index=pd.Index(data=self.get_monthly_periods().get_periods(),
-                       name='time_periods')
-        column_level_names=('object_name','quantity','unit','value_type')
-        
-        data=[]
-        columns=[[],[],[],[]]
-        
-        for mv in self.get_monthly_variables():
-            
-            columns[0]+=[mv.object_name]*5
-            columns[1]+=[mv.quantity]*5
-            columns[2]+=[mv.unit]*5
-            columns[3]+=['value','min_value','min_time','max_value','max_time']
-        
-            data+=[mv.values,
-                   mv.min_values,
-                   mv.get_min_times(),
-                   mv.max_values,
-                   mv.get_max_times()]
-        
-        columns=tuple(zip(*columns))
-        data=tuple(zip(*data))
-        
-        df=pd.DataFrame(index=index,
-                        data=data,
-                        columns=pd.MultiIndex.from_tuples(columns,
-                                                          names=column_level_names))
-        
-        return df
+        index=self.get_monthly_periods().get_period_index().rename('time_periods')
+        x=self._filter_variables(self.get_monthly_variables(),
+                                 report_codes,
+                                 variables)
+        return _get_variables_dataframe(index,
+                                        x,
+                                        self.get_timezone(),
+                                        missing_unit=None) # the unit as it is, as in earlier versions
     
     
     def get_monthly_periods(self):
@@ -1270,10 +6803,10 @@ class EPEsoAnnualPeriods():
     def calendar_years_of_simulation(self):
         """The 'calendar year of simulation' for the annual periods.
         
-        :rtype: tuple
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[0])
+        return self._data[0]
     
     
     def get_start_times(self):
@@ -1355,42 +6888,55 @@ class EPEsoDailyPeriods():
     def cumulative_days_of_simulation(self):
         """The 'cumulative days of simulation' for the daily periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[0])
+        return self._data[0]
     
         
     @property 
     def days_of_month(self):
         """The days in the month for the daily periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[2])
+        return self._data[2]
     
 
     @property 
     def day_types(self):
         """The day types for the daily periods.
         
-        :rtype: tuple (int)
+        :rtype: pandas.Categorical
         
         """
-        return tuple(str(x) for x in self._data[7])
+        return self._data[4]
 
 
     @property 
     def dst_indicators(self):
         """The daylight saving time indicators for the daily periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[3])
+        return self._data[3]
     
     
+    def get_datetime_index(self):
+        """Returns the start times for the daily periods as a pandas DatetimeIndex.
+        
+        The index is built directly from the month and day arrays
+        in a single vectorized operation.
+        
+        :rtype: pandas.DatetimeIndex
+        
+        """
+        return _get_datetime_index(self._epesose.get_timezone(),
+                                   self.months,
+                                   self.days_of_month)
+    
     
     def get_end_times(self):
         """Returns the end times for the daily periods.
@@ -1398,8 +6944,8 @@ class EPEsoDailyPeriods():
         :rtype: tuple (datetime.datetime)
         
         """
-        return tuple(start_time+datetime.timedelta(days=1) 
-                     for start_time in self.get_start_times())
+        x=self.get_datetime_index()+pd.Timedelta(days=1)
+        return tuple(x.to_pydatetime())
 
 
     def get_interval(self):
@@ -1410,6 +6956,15 @@ class EPEsoDailyPeriods():
         """
         return datetime.timedelta(days=1)
         
+    
+    def get_period_index(self):
+        """Returns the daily periods as a pandas PeriodIndex.
+        
+        :rtype: pandas.PeriodIndex
+        
+        """
+        period_frequency='%sS' % self.get_interval().total_seconds()
+        return self.get_datetime_index().tz_localize(None).to_period(period_frequency)
 
 
     def get_periods(self):
@@ -1418,9 +6973,7 @@ class EPEsoDailyPeriods():
         :rtype: list (pandas.Period)
         
         """
-        start_times=self.get_start_times()
-        period_frequency='%sS' % self.get_interval().total_seconds()
-        return [pd.Period(start_time,period_frequency) for start_time in start_times]
+        return list(self.get_period_index())
 
 
     def get_start_times(self):
@@ -1429,20 +6982,17 @@ class EPEsoDailyPeriods():
         :rtype: tuple (datetime.datetime)
         
         """
-        x=zip(self.months,self.days_of_month)
-        return tuple(datetime.datetime(2001,m,d,
-                                  tzinfo=self._epesose.get_timezone())
-                     for m,d in x)
+        return tuple(self.get_datetime_index().to_pydatetime())
 
 
     @property
     def months(self):
         """The months for the daily periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[1])
+        return self._data[1]
 
 
     def summary(self):
@@ -1518,34 +7068,42 @@ class EPEsoDailyVariable():
         return self._epesose._epeso._variable_dictionary[self._report_code]
     
     
-    def get_dataframe(self):
-        """Returns a pandas dataframe of the interval variable.
+    def _get_max_times_array(self):
+        """Returns the (time zone naive) times when the maximum values occur.
         
-        :rtype: pandas.DataFrame
+        :rtype: numpy.ndarray (numpy.datetime64)
         
         """
-        index=pd.Index(data=self._daily_periods.get_start_times(),
-                       name='start_times')
-        column_level_names=('object_name','quantity','unit','value_type')
+        daily_periods=self._daily_periods
+        return _get_datetime64(daily_periods.months,
+                               daily_periods.days_of_month,
+                               self.max_hours-1,
+                               self.max_minutes-1)
+    
+    
+    def _get_min_times_array(self):
+        """Returns the (time zone naive) times when the minimum values occur.
+        
+        :rtype: numpy.ndarray (numpy.datetime64)
         
-        data=[self.values,
-              self.min_values,
-              self.get_min_times(),
-              self.max_values,
-              self.get_max_times()]
-        columns=[[self.object_name]*5,
-                 [self.quantity]*5,
-                 [self.unit or '-']*5,
-                 ['value','min_value','min_time','max_value','max_time']]
+        """
+        daily_periods=self._daily_periods
+        return _get_datetime64(daily_periods.months,
+                               daily_periods.days_of_month,
+                               self.min_hours-1,
+                               self.min_minutes-1)
+    
+    
+    def get_dataframe(self):
+        """Returns a pandas dataframe of the interval variable.
         
-        columns=tuple(zip(*columns))
-        data=tuple(zip(*data))
+        :rtype: pandas.DataFrame
         
-        df=pd.DataFrame(index=index,
-                        data=data,
-                        columns=pd.MultiIndex.from_tuples(columns,
-                                                          names=column_level_names))
-        return df
+        """
+        index=self._daily_periods.get_datetime_index().rename('start_times')
+        return _get_variables_dataframe(index,
+                                        [self],
+                                        self._epesose.get_timezone())
 
 
     def get_max_times(self):
@@ -1554,20 +7112,8 @@ class EPEsoDailyVariable():
         :rtype: tuple (datetime.datetime)
         
         """
-        day_start_times=self._epesose.get_daily_periods().get_start_times()
-        result=[]
-        for day_start_time,max_hour,max_minute in zip(day_start_times,
-                                                      self.max_hours,
-                                                      self.max_minutes):
-            t=datetime.datetime(day_start_time.year,
-                                day_start_time.month,
-                                day_start_time.day,
-                                max_hour-1,
-                                max_minute-1,
-                                tzinfo=day_start_time.tzinfo
-                                )
-            result.append(t)
-        return tuple(result)
+        x=pd.DatetimeIndex(self._get_max_times_array()).tz_localize(self._epesose.get_timezone())
+        return tuple(x.to_pydatetime())
     
     
     def get_min_times(self):
@@ -1576,80 +7122,68 @@ class EPEsoDailyVariable():
         :rtype: tuple (datetime.datetime)
         
         """
-        day_start_times=self._epesose.get_daily_periods().get_start_times()
-        result=[]
-        for day_start_time,min_hour,min_minute in zip(day_start_times,
-                                                      self.min_hours,
-                                                      self.min_minutes):
-            t=datetime.datetime(day_start_time.year,
-                                day_start_time.month,
-                                day_start_time.day,
-                                min_hour-1,
-                                min_minute-1,
-                                tzinfo=day_start_time.tzinfo
-                                )
-            result.append(t)
-        return tuple(result)
+        x=pd.DatetimeIndex(self._get_min_times_array()).tz_localize(self._epesose.get_timezone())
+        return tuple(x.to_pydatetime())
     
     
     @property
     def max_hours(self):
         """The hour numbers for the maximum values of the daily variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[5])
+        return self._data[5]
     
     
     @property
     def max_minutes(self):
         """The minute numbers for the maximum values of the daily variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[6])
+        return self._data[6]
     
     
     @property
     def max_values(self):
         """The maximum values of the monthly variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[4])
+        return self._data[4]
     
     
     @property
     def min_hours(self):
         """The hour numbers for the minimum values of the daily variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[2])
+        return self._data[2]
 
 
     @property
     def min_minutes(self):
         """The minute numbers for the minimum values of the daily variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[3])
+        return self._data[3]
     
         
     @property
     def min_values(self):
         """The minimum values of the daily variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[1])
+        return self._data[1]
     
         
     @property
@@ -1732,10 +7266,10 @@ class EPEsoDailyVariable():
     def values(self):
         """The (mean) values of the daily variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[0])
+        return self._data[0]
     
     
     
@@ -1786,50 +7320,66 @@ class EPEsoIntervalPeriods():
     def day_types(self):
         """The day types for the interval periods.
         
-        :rtype: tuple (str)
+        :rtype: pandas.Categorical
         
         """
-        return tuple(str(x) for x in self._data[7])
+        return self._data[7]
 
 
     @property 
     def days_of_month(self):
         """The days in the month for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[2])
+        return self._data[2]
     
 
     @property
     def days_of_simulation(self):
         """The 'day of simulation' values for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[0])
+        return self._data[0]
     
     
     @property 
     def dst_indicators(self):
         """The daylight saving time indicators for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[3])
+        return self._data[3]
     
     
     @property 
     def end_minutes(self):
         """The end minutes for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
+        
+        """
+        return self._data[6]
+    
+    
+    def get_datetime_index(self):
+        """Returns the start times for the interval periods as a pandas DatetimeIndex.
+        
+        The index is built directly from the month, day, hour and minute arrays
+        in a single vectorized operation.
+        
+        :rtype: pandas.DatetimeIndex
         
         """
-        return tuple(int(float(x)) for x in self._data[6]) 
+        return _get_datetime_index(self._epesose.get_timezone(),
+                                   self.months,
+                                   self.days_of_month,
+                                   self.hours-1,
+                                   self.start_minutes)
     
     
     def get_end_times(self):
@@ -1838,10 +7388,9 @@ class EPEsoIntervalPeriods():
         :rtype: tuple (datetime.datetime)
         
         """
-        start_times=self.get_start_times()
-        x=zip(start_times,self.start_minutes,self.end_minutes)
-        return tuple(start_time+datetime.timedelta(minutes=end_minute-start_minute) 
-                     for start_time,start_minute,end_minute in x)
+        x=(self.end_minutes.astype(np.int64)-self.start_minutes).astype('timedelta64[m]')
+        x=self.get_datetime_index()+pd.TimedeltaIndex(x)
+        return tuple(x.to_pydatetime())
  
     
     def get_interval(self):
@@ -1850,18 +7399,26 @@ class EPEsoIntervalPeriods():
         :rtype: datetime.timedelta
         
         """
-        return datetime.timedelta(minutes=self.end_minutes[0]-self.start_minutes[0])
+        return datetime.timedelta(minutes=int(self.end_minutes[0]-self.start_minutes[0]))
         
     
+    def get_period_index(self):
+        """Returns the interval periods as a pandas PeriodIndex.
+        
+        :rtype: pandas.PeriodIndex
+        
+        """
+        period_frequency='%sS' % self.get_interval().total_seconds()
+        return self.get_datetime_index().tz_localize(None).to_period(period_frequency)
+    
+    
     def get_periods(self):
         """Returns the interval periods as a list of Pandas periods.
         
         :rtype: list (pandas.Period)
         
         """
-        start_times=self.get_start_times()
-        period_frequency='%sS' % self.get_interval().total_seconds()
-        return [pd.Period(start_time,period_frequency) for start_time in start_times]
+        return list(self.get_period_index())
     
     
     def get_start_times(self):
@@ -1870,40 +7427,37 @@ class EPEsoIntervalPeriods():
         :rtype: tuple (datetime.datetime)
         
         """
-        x=zip(self.months,self.days_of_month,self.hours,self.start_minutes)
-        return tuple(datetime.datetime(2001,m,d,h-1,mi,
-                                  tzinfo=self._epesose.get_timezone())
-                     for m,d,h,mi in x)
+        return tuple(self.get_datetime_index().to_pydatetime())
     
     
     @property 
     def hours(self):
         """The hours for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[4])
+        return self._data[4]
     
     
     @property
     def months(self):
         """The months for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[1])
+        return self._data[1]
     
     
     @property 
     def start_minutes(self):
         """The start minutes for the interval periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(float(x)) for x in self._data[5]) 
+        return self._data[5]
     
     
     def summary(self):
@@ -1986,20 +7540,9 @@ class EPEsoIntervalVariable():
         :rtype: pandas.DataFrame
         
         """
-        index=pd.Index(data=self._interval_periods.get_start_times(),
-                       name='time_periods')
-        column_level_names=('object_name','quantity','unit','value_type')
-        
-        column=(self.object_name,
-                self.quantity,
-                self.unit or '-',
-                'value')
-        
-        df=pd.DataFrame(index=index,
-                        data=self.values,
-                        columns=pd.MultiIndex.from_tuples((column,),
-                                                          names=column_level_names))
-        return df
+        index=self._interval_periods.get_datetime_index().rename('time_periods')
+        return _get_variables_dataframe(index,
+                                        [self])
 
 
     def get_series(self):
@@ -2009,7 +7552,7 @@ class EPEsoIntervalVariable():
         
         """
         s=pd.Series(data=self.values,
-                    index=self._interval_periods.get_periods(),
+                    index=self._interval_periods.get_period_index(),
                     name=self.summary())
         return s
         
@@ -2095,10 +7638,10 @@ class EPEsoIntervalVariable():
     def values(self):
         """The (mean) values of the interval variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[0])
+        return self._data[0]
  
     
     
@@ -2148,10 +7691,23 @@ class EPEsoMonthlyPeriods():
     def cumulative_days_of_simulation(self):
         """The 'cumulative days of simulation' for the monthly periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
+        
+        """
+        return self._data[0]
+    
+    
+    def get_datetime_index(self):
+        """Returns the start times for the monthly periods as a pandas DatetimeIndex.
+        
+        The index is built directly from the month array
+        in a single vectorized operation.
+        
+        :rtype: pandas.DatetimeIndex
         
         """
-        return tuple(int(x) for x in self._data[0])
+        return _get_datetime_index(self._epesose.get_timezone(),
+                                   self.months)
     
     
     def get_end_times(self):
@@ -2160,11 +7716,19 @@ class EPEsoMonthlyPeriods():
         :rtype: tuple (datetime.datetime)
         
         """
-        result=[]
-        for start_time in self.get_start_times():
-            days_in_month=calendar.monthrange(start_time.year,start_time.month)[1]
-            result.append(start_time+datetime.timedelta(days=days_in_month))
-        return tuple(result)
+        x=_get_datetime_index(self._epesose.get_timezone(),
+                              self.months.astype(np.int64)+1)
+        return tuple(x.to_pydatetime())
+    
+    
+    def get_period_index(self):
+        """Returns the monthly periods as a pandas PeriodIndex.
+        
+        :rtype: pandas.PeriodIndex
+        
+        """
+        period_frequency='1M' 
+        return self.get_datetime_index().tz_localize(None).to_period(period_frequency)
     
     
     def get_periods(self):
@@ -2173,9 +7737,7 @@ class EPEsoMonthlyPeriods():
         :rtype: list (pandas.Period)
         
         """
-        start_times=self.get_start_times()
-        period_frequency='1M' 
-        return [pd.Period(start_time,period_frequency) for start_time in start_times]   
+        return list(self.get_period_index())
     
     
     def get_start_times(self):
@@ -2184,19 +7746,17 @@ class EPEsoMonthlyPeriods():
         :rtype: tuple (datetime.datetime)
         
         """
-        x=self.months
-        return tuple(datetime.datetime(2001,m,1,tzinfo=self._epesose.get_timezone())
-                for m in x)
+        return tuple(self.get_datetime_index().to_pydatetime())
         
 
     @property
     def months(self):
         """The months for the monthly periods.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[1])
+        return self._data[1]
 
 
     def summary(self):
@@ -2272,34 +7832,40 @@ class EPEsoMonthlyVariable():
         return self._epesose._epeso._variable_dictionary[self._report_code]
     
     
-    def get_dataframe(self):
-        """Returns a pandas dataframe of the monthly variable.
+    def _get_max_times_array(self):
+        """Returns the (time zone naive) times when the maximum values occur.
         
-        :rtype: pandas.DataFrame
+        :rtype: numpy.ndarray (numpy.datetime64)
         
         """
-        index=pd.Index(data=self._monthly_periods.get_periods(),
-                       name='time_periods')
-        column_level_names=('object_name','quantity','unit','value_type')
+        return _get_datetime64(self._monthly_periods.months,
+                               self.max_days,
+                               self.max_hours,
+                               self.max_minutes)
+    
+    
+    def _get_min_times_array(self):
+        """Returns the (time zone naive) times when the minimum values occur.
+        
+        :rtype: numpy.ndarray (numpy.datetime64)
         
-        data=[self.values,
-              self.min_values,
-              self.get_min_times(),
-              self.max_values,
-              self.get_max_times()]
-        columns=[[self.object_name]*5,
-                 [self.quantity]*5,
-                 [self.unit or '-']*5,
-                 ['value','min_value','min_time','max_value','max_time']]
+        """
+        return _get_datetime64(self._monthly_periods.months,
+                               self.min_days,
+                               self.min_hours,
+                               self.min_minutes)
+    
+    
+    def get_dataframe(self):
+        """Returns a pandas dataframe of the monthly variable.
         
-        columns=tuple(zip(*columns))
-        data=tuple(zip(*data))
+        :rtype: pandas.DataFrame
         
-        df=pd.DataFrame(index=index,
-                        data=data,
-                        columns=pd.MultiIndex.from_tuples(columns,
-                                                          names=column_level_names))
-        return df
+        """
+        index=self._monthly_periods.get_period_index().rename('time_periods')
+        return _get_variables_dataframe(index,
+                                        [self],
+                                        self._epesose.get_timezone())
     
     
     def get_max_times(self):
@@ -2308,21 +7874,8 @@ class EPEsoMonthlyVariable():
         :rtype: tuple (datetime.datetime)
         
         """
-        month_start_times=self._monthly_periods.get_start_times()
-        result=[]
-        for month_start_time,max_day,max_hour,max_minute in zip(month_start_times,
-                                                                self.max_days,
-                                                                self.max_hours,
-                                                                self.max_minutes):
-            t=datetime.datetime(month_start_time.year,
-                                month_start_time.month,
-                                max_day,
-                                max_hour,
-                                max_minute,
-                                tzinfo=month_start_time.tzinfo
-                                )
-            result.append(t)
-        return tuple(result)
+        x=pd.DatetimeIndex(self._get_max_times_array()).tz_localize(self._epesose.get_timezone())
+        return tuple(x.to_pydatetime())
 
     
     
@@ -2332,101 +7885,88 @@ class EPEsoMonthlyVariable():
         :rtype: tuple (datetime.datetime)
         
         """
-        month_start_times=self._monthly_periods.get_start_times()
-        result=[]
-        for month_start_time,min_day,min_hour,min_minute in zip(month_start_times,
-                                                                self.min_days,
-                                                                self.min_hours,
-                                                                self.min_minutes):
-            t=datetime.datetime(month_start_time.year,
-                                month_start_time.month,
-                                min_day,
-                                min_hour,
-                                min_minute,
-                                tzinfo=month_start_time.tzinfo
-                                )
-            result.append(t)
-        return tuple(result)
+        x=pd.DatetimeIndex(self._get_min_times_array()).tz_localize(self._epesose.get_timezone())
+        return tuple(x.to_pydatetime())
 
 
     @property
     def max_days(self):
         """The day numbers for the maximum values of the monthly variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[6])
+        return self._data[6]
     
     
     @property
     def max_hours(self):
         """The hour numbers for the maximum values of the monthly variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[7])
+        return self._data[7]
     
     
     @property
     def max_minutes(self):
         """The minute numbers for the maximum values of the monthly variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[8])
+        return self._data[8]
     
         
     @property
     def max_values(self):
         """The maximum values of the monthly variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[5])
+        return self._data[5]
     
     
     @property
     def min_days(self):
         """The day numbers for the minimum values of the monthly variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[2])
+        return self._data[2]
     
     
     @property
     def min_hours(self):
         """The hour numbers for the minimum values of the monthly variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[3])
+        return self._data[3]
     
     
     @property
     def min_minutes(self):
         """The minute numbers for the minimum values of the monthly variable.
         
-        :rtype: tuple (int)
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[4])
+        return self._data[4]
 
 
     @property
     def min_values(self):
         """The minimum values of the monthly variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[1])
+        return self._data[1]
     
             
     @property
@@ -2509,10 +8049,10 @@ class EPEsoMonthlyVariable():
     def values(self):
         """The (mean) values of the monthly variable.
         
-        :rtype: tuple (float)
+        :rtype: numpy.ndarray (float)
         
         """
-        return tuple(float(x) for x in self._data[0])
+        return self._data[0]
 
 
     
@@ -2538,10 +8078,10 @@ class EPEsoRunPeriodPeriods():
     def cumulative_days_of_simulation(self):
         """The 'cumulative days of simulation' for the run period periods.
         
-        :rtype: tuple
+        :rtype: numpy.ndarray (int)
         
         """
-        return tuple(int(x) for x in self._data[0])
+        return self._data[0]
     
     
     def get_start_times(self):
@@ -2552,7 +8092,7 @@ class EPEsoRunPeriodPeriods():
         
         """
         return tuple(datetime.datetime(2001,1,1,tzinfo=self._epesose.get_timezone())+
-                     datetime.timedelta(days=d-1)
+                     datetime.timedelta(days=int(d)-1)
                      for d in self.cumulative_days_of_simulation)
     
     
@@ -137,7 +137,8 @@ setup(
     #
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=['pandas',
+    install_requires=['numpy',
+                      'pandas',
                       'matplotlib',
                       'jsonschema'],  # Optional
 
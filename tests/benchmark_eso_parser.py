@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the .eso data-section parser against the number of worker processes.
+
+The 'files/eplusout.eso' fixture is scaled up by repeating its data section,
+then read with `EPEso(fp, max_workers=n)` for each number of workers. The
+speed-up is relative to the single process parser (`max_workers=None`).
+
+Run from the tests directory:
+
+    python benchmark_eso_parser.py [scale] [max_workers ...]
+
+Only single core figures have been taken so far, so the speed-up of the 
+parallel parser on a multi-core machine is still unknown. With a scale of 5 
+(a 9.4 MB file) on one core, the best of three reads took:
+
+    max_workers=None: 1.31 s
+    max_workers=1: 1.38 s, speed-up 0.95x
+    max_workers=2: 1.70 s, speed-up 0.78x
+    max_workers=4: 1.65 s, speed-up 0.80x
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from eprun import EPEso
+
+
+def write_scaled_eso(fp_in,fp_out,scale):
+    """Writes a copy of an .eso file with its data section repeated `scale` times.
+    """
+    with open(fp_in,'r') as f:
+        lines=f.readlines()
+    i=lines.index('End of Data Dictionary\n')+1
+    j=lines.index('End of Data\n')
+    with open(fp_out,'w') as f:
+        f.writelines(lines[:i])
+        for _ in range(scale):
+            f.writelines(lines[i:j])
+        f.writelines(lines[j:])
+
+
+def time_parser(fp,max_workers,repeat=3):
+    """Returns the best time in seconds of `repeat` reads of an .eso file.
+    """
+    result=None
+    for _ in range(repeat):
+        start=time.perf_counter()
+        EPEso(fp,max_workers=max_workers)
+        t=time.perf_counter()-start
+        result=t if result is None else min(result,t)
+    return result
+
+
+def main(scale=20,workers=(1,2,4,8)):
+    ""
+    with tempfile.TemporaryDirectory() as d:
+        fp=os.path.join(d,'eplusout.eso')
+        write_scaled_eso(os.path.join('files','eplusout.eso'),fp,scale)
+        print('file size: %.1f MB, cpu count: %s' % (os.path.getsize(fp)/1e6,os.cpu_count()))
+        t1=time_parser(fp,None)
+        print('max_workers=None: %.2f s' % t1)
+        for n in workers:
+            t=time_parser(fp,n)
+            print('max_workers=%s: %.2f s, speed-up %.2fx%s' 
+                  % (n,t,t1/t,' (more workers than cores)' if n>os.cpu_count() else ''))
+
+
+if __name__=='__main__':
+    args=[int(x) for x in sys.argv[1:]]
+    if len(args)>1:
+        main(args[0],args[1:])
+    elif args:
+        main(args[0])
+    else:
+        main()
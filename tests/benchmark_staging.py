@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of simulations run directly in `sim_dir` against runs staged in a scratch directory.
+
+The fake EnergyPlus executable is run with the 'small_writes' option, so that
+it writes a number of output files with many small flushed writes, then each
+simulation is run with `runsim(..., sim_dir=sim_dir)` and with
+`runsim(..., sim_dir=sim_dir, scratch_dir=scratch_dir)`. The benefit of staging
+is largest when `sim_dir` is on a slow or network file system and
+`scratch_dir` is on local disk or '/dev/shm'.
+
+Run from the tests directory:
+
+    python benchmark_staging.py sim_dir [scratch_dir] [small_writes] [runs]
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from eprun import runsim
+
+
+def write_input_file(fp,small_writes):
+    """Writes an input file for the fake EnergyPlus executable.
+    """
+    with open(fp,'w') as f:
+        f.write('Version,9.4;\n')
+        f.write('! fake_energyplus: small_writes=%s\n' % small_writes)
+
+
+def time_runs(input_filepath,sim_dir,scratch_dir,runs):
+    """Returns the mean time in seconds of `runs` simulations.
+    """
+    start=time.perf_counter()
+    for i in range(runs):
+        runsim(input_filepath=input_filepath,
+               epw_filepath=os.path.join('files','USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+               ep_dir=os.path.abspath('fake_energyplus'),
+               sim_dir=os.path.join(sim_dir,str(i)),
+               scratch_dir=scratch_dir)
+    return (time.perf_counter()-start)/runs
+
+
+def main(sim_dir,scratch_dir=None,small_writes=20000,runs=5):
+    ""
+    if scratch_dir is None:
+        scratch_dir='/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    with tempfile.TemporaryDirectory(dir=sim_dir) as d:
+        input_filepath=os.path.join(d,'in.idf')
+        write_input_file(input_filepath,small_writes)
+        print('sim_dir: %s, scratch_dir: %s, small writes per file: %s'
+              % (sim_dir,scratch_dir,small_writes))
+        t1=time_runs(input_filepath,os.path.join(d,'direct'),None,runs)
+        print('direct: %.3f s per run' % t1)
+        t2=time_runs(input_filepath,os.path.join(d,'staged'),scratch_dir,runs)
+        print('staged: %.3f s per run, speed-up %.2fx' % (t2,t1/t2))
+
+
+if __name__=='__main__':
+    args=sys.argv[1:]
+    if not args:
+        print(__doc__)
+    else:
+        main(args[0],
+             args[1] if len(args)>1 else None,
+             *[int(x) for x in args[2:]])
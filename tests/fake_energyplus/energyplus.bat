@@ -0,0 +1,11 @@
+@echo off
+rem Runs the fake EnergyPlus executable on Windows, where the Python script
+rem 'energyplus' cannot be run directly.
+rem The Python interpreter is given by the FAKE_ENERGYPLUS_PYTHON environment
+rem variable, or is 'python' if this is not set.
+if defined FAKE_ENERGYPLUS_PYTHON (
+    "%FAKE_ENERGYPLUS_PYTHON%" "%~dp0energyplus" %*
+) else (
+    python "%~dp0energyplus" %*
+)
+exit /b %ERRORLEVEL%
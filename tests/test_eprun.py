@@ -2,11 +2,18 @@
 
 import unittest
 
+import json
+import os
+import shutil
+import tempfile
+import time
+
 import eprun
-from eprun import runsim, EPEnd, EPErr, EPEso
+from eprun import runsim, prune_output_variables, morph_epw_batch, get_representative_periods, set_run_periods, get_annual_totals, iter_eso, EPRuntimePredictor, EPEnd, EPEpw, EPErr, EPEso
 
 from pprint import pprint
 import pandas as pd
+import numpy as np
 import datetime
 
 
@@ -36,6 +43,129 @@ class Test_eprun(unittest.TestCase):
         
         
         
+class Test_prune_output_variables(unittest.TestCase):
+    ""
+    
+    def test_prune_output_variables(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'1ZoneUncontrolled.idf')
+            report=prune_output_variables(r'files\1ZoneUncontrolled.idf',
+                                          fp,
+                                          ['EnergyTransfer:Building',
+                                           'site outdoor air drybulb temperature',
+                                           ('ZONE ONE','Zone Mean Air Temperature')])
+            self.assertEqual(report,
+                             {'outputs_before': 19, 
+                              'outputs_after': 3, 
+                              'eso_rows_before': 72294, 
+                              'eso_rows_after': 17520, 
+                              'estimated_eso_reduction': 1-17520/72294})
+            with open(fp) as f:
+                text=''.join(line.split('!')[0] for line in f)
+            objects=[x.strip() for x in text.split(';') if 'Output:Variable,' in x or 'Output:Meter' in x]
+            self.assertEqual([' '.join(x.split()) for x in objects],
+                             ['Output:Variable,*,Site Outdoor Air Drybulb Temperature,hourly',
+                              'Output:Variable, ZONE ONE, Zone Mean Air Temperature, Hourly',
+                              'Output:Meter:MeterFileOnly,EnergyTransfer:Building,hourly'])
+            # the other objects are unchanged
+            x=EPRuntimePredictor().get_features(fp)
+            y=EPRuntimePredictor().get_features(r'files\1ZoneUncontrolled.idf')
+            self.assertEqual({k:v for k,v in x.items() if not k in ('input_hash','run_key')},
+                             {k:v for k,v in y.items() if not k in ('input_hash','run_key')})
+            
+            
+    def test_prune_output_variables_epjson(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'1ZoneUncontrolled.epJSON')
+            report=prune_output_variables(r'files\1ZoneUncontrolled.epJSON',
+                                          fp,
+                                          ['Zone Mean Air Temperature'],
+                                          frequency='monthly')
+            self.assertEqual(report['outputs_after'],
+                             1)
+            with open(fp) as f:
+                x=json.load(f)
+            self.assertEqual(x['Output:Variable'],
+                             {'Output:Variable 4': {'key_value': '*', 
+                                                    'reporting_frequency': 'Monthly', 
+                                                    'variable_name': 'Zone Mean Air Temperature'}})
+            self.assertNotIn('Output:Meter:MeterFileOnly',
+                             x)
+            with self.assertRaises(ValueError):
+                prune_output_variables(r'files\1ZoneUncontrolled.epJSON',
+                                       fp,
+                                       [],
+                                       frequency='Weekly')
+            
+            
+class Test_EPRuntimePredictor(unittest.TestCase):
+    ""
+    
+    def test_get_features(self):
+        ""
+        predictor=EPRuntimePredictor()
+        x=predictor.get_features(r'files\1ZoneUncontrolled.idf')
+        self.assertEqual({k:v for k,v in x.items() if not k in ('input_hash','run_key')},
+                         {'zones': 1, 
+                          'surfaces': 6, 
+                          'timesteps_per_hour': 4, 
+                          'run_period_days': 365, 
+                          'design_days': 2})
+        y=predictor.get_features(r'files\1ZoneUncontrolled.epJSON')
+        self.assertEqual({k:v for k,v in y.items() if not k in ('input_hash','run_key')},
+                         {k:v for k,v in x.items() if not k in ('input_hash','run_key')})
+        y=predictor.get_features(r'files\1ZoneUncontrolled.idf',
+                                 design_day=True)
+        self.assertEqual(y['run_period_days'],
+                         0)
+        
+        
+    def test_predict(self):
+        ""
+        predictor=EPRuntimePredictor()
+        features=[dict(zones=1,surfaces=6,timesteps_per_hour=4,run_period_days=x,design_days=0) 
+                  for x in (31,365)]
+        self.assertLess(predictor.predict(features[0]),
+                        predictor.predict(features[1]))
+        predictor.add_run(features[0],1.0)
+        predictor.add_run(features[1],10.0)
+        self.assertAlmostEqual(predictor.predict(features[1]),
+                               10.0)
+        
+        
+    def test_predict_run_key(self):
+        ""
+        predictor=EPRuntimePredictor()
+        x=predictor.get_features(r'files\1ZoneUncontrolled.idf',
+                                 epw_filepath=r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+        predictor.add_run(x,100.0)
+        self.assertEqual(predictor.predict(x),
+                         100.0)
+        # the same input file with other options or run periods is not a repeated run
+        y=predictor.get_features(r'files\1ZoneUncontrolled.idf',
+                                 epw_filepath=r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+                                 expand_objects=True)
+        self.assertEqual(y['input_hash'],
+                         x['input_hash'])
+        self.assertNotEqual(y['run_key'],
+                            x['run_key'])
+        y=predictor.get_features(r'files\1ZoneUncontrolled.idf',
+                                 epw_filepath=r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+                                 run_periods=[{'name':'Sample 1',
+                                               'begin_month':1,'begin_day_of_month':1,
+                                               'end_month':1,'end_day_of_month':14}])
+        self.assertEqual(y['run_period_days'],
+                         14)
+        self.assertNotEqual(predictor.predict(y),
+                            100.0)
+        y=predictor.get_features(r'files\1ZoneUncontrolled.idf',
+                                 epw_filepath=r'files\eplusout.eso')
+        self.assertNotEqual(y['run_key'],
+                            x['run_key'])
+        
+        
 class Test_EPResult(unittest.TestCase):
     ""
     
@@ -99,6 +229,289 @@ class Test_EPEnd(unittest.TestCase):
         
   
 
+class Test_EPEpw(unittest.TestCase):
+    ""
+    
+    def test___init__(self):
+        ""
+        epw=EPEpw(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+        self.assertEqual(epw.location,
+                         {'city': 'San Francisco Intl Ap', 
+                          'state_province_region': 'CA', 
+                          'country': 'USA', 
+                          'data_source': 'TMY3', 
+                          'wmo_number': '724940', 
+                          'latitude': 37.62, 
+                          'longitude': -122.4, 
+                          'time_zone': -8.0, 
+                          'elevation': 2.0})
+        self.assertEqual(epw.design_conditions['heating'][:3],
+                         [1.0, 3.8, 4.9])
+        self.assertEqual(epw.typical_extreme_periods[0],
+                         {'name': 'Summer - Week Nearest Max Temperature For Period', 
+                          'type': 'Extreme', 
+                          'start_day': '8/1', 
+                          'end_day': '8/7'})
+        self.assertEqual(epw.ground_temperatures[2]['depth'],
+                         4.0)
+        self.assertEqual(epw.data_periods,
+                         {'number_of_records_per_hour': 1, 
+                          'periods': [{'name': 'Data', 
+                                       'start_day_of_week': 'Sunday', 
+                                       'start_day': '1/1', 
+                                       'end_day': '12/31'}]})
+        self.assertEqual(len(epw.header_lines),
+                         8)
+        x=epw.columns
+        self.assertEqual(len(x['dry_bulb_temperature']),
+                         8760)
+        self.assertEqual(x['month'].dtype,
+                         np.int8)
+        self.assertEqual(x['dry_bulb_temperature'][:2].tolist(),
+                         [7.2, 7.2])
+        self.assertEqual(x['present_weather_codes'][0],
+                         '999999999')
+        self.assertEqual(epw.get_dataframe().shape,
+                         (8760,35))
+        
+        
+    def test_cache(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'weather.epw')
+            shutil.copy(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',fp)
+            epw=EPEpw(fp,cache=True)
+            self.assertTrue(os.path.isfile(fp+'.cache'))
+            epw2=EPEpw(fp,cache=True)
+            self.assertFalse(epw2.columns['year'].flags.writeable) # read from the memory map
+            epw3=EPEpw.from_cache(fp+'.cache')
+            for x in (epw2,epw3):
+                self.assertEqual(x.location,
+                                 epw.location)
+                for k,v in epw.columns.items():
+                    self.assertTrue(np.array_equal(x.columns[k],v))
+            with self.assertRaises(ValueError):
+                EPEpw.from_cache(fp)
+            
+            
+    def test_morph(self):
+        ""
+        epw=EPEpw(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+        x=epw.columns['dry_bulb_temperature']
+        month=epw.columns['month']
+        wind_speed=epw.columns['wind_speed'].copy()
+        epw2=epw.morph({'dry_bulb_temperature':{'stretch':1.5,'shift':[1.0]*6+[2.0]*6},
+                        'global_horizontal_radiation':{'scale':1.1,'max':500},
+                        'wind_speed':lambda values,epepw: values*0})
+        y=epw2.columns['dry_bulb_temperature']
+        self.assertAlmostEqual(y[month==1].mean(),
+                               x[month==1].mean()+1.0)
+        self.assertAlmostEqual(y[month==12].mean(),
+                               x[month==12].mean()+2.0)
+        self.assertAlmostEqual(y[month==1].std(),
+                               x[month==1].std()*1.5)
+        self.assertEqual(epw2.columns['global_horizontal_radiation'].max(),
+                         500)
+        self.assertEqual(epw2.columns['wind_speed'].max(),
+                         0)
+        self.assertIs(epw2.columns['relative_humidity'],
+                      epw.columns['relative_humidity'])
+        self.assertTrue(np.array_equal(epw.columns['wind_speed'], # the original is not changed
+                                       wind_speed))
+        
+        
+    def test_morph_missing_values(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            epw=EPEpw(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+            month=epw.columns['month']
+            missing=(month==1)&(epw.columns['day']==1)
+            epw=epw.morph({'dry_bulb_temperature':lambda values,epepw: np.where(missing,99.9,values),
+                           'wind_direction':lambda values,epepw: np.where(missing,999,values)})
+            x=epw.columns['dry_bulb_temperature']
+            epw2=epw.morph({'dry_bulb_temperature':{'stretch':1.5,'shift':1.0,'max':30},
+                            'wind_direction':{'shift':10,'max':360}})
+            y=epw2.columns['dry_bulb_temperature']
+            self.assertTrue((y[missing]==99.9).all())
+            self.assertTrue((epw2.columns['wind_direction'][missing]==999).all())
+            # the missing values are not in the monthly means
+            january=(month==1)&~missing
+            self.assertAlmostEqual(y[january].mean(),
+                                   x[january].mean()+1.0)
+            fp=os.path.join(d,'weather.epw')
+            epw2.write(fp)
+            with open(fp) as f:
+                line=f.read().splitlines()[8]
+            self.assertEqual(line.split(',')[6],
+                             '99.9')
+            self.assertEqual(line.split(',')[20],
+                             '999')
+        
+        
+    def test_write(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            epw=EPEpw(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+            fp=os.path.join(d,'weather.epw')
+            epw.write(fp)
+            with open(fp) as f:
+                lines=f.read().splitlines()
+            self.assertEqual(lines[:8],
+                             epw.header_lines)
+            self.assertEqual(lines[8],
+                             '1999,1,1,1,0,?9?9?9?9E0?9?9?9?9?9?9?9?9?9?9?9?9?9?9?9*9*9?9?9?9,7.2,5.6,90,102200,0,0,290,0,0,0,0,0,0,0,0,0,2,2,16,77777,9,999999999,129,0.108,0,88,0.16,0,1')
+            epw2=EPEpw(fp)
+            for k,v in epw.columns.items():
+                self.assertTrue(np.array_equal(epw2.columns[k],v))
+                
+                
+class Test_morph_epw_batch(unittest.TestCase):
+    ""
+    
+    def test_morph_epw_batch(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            variants=[{'dry_bulb_temperature':{'shift':x}} for x in (1.0,2.0,3.0)]
+            for max_workers in (None,2):
+                result=morph_epw_batch(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+                                       variants,
+                                       output_dir=os.path.join(d,str(max_workers)),
+                                       max_workers=max_workers)
+                self.assertEqual([os.path.basename(x) for x in result],
+                                 ['USA_CA_San.Francisco.Intl.AP.724940_TMY3-%s.epw' % i for i in range(3)])
+                epw=EPEpw(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')
+                for fp,x in zip(result,(1.0,2.0,3.0)):
+                    epw2=EPEpw(fp)
+                    self.assertTrue(np.allclose(epw2.columns['dry_bulb_temperature'],
+                                                epw.columns['dry_bulb_temperature']+x))
+                    self.assertTrue(np.array_equal(epw2.columns['wind_speed'],
+                                                   epw.columns['wind_speed']))
+            
+            
+class Test_get_representative_periods(unittest.TestCase):
+    ""
+    
+    def test_get_representative_periods(self):
+        ""
+        result=get_representative_periods(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+                                          n_periods=4)
+        self.assertEqual([x['name'] for x in result],
+                         ['Sample 1','Sample 2','Sample 3','Sample 4'])
+        self.assertEqual([x['days'] for x in result],
+                         [7,7,7,7])
+        self.assertEqual(sum(x['weight'] for x in result),
+                         365)
+        self.assertEqual(result,
+                         get_representative_periods(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw',
+                                                    n_periods=4))
+        
+        result=get_representative_periods(EPEpw(r'files\USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                          n_periods=100,
+                                          period_days=30)
+        self.assertEqual(len(result),
+                         12)
+        self.assertEqual(result[0],
+                         {'name':'Sample 1','begin_month':1,'begin_day_of_month':1,
+                          'end_month':1,'end_day_of_month':30,'days':30,'weight':30})
+        self.assertEqual(result[-1],
+                         {'name':'Sample 12','begin_month':11,'begin_day_of_month':27,
+                          'end_month':12,'end_day_of_month':31,'days':35,'weight':35})
+        
+        
+class Test_set_run_periods(unittest.TestCase):
+    ""
+    
+    def test_set_run_periods(self):
+        ""
+        run_periods=[{'name':'Sample 1','begin_month':1,'begin_day_of_month':3,
+                      'end_month':1,'end_day_of_month':9},
+                     {'name':'Sample 2','begin_month':7,'begin_day_of_month':1,
+                      'end_month':7,'end_day_of_month':7}]
+        with tempfile.TemporaryDirectory() as d:
+            
+            fp=os.path.join(d,'in.idf')
+            set_run_periods(r'files\1ZoneUncontrolled.idf',
+                            fp,
+                            run_periods)
+            with open(fp) as f:
+                text=f.read()
+            self.assertNotIn('Run Period 1',
+                             text)
+            self.assertIn('RunPeriod,\n      Sample 1,\n      1,\n      3,\n      ,\n      1,\n      9,\n      ,\n      Thursday,\n      Yes,',
+                          text)
+            self.assertIn('RunPeriod,\n      Sample 2,\n      7,\n      1,\n      ,\n      7,\n      7,\n      ,\n      Monday,\n      Yes,\n      Yes,\n      No,\n      Yes,\n      Yes;\n\n  Site:Location,',
+                          text)
+            
+            fp=os.path.join(d,'in.epJSON')
+            set_run_periods(r'files\1ZoneUncontrolled.epJSON',
+                            fp,
+                            run_periods)
+            with open(fp) as f:
+                x=json.load(f)['RunPeriod']
+            self.assertEqual(list(x),
+                             ['Sample 1','Sample 2'])
+            self.assertEqual(x['Sample 2'],
+                             {'apply_weekend_holiday_rule': 'No',
+                              'begin_day_of_month': 1,
+                              'begin_month': 7,
+                              'day_of_week_for_start_day': 'Monday',
+                              'end_day_of_month': 7,
+                              'end_month': 7,
+                              'use_weather_file_daylight_saving_period': 'Yes',
+                              'use_weather_file_holidays_and_special_days': 'Yes',
+                              'use_weather_file_rain_indicators': 'Yes',
+                              'use_weather_file_snow_indicators': 'Yes'})
+            
+            fp=os.path.join(d,'no_run_period.idf')
+            with open(fp,'w') as f:
+                f.write('Version,9.4;\n')
+            self.assertRaises(ValueError,
+                              set_run_periods,
+                              fp,
+                              os.path.join(d,'in2.idf'),
+                              run_periods)
+        
+        
+class Test_get_annual_totals(unittest.TestCase):
+    ""
+    
+    def test_get_annual_totals(self):
+        ""
+        result=get_annual_totals(eso)
+        env=eso.get_environment('RUN PERIOD 1')
+        self.assertEqual(result['ZONE ONE','Zone Mean Air Temperature','C'],
+                         env.get_interval_variable(75).values.mean())
+        self.assertEqual(result['ZONE ONE','Zone Total Internal Latent Gain Energy','J'],
+                         env.get_interval_variable(47).values.sum())
+        self.assertEqual(result['TEST 352A','Other Equipment Total Heating Energy','J'],
+                         env.get_monthly_variable(48).values.sum())
+        
+        # a single period which represents two years
+        result2=get_annual_totals(eso,
+                                  [{'name':'Run Period 1','days':365,'weight':730}])
+        self.assertEqual(result2['ZONE ONE','Zone Mean Air Temperature','C'],
+                         result['ZONE ONE','Zone Mean Air Temperature','C'])
+        self.assertEqual(result2['TEST 352A','Other Equipment Total Heating Energy','J'],
+                         2*result['TEST 352A','Other Equipment Total Heating Energy','J'])
+        
+        
+    def test_get_annual_totals_meters(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'eplusout.eso')
+            with open(r'files\eplusout.eso') as f:
+                text=f.read()
+            with open(fp,'w') as f:
+                f.write(text.replace('End of Data Dictionary',
+                                     '13,1,Electricity:Facility [J] !Hourly\nEnd of Data Dictionary'))
+            self.assertEqual(EPEso(fp).variable_dictionary[13],
+                             {'number_of_values': 1, 
+                              'object_name': '', 
+                              'quantity': 'Electricity:Facility', 
+                              'unit': 'J', 
+                              'comment': 'Hourly'})
+        
+        
 class Test_EPErr(unittest.TestCase):
     ""
     
@@ -145,6 +558,36 @@ class Test_EPErr(unittest.TestCase):
     
         
 
+class Test_iter_eso(unittest.TestCase):
+    ""
+    
+    def test_iter_eso(self):
+        ""
+        records=iter_eso(fp=r'files\eplusout.eso')
+        self.assertEqual(next(records),
+                         (1, ('DENVER CENTENNIAL  GOLDEN   N ANN HTG 99% CONDNS DB', 
+                              '37.62', 
+                              '-122.40', 
+                              '-8.00', 
+                              '2.00')))
+        self.assertEqual(next(records),
+                         (2, (1, 12, 21, 0, 1, 0, 60, 'WinterDesignDay')))
+        self.assertEqual(next(records),
+                         (7, (-15.5,)))
+        
+        
+    def test_iter_eso_selective(self):
+        ""
+        values=[values[0] for report_code,values 
+                in iter_eso(fp=r'files\eplusout.eso',
+                            report_codes=[7],
+                            frequencies=['interval'],
+                            environments=['RUN PERIOD 1'])
+                if report_code==7]
+        self.assertEqual(values,
+                         list(eso.get_environment('RUN PERIOD 1').get_interval_variable(7).values))
+        
+        
 class Test_EPEso(unittest.TestCase):
     ""
     
@@ -159,6 +602,105 @@ class Test_EPEso(unittest.TestCase):
                               EPEso)
         
         
+    def test___init___selective(self):
+        ""
+        x=EPEso(fp=r'files\eplusout.eso',
+                report_codes=[7,51],
+                frequencies=['interval'],
+                environments=['RUN PERIOD 1'])
+        self.assertEqual(len(x.get_environments()),
+                         1)
+        env=x.get_environment('RUN PERIOD 1')
+        self.assertEqual(env.get_number_of_variables(),
+                         {'interval': 1, 
+                          'daily': 0, 
+                          'monthly': 0, 
+                          'runperiod': 0, 
+                          'annual': 0})
+        self.assertEqual(len(env.get_interval_variable(7).values),
+                         8760)
+        
+        
+    def test___init___lazy(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'eplusout.eso')
+            shutil.copy(r'files\eplusout.eso',fp)
+            x=EPEso(fp=fp,
+                    lazy=True)
+            self.assertTrue(os.path.isfile(fp+'.idx'))
+            self.assertEqual(x.get_environment('RUN PERIOD 1').get_number_of_variables(),
+                             self.eso.get_environment('RUN PERIOD 1').get_number_of_variables())
+            pd.testing.assert_frame_equal(x.get_environment('RUN PERIOD 1').get_interval_dataframe(),
+                                          self.eso.get_environment('RUN PERIOD 1').get_interval_dataframe())
+            # the index file is reused
+            x=EPEso(fp=fp,
+                    report_codes=[7],
+                    lazy=True)
+            self.assertEqual(len(x.get_environment('RUN PERIOD 1').get_interval_variable(7).values),
+                             8760)
+            # the sections are scanned in small blocks
+            block_size=eprun.eprun._eso_lazy_block_size
+            eprun.eprun._eso_lazy_block_size=100
+            try:
+                x=EPEso(fp=fp,
+                        lazy=True)
+                pd.testing.assert_frame_equal(x.get_environment('RUN PERIOD 1').get_interval_dataframe(),
+                                              self.eso.get_environment('RUN PERIOD 1').get_interval_dataframe())
+            finally:
+                eprun.eprun._eso_lazy_block_size=block_size
+        
+        
+    def test___init___max_workers(self):
+        ""
+        x=EPEso(fp=r'files\eplusout.eso',
+                max_workers=3)
+        self.assertEqual([env.environment_title for env in x.get_environments()],
+                         [env.environment_title for env in self.eso.get_environments()])
+        for env in x.get_environments():
+            env1=self.eso.get_environment(env.environment_title)
+            self.assertEqual(env.get_number_of_variables(),
+                             env1.get_number_of_variables())
+            pd.testing.assert_frame_equal(env.get_interval_dataframe(),
+                                          env1.get_interval_dataframe())
+            pd.testing.assert_frame_equal(env.get_daily_dataframe(),
+                                          env1.get_daily_dataframe())
+        
+        
+    def test_to_cache_from_cache(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'eplusout.eso.cache')
+            self.eso.to_cache(fp)
+            x=EPEso.from_cache(fp)
+            self.assertEqual(x.programme_version_statement,
+                             self.eso.programme_version_statement)
+            self.assertEqual(x.variable_dictionary,
+                             self.eso.variable_dictionary)
+            env=x.get_environment('RUN PERIOD 1')
+            env1=self.eso.get_environment('RUN PERIOD 1')
+            self.assertFalse(env.get_interval_variable(7).values.flags.writeable)
+            pd.testing.assert_frame_equal(env.get_interval_dataframe(),
+                                          env1.get_interval_dataframe())
+            pd.testing.assert_frame_equal(env.get_monthly_dataframe(),
+                                          env1.get_monthly_dataframe())
+            del x,env
+            
+            # the cache is checked against the .eso file, if it still exists
+            eso_fp=os.path.join(d,'eplusout.eso')
+            shutil.copy(r'files\eplusout.eso',eso_fp)
+            EPEso(eso_fp).to_cache(fp)
+            EPEso.from_cache(fp)
+            os.utime(eso_fp,(time.time()+10,time.time()+10))
+            with self.assertRaises(ValueError):
+                EPEso.from_cache(fp)
+            os.remove(eso_fp)
+            x=EPEso.from_cache(fp)
+            self.assertEqual(x.variable_dictionary,
+                             self.eso.variable_dictionary)
+            del x
+        
+        
     def test_get_environment(self):
         ""
         se=self.eso.get_environment('RUN PERIOD 1')
@@ -295,6 +837,13 @@ class Test_EPEsoSimulationEnvironment(unittest.TestCase):
         df=self.env.get_daily_dataframe()
         #print(df)
         #df.to_csv(r'files\test.csv')
+        self.assertEqual(df.shape,
+                         (1, 125))
+        df=self.env.get_daily_dataframe(report_codes=[51,8])
+        self.assertEqual(list(df.columns.get_level_values('value_type')),
+                         ['value','min_value','min_time','max_value','max_time']*2)
+        self.assertEqual(df[('ZN001:WALL001','Surface Inside Face Temperature','C','min_time')].iloc[0],
+                         pd.Timestamp(datetime.datetime(2001, 12, 21, 23, 59, tzinfo=datetime.timezone.utc)))
         
         
     def test_get_daily_periods(self):
@@ -326,6 +875,13 @@ class Test_EPEsoSimulationEnvironment(unittest.TestCase):
         df=self.env.get_interval_dataframe()
         #print(df)
         #df.to_csv(r'files\test.csv')
+        self.assertEqual(df.shape,
+                         (24, 6))
+        df=self.env.get_interval_dataframe(variables=[('ZONE ONE','Zone Mean Air Temperature')])
+        self.assertEqual(df.columns.tolist(),
+                         [('ZONE ONE', 'Zone Mean Air Temperature', 'C', 'value')])
+        self.assertEqual(df.iloc[0,0],
+                         -18.210957916180158)
         
         
     def test_get_interval_periods(self):
@@ -355,6 +911,22 @@ class Test_EPEsoSimulationEnvironment(unittest.TestCase):
         
     def test_get_monthly_dataframe(self):
         ""
+        df=self.env.get_monthly_dataframe(report_codes=[48])
+        self.assertEqual(df.shape,
+                         (1, 5))
+        self.assertEqual(list(df.columns.get_level_values('unit')),
+                         ['J']*5)
+        # a monthly variable with no unit has a missing unit, not '-'
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'eplusout.eso')
+            with open(r'files\eplusout.eso') as f:
+                text=f.read()
+            with open(fp,'w') as f:
+                f.write(text.replace('Other Equipment Total Heating Energy [J] !Monthly',
+                                     'Other Equipment Total Heating Energy [] !Monthly'))
+            env=EPEso(fp).get_environment('RUN PERIOD 1')
+            df=env.get_monthly_dataframe(report_codes=[48])
+            self.assertTrue(df.columns.get_level_values('unit').isna().all())
         
         
     def test_get_monthly_periods(self):
@@ -459,12 +1031,29 @@ class Test_EPEsoDailyPeriods(unittest.TestCase):
                          (21, ))
         
         
+    def test_day_types(self):
+        ""
+        self.assertEqual(tuple(self.daily_periods.day_types),
+                         ('WinterDesignDay', ))
+        self.assertIsInstance(self.daily_periods.day_types,
+                              pd.Categorical)
+        
+        
     def test_dst_indicators(self):
         ""
         self.assertEqual(self.daily_periods.dst_indicators,
                          (0, ))
         
         
+    def test_get_datetime_index(self):
+        ""
+        x=self.daily_periods.get_datetime_index()
+        self.assertIsInstance(x,
+                              pd.DatetimeIndex)
+        self.assertEqual(tuple(x.to_pydatetime()),
+                         self.daily_periods.get_start_times())
+        
+        
     def test_get_end_times(self):
         ""
         self.assertEqual(self.daily_periods.get_end_times(),
@@ -477,6 +1066,12 @@ class Test_EPEsoDailyPeriods(unittest.TestCase):
                          datetime.timedelta(days=1))
         
         
+    def test_get_period_index(self):
+        ""
+        self.assertEqual(str(list(self.daily_periods.get_period_index())),
+                         "[Period('2001-12-21 00:00:00', '86400S')]")
+        
+        
     def test_get_periods(self):
         ""
         self.assertEqual(str(self.daily_periods.get_periods()),
@@ -638,34 +1233,45 @@ class Test_EPEsoIntervalPeriods(unittest.TestCase):
     
     def test_day_types(self):
         ""
-        self.assertEqual(self.interval_periods.day_types,
+        self.assertEqual(tuple(self.interval_periods.day_types),
                          ('WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay', 'WinterDesignDay'))
      
     
     def test_days_of_month(self):
         ""
-        self.assertEqual(self.interval_periods.days_of_month,
+        self.assertEqual(tuple(self.interval_periods.days_of_month),
                          (21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21))
      
     
     def test_days_of_simulation(self):
         ""
-        self.assertEqual(self.interval_periods.days_of_simulation,
+        self.assertEqual(tuple(self.interval_periods.days_of_simulation),
                          (1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1))
         
         
     def test_dst_indicators(self):
         ""
-        self.assertEqual(self.interval_periods.dst_indicators,
+        self.assertEqual(tuple(self.interval_periods.dst_indicators),
                          (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
      
         
     def test_end_minutes(self):
         ""
-        self.assertEqual(self.interval_periods.end_minutes,
+        self.assertEqual(tuple(self.interval_periods.end_minutes),
                          (60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60, 60))
         
     
+    def test_get_datetime_index(self):
+        ""
+        x=self.interval_periods.get_datetime_index()
+        self.assertIsInstance(x,
+                              pd.DatetimeIndex)
+        self.assertEqual(len(x),
+                         24)
+        self.assertEqual(x[1],
+                         pd.Timestamp(datetime.datetime(2001, 12, 21, 1, 0, tzinfo=datetime.timezone.utc)))
+        
+        
     def test_get_end_times(self):
         ""
         self.assertEqual(self.interval_periods.get_end_times(),
@@ -678,6 +1284,15 @@ class Test_EPEsoIntervalPeriods(unittest.TestCase):
                          datetime.timedelta(minutes=60))
         
         
+    def test_get_period_index(self):
+        ""
+        x=self.interval_periods.get_period_index()
+        self.assertIsInstance(x,
+                              pd.PeriodIndex)
+        self.assertEqual(list(x),
+                         self.interval_periods.get_periods())
+        
+        
     def test_get_periods(self):
         ""
         self.assertEqual(str(self.interval_periods.get_periods()),
@@ -692,19 +1307,22 @@ class Test_EPEsoIntervalPeriods(unittest.TestCase):
         
     def test_hours(self):
         ""
-        self.assertEqual(self.interval_periods.hours,
+        self.assertEqual(tuple(self.interval_periods.hours),
                          (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24))
+        self.assertEqual(self.interval_periods.hours.dtype,
+                         np.int8)
+        self.assertFalse(self.interval_periods.hours.flags.writeable)
           
         
     def test_months(self):
         ""
-        self.assertEqual(self.interval_periods.months,
+        self.assertEqual(tuple(self.interval_periods.months),
                          (12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12))
       
         
     def test_start_minutes(self):
         ""
-        self.assertEqual(self.interval_periods.start_minutes,
+        self.assertEqual(tuple(self.interval_periods.start_minutes),
                          (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
         
         
@@ -787,6 +1405,9 @@ class Test_EPEsoIntervalVariable(unittest.TestCase):
                          24)
         self.assertEqual(str(self.interval_variable.values[0]),
                          '-15.5')
+        self.assertEqual(self.interval_variable.values.dtype,
+                         np.float64)
+        self.assertFalse(self.interval_variable.values.flags.writeable)
         
         
         
@@ -813,6 +1434,12 @@ class Test_EPEsoMonthlyPeriods(unittest.TestCase):
                          (1, ))
         
         
+    def test_get_datetime_index(self):
+        ""
+        self.assertEqual(tuple(self.monthly_periods.get_datetime_index().to_pydatetime()),
+                         (datetime.datetime(2001, 12, 1, 0, 0, tzinfo=datetime.timezone.utc), ))
+        
+        
     def test_get_end_times(self):
         ""
         self.assertEqual(self.monthly_periods.get_end_times(),
@@ -820,6 +1447,12 @@ class Test_EPEsoMonthlyPeriods(unittest.TestCase):
                                             tzinfo=datetime.timezone.utc), ))
         
         
+    def test_get_period_index(self):
+        ""
+        self.assertEqual(str(list(self.monthly_periods.get_period_index())),
+                         "[Period('2001-12', 'M')]")
+        
+        
     def test_get_periods(self):
         ""
         self.assertEqual(str(self.monthly_periods.get_periods()),
@@ -0,0 +1,842 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the functions and classes which run simulations, using a fake 
+EnergyPlus executable.
+
+The fake executable 'fake_energyplus/energyplus' is a Python script. On 
+Windows it is run by the 'fake_energyplus/energyplus.bat' wrapper with the 
+Python interpreter given by the FAKE_ENERGYPLUS_PYTHON environment variable,
+which is set below to the interpreter running the tests.
+
+"""
+
+import unittest
+
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from eprun import runsim, arunsim, runsim_batch, iter_runsim_batch, runsim_pipeline, iter_runsim_pipeline, arunsim_batch, get_resource_usage, get_schedule_report, get_annual_totals, runsim_sampled, validate_sampling, EPCache, EPJobLedger, EPJobQueue, EPRuntimePredictor, EPEso
+
+import numpy as np
+
+
+tests_dir=os.path.dirname(os.path.abspath(__file__))
+files_dir=os.path.join(tests_dir,'files')
+fake_ep_dir=os.path.join(tests_dir,'fake_energyplus') # a fake EnergyPlus executable
+os.environ['FAKE_ENERGYPLUS_PYTHON']=sys.executable
+
+
+def write_fake_input_file(fp,**options):
+    """Writes an input file for the fake EnergyPlus executable.
+    """
+    with open(fp,'w') as f:
+        f.write('Version,9.4;\n')
+        for k,v in options.items():
+            f.write('! fake_energyplus: %s=%s\n' % (k,v))
+    
+
+class Test_runsim(unittest.TestCase):
+    ""
+    
+    def test_runsim_progress_callback(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.2)
+            progress=[]
+            result=runsim(input_filepath=os.path.join(d,'1.idf'),
+                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                          ep_dir=fake_ep_dir,
+                          sim_dir=d,
+                          progress_callback=progress.append)
+            self.assertEqual(''.join(x['line']+'\n' for x in progress),
+                             result.stdout)
+            x=[x for x in progress if x['stage']=='simulation']
+            self.assertEqual(len(x),
+                             12)
+            self.assertEqual((x[0]['environment'],x[0]['date'],x[0]['percent']),
+                             ('RUN PERIOD 1','01/01',0))
+            self.assertEqual(x[-1]['date'],
+                             '12/01')
+            self.assertAlmostEqual(x[-1]['percent'],
+                                   100*334/365)
+            self.assertGreater(x[-1]['eta'],
+                               0)
+            self.assertEqual(progress[-1]['stage'],
+                             'finished')
+            
+            
+    def test_runsim_resource_usage(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.1)
+            result=runsim_batch([{'input_filepath':os.path.join(d,'1.idf')}]*2,
+                                epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                ep_dir=fake_ep_dir,
+                                sim_dir=d)
+            x=result[0].get_resource_usage()
+            self.assertGreaterEqual(x['wall_time'],
+                                    0.1)
+            self.assertGreater(x['user_time']+x['system_time'],
+                               0)
+            self.assertGreater(x['peak_rss'],
+                               0)
+            self.assertEqual(x['bytes_written'],
+                             sum(result[0].file_sizes.values()))
+            df=get_resource_usage(result)
+            self.assertEqual(df.shape,
+                             (2,5))
+            self.assertEqual(df['bytes_written'].sum(),
+                             2*x['bytes_written'])
+            
+            
+    def test_runsim_fail_fast(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=10,severe=1)
+            start=time.time()
+            result=runsim(input_filepath=os.path.join(d,'1.idf'),
+                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                          ep_dir=fake_ep_dir,
+                          sim_dir=d,
+                          fail_fast=True)
+            self.assertLess(time.time()-start,
+                            5)
+            self.assertNotEqual(result.returncode,
+                                0)
+            self.assertEqual(result.fail_fast_message,
+                             "<root> - Object required to validate 'required' properties.")
+            
+            # a predicate which does not match any message
+            write_fake_input_file(os.path.join(d,'1.idf'),severe=1)
+            result=runsim(input_filepath=os.path.join(d,'1.idf'),
+                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                          ep_dir=fake_ep_dir,
+                          sim_dir=d,
+                          fail_fast=lambda message_type,message: 'Zone Sizing' in message)
+            self.assertEqual(result.returncode,
+                             0)
+            self.assertIsNone(result.fail_fast_message)
+            
+            
+    def test_runsim_subprocess_run_kwargs(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),returncode=1)
+            kwargs=dict(input_filepath=os.path.join(d,'1.idf'),
+                        epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                        ep_dir=fake_ep_dir,
+                        sim_dir=d)
+            result=runsim(capture_output=True,
+                          input=b'',
+                          **kwargs)
+            self.assertEqual(result.returncode,
+                             1)
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                runsim(check=True,
+                       **kwargs)
+            self.assertEqual(cm.exception.returncode,
+                             1)
+            
+            
+    def test_runsim_output_variables(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.1)
+            with open(os.path.join(d,'1.idf'),'a') as f:
+                f.write('Output:Variable,*,Zone Mean Air Temperature,hourly;\n')
+                f.write('Output:Variable,*,Site Outdoor Air Drybulb Temperature,hourly;\n')
+            result=runsim(input_filepath=os.path.join(d,'1.idf'),
+                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                          ep_dir=fake_ep_dir,
+                          sim_dir=os.path.join(d,'sim'),
+                          output_variables=['Zone Mean Air Temperature'])
+            self.assertEqual(result.returncode,
+                             0)
+            with open(os.path.join(d,'sim','eplusin.idf')) as f:
+                text=f.read()
+            self.assertIn('fake_energyplus: sleep=0.1',
+                          text)
+            self.assertIn('Zone Mean Air Temperature',
+                          text)
+            self.assertNotIn('Site Outdoor Air Drybulb Temperature',
+                             text)
+            self.assertEqual((result.output_pruning['outputs_before'],
+                              result.output_pruning['outputs_after'],
+                              result.output_pruning['estimated_eso_reduction']),
+                             (2,1,0.5))
+            
+            
+    def test_runsim_output_profile(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            # an EnergyPlus installation which supports 'OutputControl:Files'
+            ep_dir=os.path.join(d,'ep')
+            os.mkdir(ep_dir)
+            with open(os.path.join(ep_dir,'energyplus'),'w') as f:
+                f.write('#!/bin/sh\nexec "%s" "$@"\n' % os.path.join(fake_ep_dir,'energyplus'))
+            os.chmod(os.path.join(ep_dir,'energyplus'),0o755)
+            with open(os.path.join(ep_dir,'Energy+.idd'),'w') as f:
+                f.write('OutputControl:Files,\n'
+                        '  A1 , \\field Output CSV\n'
+                        '       \\type choice\n'
+                        '  A2 , \\field Output ESO\n'
+                        '  A3 , \\field Output Tabular\n'
+                        '  A4 , \\field Output SQLite\n'
+                        '  A5 , \\field Output PerfLog\n'
+                        '  A6 ; \\field Output END\n'
+                        '\n'
+                        'Output:SQLite,\n')
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            with open(os.path.join(d,'1.idf'),'a') as f:
+                f.write('Output:VariableDictionary,IDF;\n')
+                f.write('Output:Variable,*,Zone Mean Air Temperature,hourly;\n')
+            result=runsim(input_filepath=os.path.join(d,'1.idf'),
+                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                          ep_dir=ep_dir,
+                          sim_dir=os.path.join(d,'sim'),
+                          output_profile='eso',
+                          keep_outputs=['eio'])
+            self.assertEqual(sorted(result.files),
+                             ['eio','end','err','eso'])
+            self.assertEqual(sorted(result.file_sizes),
+                             ['eio','end','err','eso'])
+            self.assertEqual(sorted(os.listdir(os.path.join(d,'sim'))),
+                             ['eplusin.idf','eplusout.eio','eplusout.end','eplusout.err','eplusout.eso'])
+            with open(os.path.join(d,'sim','eplusin.idf')) as f:
+                text=f.read()
+            self.assertNotIn('Output:VariableDictionary',
+                             text)
+            self.assertIn('Output:Variable,*,Zone Mean Air Temperature,hourly;',
+                          text)
+            self.assertEqual(' '.join(text[text.index('OutputControl:Files'):].split()),
+                             'OutputControl:Files, No, Yes, No, No, No, Yes;')
+            
+            # the 'sql' profile keeps the SQLite output
+            with open(os.path.join(d,'1.idf'),'a') as f:
+                f.write('Output:SQLite,SimpleAndTabular;\n')
+            runsim(input_filepath=os.path.join(d,'1.idf'),
+                   epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                   ep_dir=ep_dir,
+                   sim_dir=os.path.join(d,'sim_sql'),
+                   output_profile='sql')
+            with open(os.path.join(d,'sim_sql','eplusin.idf')) as f:
+                text=f.read()
+            self.assertIn('Output:SQLite,SimpleAndTabular;',
+                          text)
+            self.assertEqual(' '.join(text[text.index('OutputControl:Files'):].split()),
+                             'OutputControl:Files, No, No, No, Yes, No, Yes;')
+            with self.assertRaises(ValueError):
+                runsim(input_filepath=os.path.join(d,'1.idf'),
+                       epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                       ep_dir=ep_dir,
+                       output_profile='all')
+                
+                
+    def test_runsim_scratch_dir(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),small_writes=10)
+            scratch_dir=os.path.join(d,'scratch')
+            result=runsim(input_filepath=os.path.join(d,'1.idf'),
+                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                          ep_dir=fake_ep_dir,
+                          sim_dir=os.path.join(d,'sim'),
+                          scratch_dir=scratch_dir,
+                          keep_outputs=['eso','dbg'])
+            self.assertEqual(result.returncode,
+                             0)
+            self.assertEqual(sorted(result.files),
+                             ['dbg','end','err','eso'])
+            for k,fp in result.files.items():
+                self.assertEqual(os.path.dirname(fp),
+                                 os.path.join(d,'sim'))
+                self.assertEqual(os.path.getsize(fp),
+                                 result.file_sizes[k])
+            self.assertEqual(sorted(os.listdir(os.path.join(d,'sim'))),
+                             ['eplusin.idf','eplusout.dbg','eplusout.end','eplusout.err','eplusout.eso'])
+            self.assertEqual(os.listdir(scratch_dir),
+                             [])
+            
+            # the temporary directory is removed if the simulation fails, and 
+            # the .err file is kept
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=10)
+            with self.assertRaises(subprocess.TimeoutExpired):
+                runsim(input_filepath=os.path.join(d,'1.idf'),
+                       epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                       ep_dir=fake_ep_dir,
+                       sim_dir=os.path.join(d,'sim2'),
+                       scratch_dir=scratch_dir,
+                       timeout=0.5)
+            self.assertEqual(os.listdir(scratch_dir),
+                             [])
+            self.assertEqual(os.listdir(os.path.join(d,'sim2')),
+                             ['eplusout.err'])
+            
+            
+class Test_runsim_batch(unittest.TestCase):
+    ""
+    
+    def test_runsim_batch(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.1)
+            write_fake_input_file(os.path.join(d,'2.idf'),returncode=1)
+            jobs=[{'input_filepath':os.path.join(d,x)} for x in ('1.idf','2.idf','1.idf')]
+            finished=[]
+            result=runsim_batch(jobs,
+                                max_workers=2,
+                                callback=lambda i,epresult: finished.append(i),
+                                ep_dir=fake_ep_dir,
+                                epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                sim_dir=os.path.join(d,'sim'))
+            self.assertEqual(sorted(finished),
+                             [0,1,2])
+            self.assertEqual([x.returncode for x in result],
+                             [0,1,0])
+            for i,x in enumerate(result):
+                self.assertEqual(os.path.dirname(x.files['eso']),
+                                 os.path.join(d,'sim',str(i)))
+                self.assertGreater(x.wall_time,
+                                   0)
+            
+            
+    def test_runsim_batch_shared_sim_dir(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.1)
+            jobs=[{'input_filepath':os.path.join(d,'1.idf'),
+                   'sim_dir':d,
+                   'output_prefix':'job%s' % i,
+                   'output_suffix':output_suffix} 
+                  for i,output_suffix in enumerate(['L','C','D'])]
+            result=runsim_batch(jobs,
+                                ep_dir=fake_ep_dir,
+                                epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'))
+            self.assertEqual([os.path.basename(x.files['eso']) for x in result],
+                             ['job0out.eso','job1.eso','job2.eso'])
+            self.assertEqual([os.path.basename(x.files['htm']) for x in result],
+                             ['job0tbl.htm','job1Table.htm','job2-table.htm'])
+            self.assertEqual(result[0].file_sizes['eso'],
+                             os.path.getsize(os.path.join(files_dir,'eplusout.eso')))
+            
+            
+    def test_iter_runsim_batch(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            result=list(iter_runsim_batch([{'input_filepath':os.path.join(d,'1.idf'),
+                                            'sim_dir':os.path.join(d,'sim')}],
+                                          ep_dir=fake_ep_dir,
+                                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')))
+            self.assertEqual(len(result),
+                             1)
+            self.assertEqual(result[0][0],
+                             0)
+            self.assertEqual(result[0][1].get_end().line[:35],
+                             'EnergyPlus Completed Successfully--')
+            
+            
+    def test_runsim_batch_exception(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            write_fake_input_file(os.path.join(d,'2.idf'),sleep=10)
+            jobs=[{'input_filepath':os.path.join(d,'1.idf')},
+                  {'input_filepath':os.path.join(d,'2.idf'),'timeout':0.5},
+                  {'input_filepath':os.path.join(d,'1.idf')}]
+            result=runsim_batch(jobs,
+                                max_workers=1,
+                                ep_dir=fake_ep_dir,
+                                epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                sim_dir=d)
+            self.assertEqual([x.returncode for x in result],
+                             [0,None,0])
+            self.assertIsNone(result[0].exception)
+            self.assertIsInstance(result[1].exception,
+                                  subprocess.TimeoutExpired)
+            self.assertEqual(result[1].files,
+                             {})
+            
+            
+    def test_iter_runsim_batch_close(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.5)
+            x=iter_runsim_batch([{'input_filepath':os.path.join(d,'1.idf')}]*4,
+                                max_workers=1,
+                                ep_dir=fake_ep_dir,
+                                epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                sim_dir=d)
+            start=time.time()
+            self.assertEqual(next(x)[1].returncode,
+                             0)
+            x.close()
+            # the running simulation is waited for, the other jobs are cancelled
+            self.assertLess(time.time()-start,
+                            1.5)
+            self.assertEqual(sorted(i for i in os.listdir(d) if os.path.isfile(os.path.join(d,i,'eplusout.eso'))),
+                             ['0','1'])
+            
+            
+    def test_runsim_pipeline(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.1)
+            write_fake_input_file(os.path.join(d,'2.idf'),returncode=1)
+            jobs=[{'input_filepath':os.path.join(d,x)} for x in ('1.idf','2.idf','1.idf','1.idf')]
+            pending=[]
+            
+            def postprocess(epresult):
+                pending.append(epresult)
+                time.sleep(0.2)
+                return epresult.returncode,len(epresult.get_err().warnings)
+            
+            result=runsim_pipeline(jobs,
+                                   postprocess,
+                                   max_workers=1,
+                                   max_pending=1,
+                                   delete_files=['eso'],
+                                   ep_dir=fake_ep_dir,
+                                   epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                   sim_dir=d)
+            self.assertEqual([x[0] for x in result],
+                             [0,1,0,0])
+            self.assertEqual(len(pending),
+                             4)
+            for x in pending:
+                self.assertFalse(os.path.exists(x.files['eso']))
+                self.assertTrue(os.path.exists(x.files['err']))
+                
+                
+    def test_iter_runsim_pipeline_exception(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            with self.assertRaises(ZeroDivisionError):
+                list(iter_runsim_pipeline([{'input_filepath':os.path.join(d,'1.idf')}],
+                                          lambda epresult: 1/0,
+                                          ep_dir=fake_ep_dir,
+                                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                          sim_dir=d))
+            
+            # the jobs which have not started are cancelled
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=0.5)
+            with self.assertRaises(ZeroDivisionError):
+                list(iter_runsim_pipeline([{'input_filepath':os.path.join(d,'1.idf')}]*4,
+                                          lambda epresult: 1/0,
+                                          max_workers=1,
+                                          max_pending=0,
+                                          ep_dir=fake_ep_dir,
+                                          epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                          sim_dir=os.path.join(d,'sim')))
+            self.assertLess(len([i for i in os.listdir(os.path.join(d,'sim')) if os.path.isfile(os.path.join(d,'sim',i,'eplusout.eso'))]),
+                            4)
+            
+            # a failed simulation is postprocessed with a returncode of None
+            write_fake_input_file(os.path.join(d,'2.idf'),sleep=10)
+            result=runsim_pipeline([{'input_filepath':os.path.join(d,'2.idf'),'timeout':0.5}],
+                                   lambda epresult: (epresult.returncode,type(epresult.exception)),
+                                   ep_dir=fake_ep_dir,
+                                   epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                   sim_dir=os.path.join(d,'sim2'))
+            self.assertEqual(result,
+                             [(None,subprocess.TimeoutExpired)])
+            
+            
+class Test_arunsim(unittest.TestCase):
+    ""
+    
+    def test_arunsim(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            result=asyncio.run(arunsim(input_filepath=os.path.join(d,'1.idf'),
+                                       epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                       ep_dir=fake_ep_dir,
+                                       sim_dir=d))
+            self.assertEqual(result.returncode,
+                             0)
+            self.assertTrue(result.stdout.startswith('EnergyPlus Starting'))
+            self.assertIn('eso',
+                          result.files)
+            
+            
+    def test_arunsim_runsim_options(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            progress=[]
+            result=asyncio.run(arunsim(input_filepath=os.path.join(d,'1.idf'),
+                                       epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                       ep_dir=fake_ep_dir,
+                                       sim_dir=os.path.join(d,'sim'),
+                                       scratch_dir=d,
+                                       keep_outputs=['eso'],
+                                       progress_callback=progress.append))
+            self.assertEqual(result.returncode,
+                             0)
+            self.assertTrue(len(progress)>0)
+            self.assertEqual(sorted(result.files),
+                             ['end','err','eso'])
+            self.assertIsNotNone(result.user_time)
+            
+            
+    def test_arunsim_timeout(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=10)
+            start=time.time()
+            with self.assertRaises(subprocess.TimeoutExpired):
+                asyncio.run(arunsim(input_filepath=os.path.join(d,'1.idf'),
+                                    epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                    ep_dir=fake_ep_dir,
+                                    sim_dir=d,
+                                    timeout=0.5))
+            self.assertLess(time.time()-start,
+                            5)
+            
+            
+    def test_arunsim_batch(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            write_fake_input_file(os.path.join(d,'2.idf'),returncode=1)
+            result=asyncio.run(arunsim_batch([{'input_filepath':os.path.join(d,'1.idf')},
+                                              {'input_filepath':os.path.join(d,'2.idf')}],
+                                             max_workers=2,
+                                             ep_dir=fake_ep_dir,
+                                             epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                             sim_dir=d))
+            self.assertEqual([x.returncode for x in result],
+                             [0,1])
+            
+            
+    def test_arunsim_batch_timeout(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            write_fake_input_file(os.path.join(d,'2.idf'),sleep=10)
+            start=time.time()
+            result=asyncio.run(arunsim_batch([{'input_filepath':os.path.join(d,'1.idf')},
+                                              {'input_filepath':os.path.join(d,'2.idf')}],
+                                             max_workers=2,
+                                             ep_dir=fake_ep_dir,
+                                             epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                             sim_dir=d,
+                                             timeout=2))
+            self.assertLess(time.time()-start,
+                            8)
+            self.assertEqual([x.returncode for x in result],
+                             [0,None])
+            self.assertIsInstance(result[1].exception,
+                                  subprocess.TimeoutExpired)
+            
+            
+    def test_arunsim_batch_cancel(self):
+        ""
+        async def run_and_cancel(d):
+            task=asyncio.ensure_future(arunsim_batch([{'input_filepath':os.path.join(d,'1.idf')}]*2,
+                                                     ep_dir=fake_ep_dir,
+                                                     epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                                     sim_dir=d))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            await task
+        
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'1.idf'),sleep=10)
+            start=time.time()
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(run_and_cancel(d))
+            self.assertLess(time.time()-start,
+                            5)
+            
+            
+class Test_EPCache(unittest.TestCase):
+    ""
+    
+    def test_runsim_cache(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            cache=EPCache(os.path.join(d,'cache'),
+                          max_entries=1)
+            write_fake_input_file(os.path.join(d,'1.idf'))
+            with open(os.path.join(d,'2.idf'),'w') as f:
+                f.write('Version,9.6;\n')
+            kwargs=dict(epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                        ep_dir=fake_ep_dir,
+                        sim_dir=os.path.join(d,'sim'),
+                        cache=cache)
+            result1=runsim(input_filepath=os.path.join(d,'1.idf'),**kwargs)
+            result2=runsim(input_filepath=os.path.join(d,'1.idf'),**kwargs)
+            self.assertEqual((cache.hits,cache.misses),
+                             (1,1))
+            self.assertEqual(result2.returncode,
+                             0)
+            self.assertEqual(result2.stdout,
+                             result1.stdout)
+            self.assertTrue(result2.files['eso'].startswith(cache.cache_dir))
+            self.assertEqual(result2.file_sizes,
+                             result1.file_sizes)
+            
+            # the least recently used entry is removed
+            runsim(input_filepath=os.path.join(d,'2.idf'),**kwargs)
+            runsim(input_filepath=os.path.join(d,'1.idf'),**kwargs)
+            self.assertEqual(cache.get_stats(),
+                             {'hits':1,
+                              'misses':3,
+                              'entries':1,
+                              'size':sum(result1.file_sizes.values())})
+            
+            
+class Test_EPJobLedger(unittest.TestCase):
+    ""
+    
+    def test_run(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            for name,options in (('a.idf',{}),('b.idf',{'returncode':1})):
+                write_fake_input_file(os.path.join(d,name),**options)
+            jobs=[{'input_filepath':os.path.join(d,x)} for x in ('a.idf','b.idf','a.idf')]
+            ledger=EPJobLedger(os.path.join(d,'ledger.sqlite'))
+            result=ledger.run(jobs,
+                              ep_dir=fake_ep_dir,
+                              epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                              sim_dir=d)
+            self.assertEqual(sorted(result),
+                             [1,2,3])
+            stats=ledger.get_stats()
+            self.assertEqual({k:stats[k] for k in ('total','pending','running','done','failed')},
+                             {'total':3,'pending':0,'running':0,'done':2,'failed':1})
+            self.assertAlmostEqual(stats['failure_rate'],
+                                   1/3)
+            x=ledger.get_jobs('done')
+            self.assertEqual(x[0]['sim_dir'],
+                             os.path.join(d,'0'))
+            self.assertTrue(os.path.isfile(x[0]['files']['err']))
+            self.assertEqual(x[0]['attempts'],
+                             1)
+            self.assertEqual(len(ledger.get_dataframe()),
+                             3)
+            
+            # restart: only the failed job is run again
+            ledger=EPJobLedger(os.path.join(d,'ledger.sqlite'))
+            self.assertEqual(ledger.run(jobs,
+                                        ep_dir=fake_ep_dir,
+                                        epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                        sim_dir=d),
+                             {})
+            result=ledger.run(jobs,
+                              retry_failed=True,
+                              ep_dir=fake_ep_dir,
+                              epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                              sim_dir=d)
+            self.assertEqual(list(result),
+                             [2])
+            
+            
+    def test_reconcile(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'a.idf'))
+            ledger=EPJobLedger(os.path.join(d,'ledger.sqlite'))
+            job_id,=ledger.add_jobs([{'input_filepath':os.path.join(d,'a.idf')}],
+                                    sim_dir=d)
+            # simulate a job interrupted while it was running
+            with ledger._connect() as connection:
+                connection.execute("UPDATE jobs SET state='running' WHERE id=?",(job_id,))
+            with open(os.path.join(d,'0','eplusout.err'),'w') as f:
+                f.write('half-written')
+            self.assertEqual(ledger.reconcile(),
+                             [job_id])
+            self.assertFalse(os.path.exists(os.path.join(d,'0','eplusout.err')))
+            self.assertEqual(ledger.get_jobs()[0]['state'],
+                             'pending')
+            
+            
+class Test_EPJobQueue(unittest.TestCase):
+    ""
+    
+    def test_reclaim(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            queue=EPJobQueue(os.path.join(d,'queue'),lease_time=60)
+            job_id,=queue.put([{'input_filepath':os.path.join(d,'a.idf')}])
+            self.assertEqual(queue._claim('dead_worker')[0],
+                             job_id)
+            self.assertEqual(queue.reclaim(),
+                             [])
+            # the worker died and has not renewed its lease
+            fp=queue._get_filepath('claimed',job_id,'dead_worker')
+            os.utime(fp,(time.time()-120,time.time()-120))
+            self.assertEqual(queue.reclaim(),
+                             [job_id])
+            self.assertEqual(queue.get_stats(),
+                             {'pending':1,'claimed':0,'done':0,'failed':0})
+            
+            # a job which has been pending for longer than the lease time starts
+            # a new lease when it is claimed
+            fp=queue._get_filepath('pending',job_id)
+            os.utime(fp,(time.time()-120,time.time()-120))
+            self.assertEqual(queue._claim('worker')[0],
+                             job_id)
+            self.assertEqual(queue.reclaim(),
+                             [])
+            
+            
+    def test_run_job_lost_lease(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'a.idf'),sleep=5)
+            queue=EPJobQueue(os.path.join(d,'queue'),lease_time=0.4)
+            queue.put([{'input_filepath':os.path.join(d,'a.idf')}])
+            job_id,job=queue._claim('worker')
+            
+            # another worker moves the job back to pending
+            def reclaim():
+                time.sleep(0.5)
+                os.rename(queue._get_filepath('claimed',job_id,'worker'),
+                          queue._get_filepath('pending',job_id))
+                
+            thread=threading.Thread(target=reclaim)
+            thread.start()
+            start=time.time()
+            self.assertFalse(queue._run_job(job_id,
+                                            job,
+                                            'worker',
+                                            {'ep_dir':fake_ep_dir,
+                                             'epw_filepath':os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw')}))
+            thread.join()
+            self.assertLess(time.time()-start,
+                            3)
+            self.assertEqual(queue.get_stats(),
+                             {'pending':1,'claimed':0,'done':0,'failed':0})
+            
+            
+    def test_run_worker(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            write_fake_input_file(os.path.join(d,'a.idf'),sleep=0.2)
+            write_fake_input_file(os.path.join(d,'b.idf'),returncode=1)
+            queue=EPJobQueue(os.path.join(d,'queue'))
+            job_ids=queue.put([{'input_filepath':os.path.join(d,x)} 
+                               for x in ('a.idf','a.idf','a.idf','b.idf')])
+            # two worker processes
+            code=('from eprun import EPJobQueue; '
+                  'EPJobQueue(%r).run_worker(ep_dir=%r,epw_filepath=%r)' 
+                  % (os.path.join(d,'queue'),
+                     fake_ep_dir,
+                     os.path.abspath(os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'))))
+            processes=[subprocess.Popen([sys.executable,'-c',code]) for _ in range(2)]
+            for process in processes:
+                self.assertEqual(process.wait(timeout=60),
+                                 0)
+            self.assertEqual(queue.get_stats(),
+                             {'pending':0,'claimed':0,'done':3,'failed':1})
+            results=queue.get_results()
+            self.assertEqual(list(results),
+                             job_ids)
+            self.assertEqual(results[job_ids[3]]['returncode'],
+                             1)
+            self.assertTrue(os.path.isfile(results[job_ids[0]]['files']['err']))
+            
+            
+class Test_EPRuntimePredictor(unittest.TestCase):
+    ""
+    
+    def test_runsim_batch_predictor(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            for name,run_period,sleep in (('small.idf','1,1,,1,31',0.1),('large.idf','1,1,,12,31',0.3)):
+                with open(os.path.join(d,name),'w') as f:
+                    f.write('Zone,Zone 1;\nRunPeriod,Run Period 1,%s,;\n' % run_period)
+                    f.write('! fake_energyplus: sleep=%s\n' % sleep)
+            predictor=EPRuntimePredictor(os.path.join(d,'history.json'))
+            finished=[]
+            result=runsim_batch([{'input_filepath':os.path.join(d,x)} 
+                                 for x in ('small.idf','small.idf','large.idf')],
+                                max_workers=1,
+                                callback=lambda i,epresult: finished.append(i),
+                                ep_dir=fake_ep_dir,
+                                epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                sim_dir=d,
+                                predictor=predictor)
+            self.assertEqual(finished[0],
+                             2)
+            self.assertGreater(result[2].predicted_time,
+                               result[0].predicted_time)
+            report=get_schedule_report(result)
+            self.assertGreaterEqual(report['makespan'],
+                                    0.5)
+            self.assertIsNotNone(report['mean_absolute_error'])
+            self.assertEqual(len(EPRuntimePredictor(os.path.join(d,'history.json'))._history),
+                             3)
+            
+            
+class Test_runsim_sampled(unittest.TestCase):
+    ""
+    
+    def test_runsim_sampled(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            fp=os.path.join(d,'in.idf')
+            shutil.copy(os.path.join(files_dir,'1ZoneUncontrolled.idf'),fp)
+            result=runsim_sampled(fp,
+                                  os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                  ep_dir=fake_ep_dir,
+                                  sim_dir=d,
+                                  n_periods=4)
+            self.assertEqual(result['epresult'].returncode,
+                             0)
+            self.assertEqual(len(result['run_periods']),
+                             4)
+            self.assertEqual([x.environment_title for x in result['epresult'].get_eso().get_environments()][2:],
+                             ['SAMPLE 1','SAMPLE 2','SAMPLE 3','SAMPLE 4'])
+            x=result['annual_totals']['ZONE ONE','Zone Mean Air Temperature','C']
+            self.assertTrue(abs(x/get_annual_totals(EPEso(os.path.join(files_dir,'eplusout.eso')))['ZONE ONE','Zone Mean Air Temperature','C']-1)<0.1)
+        
+        
+    def test_validate_sampling(self):
+        ""
+        with tempfile.TemporaryDirectory() as d:
+            jobs=[]
+            for i in range(2):
+                fp=os.path.join(d,'%s.idf' % i)
+                shutil.copy(os.path.join(files_dir,'1ZoneUncontrolled.idf'),fp)
+                with open(fp,'a') as f:
+                    f.write('! fake_energyplus: sleep=%s\n' % (2*(i+1)))
+                jobs.append({'input_filepath':fp})
+            # a job which times out is left out
+            fp=os.path.join(d,'2.idf')
+            shutil.copy(os.path.join(files_dir,'1ZoneUncontrolled.idf'),fp)
+            with open(fp,'a') as f:
+                f.write('! fake_energyplus: sleep=10\n')
+            jobs.append({'input_filepath':fp,'timeout':0.5})
+            result=validate_sampling(jobs,
+                                     n_periods=4,
+                                     epw_filepath=os.path.join(files_dir,'USA_CA_San.Francisco.Intl.AP.724940_TMY3.epw'),
+                                     ep_dir=fake_ep_dir,
+                                     sim_dir=d)
+            self.assertEqual(list(result.columns),
+                             ['full','sampled','error','speed_up'])
+            self.assertEqual(list(result.index.levels[0]),
+                             [0,1])
+            self.assertTrue(os.path.isfile(os.path.join(d,'1','sampled','eplusout.eso')))
+            x=result.loc[(0,'ZONE ONE','Zone Mean Air Temperature','C')]
+            self.assertEqual(x['full'],
+                             get_annual_totals(EPEso(os.path.join(files_dir,'eplusout.eso')))['ZONE ONE','Zone Mean Air Temperature','C'])
+            self.assertTrue(abs(x['error'])<0.1)
+            self.assertTrue((result['speed_up']>2).all())
+
+
+
+if __name__=='__main__':
+    
+    unittest.main()